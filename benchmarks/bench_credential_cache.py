@@ -0,0 +1,175 @@
+"""
+Lookup latency of the in-memory, thread-safe and SQLite-backed credential caches.
+
+    python -m benchmarks.bench_credential_cache --lookups 100000 --processes 4
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import jwt
+
+from benchmarks.common import finish, parse_args, summarize
+from cidc_utils.caching import (
+    ConcurrentCredentialCache,
+    CredentialCache,
+    SharedCredentialCache,
+)
+
+
+def _tokens(count: int) -> dict:
+    exp = int(time.time()) + 3600
+    return {
+        "user-{}".format(index): jwt.encode(
+            {"sub": "user-{}".format(index), "exp": exp},
+            "benchmark-secret-of-at-least-32-bytes",
+        )
+        for index in range(count)
+    }
+
+
+def bench_lookups(cache, identities: list, count: int) -> dict:
+    """get_key over a working set of identities, one latency sample per call."""
+    latencies = []
+    started = time.perf_counter()
+    for index in range(count):
+        begin = time.perf_counter()
+        cache.get_key(identities[index % len(identities)])
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_stores(cache, tokens: dict) -> dict:
+    """cache_key of every token, including its one-off decode."""
+    latencies = []
+    started = time.perf_counter()
+    for identity, token in tokens.items():
+        begin = time.perf_counter()
+        cache.cache_key(token, identity=identity)
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+class _LockedCache:
+    """CredentialCache behind one global lock, the usual way to share it."""
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    def get_key(self, identity):
+        with self._lock:
+            return self._cache.get_key(identity)
+
+    def cache_key(self, key, identity):
+        with self._lock:
+            return self._cache.cache_key(key, identity=identity)
+
+
+def bench_threads(cache, tokens: dict, count: int, threads: int) -> dict:
+    """Lookups from several threads, with one in twenty calls re-storing a token."""
+    identities = list(tokens)
+    barrier = threading.Barrier(threads + 1)
+
+    def run(offset):
+        barrier.wait()
+        for index in range(offset, offset + count):
+            identity = identities[index % len(identities)]
+            if index % 20 == 0:
+                cache.cache_key(tokens[identity], identity=identity)
+            else:
+                cache.get_key(identity)
+
+    workers = [
+        threading.Thread(target=run, args=(offset * count,))
+        for offset in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return summarize([], time.perf_counter() - started, count * threads)
+
+
+def _worker(path: str, identities: list, count: int, queue):
+    cache = SharedCredentialCache(path)
+    started = time.perf_counter()
+    for index in range(count):
+        cache.get_key(identities[index % len(identities)])
+    queue.put(time.perf_counter() - started)
+
+
+def bench_shared_processes(path: str, identities: list, count: int, processes: int):
+    """Lookups from several worker processes reading one database at once."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(path, identities, count, queue))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    elapsed = [queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    # Timed inside the workers, so process start-up isn't counted.
+    return summarize([], max(elapsed), count * processes)
+
+
+def add_options(parser):
+    parser.add_argument(
+        "--lookups", type=int, default=100000, help="get_key calls per scenario."
+    )
+    parser.add_argument(
+        "--identities", type=int, default=100, help="Distinct cached identities."
+    )
+    parser.add_argument(
+        "--processes", type=int, default=4, help="Worker processes sharing SQLite."
+    )
+    parser.add_argument(
+        "--threads",
+        default="1,4,16",
+        help="Comma-separated thread counts for the in-process caches.",
+    )
+
+
+def main():
+    args = parse_args(__doc__.strip().splitlines()[0], add_options)
+    tokens = _tokens(args.identities)
+    identities = list(tokens)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "credentials.db")
+        memory = CredentialCache(maxsize=args.identities * 2, ttl=3600)
+        shared = SharedCredentialCache(path, maxsize=args.identities * 2)
+        results["memory_store"] = bench_stores(memory, tokens)
+        results["shared_store"] = bench_stores(shared, tokens)
+        results["memory_get_key"] = bench_lookups(memory, identities, args.lookups)
+        results["shared_get_key"] = bench_lookups(shared, identities, args.lookups)
+        results["shared_get_key_p{}".format(args.processes)] = bench_shared_processes(
+            path, identities, args.lookups, args.processes
+        )
+        shared.close()
+    per_thread = args.lookups // 10
+    for threads in [int(value) for value in args.threads.split(",")]:
+        locked = _LockedCache(CredentialCache(maxsize=args.identities * 2, ttl=3600))
+        concurrent = ConcurrentCredentialCache(maxsize=args.identities * 2)
+        for name, cache in (("locked", locked), ("concurrent", concurrent)):
+            bench_stores(cache, tokens)
+            results["{}_threads_{}".format(name, threads)] = bench_threads(
+                cache, tokens, per_thread, threads
+            )
+    settings = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("output", "compare", "no_save")
+    }
+    finish("credential_cache", results, settings, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Speed and peak memory of the cidc_utils.tools.format_data helpers.
+
+    python -m benchmarks.bench_format_data --inputs 200000 --records 200000 --lookups 200
+"""
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import finish, parse_args, summarize, traced_memory
+from cidc_utils.tools.format_data import DataRecord, iter_input_json
+from cidc_utils.tools.record_store import RecordStore
+from cidc_utils.tools.records import (
+    CompactDataRecord,
+    DataRecordBatch,
+    from_dict,
+    to_dict,
+)
+
+
+def _write_inputs(path: str, count: int):
+    """An input.json with `count` file-like WDL inputs."""
+    with open(path, "w") as input_json:
+        input_json.write("{")
+        for index in range(count):
+            input_json.write(
+                '{}"run.sample_{}": {{"path": "gs://bucket/sample_{}.bam", '
+                '"size": {}}}'.format("," if index else "", index, index, index)
+            )
+        input_json.write("}")
+
+
+def _load_whole(path: str) -> int:
+    """The previous convert_input_json: read, json.loads, then build the list."""
+    with open(path, "r") as input_json:
+        parsed = json.loads(input_json.read())
+    records = [{"key_name": key, "key_value": value} for key, value in parsed.items()]
+    return len(records)
+
+
+def _stream(path: str) -> int:
+    return sum(1 for _ in iter_input_json(path))
+
+
+def bench_input_json(load, path: str, count: int) -> dict:
+    """Parses the file once, tracking the peak allocation."""
+    result = {}
+    with traced_memory(result):
+        started = time.perf_counter()
+        load(path)
+        elapsed = time.perf_counter() - started
+    result.update(summarize([], elapsed, operations=count))
+    return result
+
+
+_COMPOUND = ("trial", "assay", "sample_id")
+
+
+def _documents(count: int) -> list:
+    """Mongo data documents shaped like an upload: few trials, many files."""
+    return [
+        {
+            "_id": "{:024x}".format(index),
+            "assay": "assay_{}".format(index % 4),
+            "trial": "trial_{}".format(index % 5),
+            "file_name": "sample_{}.bam".format(index),
+            "sample_id": "sample_{}".format(index // 20),
+            "mapping": "mapping_{}".format(index % 6),
+            "gs_uri": "gs://bucket/trial_{}/sample_{}.bam".format(index % 5, index),
+            "date_created": "2018-06-{:02d}T12:00:00".format(index % 28 + 1),
+            "processed": index % 3 == 0,
+        }
+        for index in range(count)
+    ]
+
+
+def bench_build(build, documents: list) -> dict:
+    """
+    Builds records from Mongo documents, tracking the peak allocation. The
+    documents stay alive, so their string values aren't counted.
+    """
+    result = {}
+    with traced_memory(result):
+        started = time.perf_counter()
+        records = build(documents)
+        elapsed = time.perf_counter() - started
+        del records
+    result.update(summarize([], elapsed, operations=len(documents)))
+    return result
+
+
+def bench_to_dicts(to_dicts, records, count: int) -> dict:
+    """Converts every record back to a Mongo document."""
+    started = time.perf_counter()
+    for _ in to_dicts(records):
+        pass
+    return summarize([], time.perf_counter() - started, operations=count)
+
+
+def _scan(documents: list, **criteria) -> list:
+    """The linear search reconciliation jobs used before RecordStore."""
+    return [
+        doc
+        for doc in documents
+        if all(doc.get(field) == value for field, value in criteria.items())
+    ]
+
+
+def bench_lookups(find, queries: list) -> dict:
+    """One trial+assay+sample lookup per query, one latency sample each."""
+    latencies = []
+    started = time.perf_counter()
+    for criteria in queries:
+        begin = time.perf_counter()
+        find(**criteria)
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def add_options(parser):
+    parser.add_argument(
+        "--inputs", type=int, default=200000, help="Keys in the generated input.json."
+    )
+    parser.add_argument(
+        "--records", type=int, default=200000, help="DataRecords built per variant."
+    )
+    parser.add_argument(
+        "--lookups", type=int, default=200, help="Compound lookups per variant."
+    )
+
+
+def main():
+    args = parse_args(__doc__.strip().splitlines()[0], add_options)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "input.json")
+        _write_inputs(path, args.inputs)
+        results["input_json_load"] = bench_input_json(_load_whole, path, args.inputs)
+        results["input_json_stream"] = bench_input_json(_stream, path, args.inputs)
+    documents = _documents(args.records)
+    variants = {
+        "attrs": (
+            lambda docs: [from_dict(DataRecord, doc) for doc in docs],
+            lambda records: map(to_dict, records),
+        ),
+        "slotted": (
+            lambda docs: [from_dict(CompactDataRecord, doc) for doc in docs],
+            lambda records: map(to_dict, records),
+        ),
+        "batch": (DataRecordBatch.from_dicts, DataRecordBatch.to_dicts),
+    }
+    for name, (build, to_dicts) in variants.items():
+        results["records_{}_build".format(name)] = bench_build(build, documents)
+        records = build(documents)
+        results["records_{}_to_dicts".format(name)] = bench_to_dicts(
+            to_dicts, records, args.records
+        )
+        del records
+    queries = [
+        {key: documents[index * 7919 % len(documents)][key] for key in _COMPOUND}
+        for index in range(args.lookups)
+    ]
+    results["lookups_scan"] = bench_lookups(
+        lambda **criteria: _scan(documents, **criteria), queries
+    )
+    store = {}
+    results["store_load"] = bench_build(
+        lambda docs: store.setdefault("store", RecordStore(docs)), documents
+    )
+    results["lookups_store"] = bench_lookups(store["store"].find, queries)
+    settings = {
+        "inputs": args.inputs,
+        "records": args.records,
+        "lookups": args.lookups,
+    }
+    finish("format_data", results, settings, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Records/sec of StackdriverJsonFormatter in its regular and fast modes.
+
+    python -m benchmarks.bench_formatter --records 200000
+"""
+import logging
+import sys
+import time
+
+from benchmarks.common import finish, parse_args, summarize
+from cidc_utils.loghandler.stack_driver_handler import StackdriverJsonFormatter
+
+
+def _records(count: int) -> list:
+    """A mix of plain, dict and extra-carrying records, like production logs."""
+    try:
+        raise ValueError("bad input")
+    except ValueError:
+        exc_info = sys.exc_info()
+    shapes = [
+        lambda i: ("request %s handled", (i,), None, {}),
+        lambda i: (
+            {"message": "upload done", "category": "DATA", "n": i},
+            None,
+            None,
+            {},
+        ),
+        lambda i: ("job finished", None, None, {"job_id": i, "user": "bob"}),
+        lambda i: ("failed", None, exc_info if i % 50 == 0 else None, {}),
+    ]
+    records = []
+    for index in range(count):
+        msg, args, exc, extra = shapes[index % len(shapes)](index)
+        record = logging.LogRecord(
+            "bench", logging.INFO, __file__, 1, msg, args, exc, func="bench"
+        )
+        record.__dict__.update(extra)
+        records.append(record)
+    return records
+
+
+def bench_format(formatter: StackdriverJsonFormatter, records: list) -> dict:
+    """Formats every record once."""
+    started = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    return summarize([], time.perf_counter() - started, operations=len(records))
+
+
+def add_options(parser):
+    parser.add_argument(
+        "--records", type=int, default=200000, help="Records formatted per mode."
+    )
+
+
+def main():
+    args = parse_args(__doc__.strip().splitlines()[0], add_options)
+    records = _records(args.records)
+    results = {}
+    for fmt in (
+        "%(levelname) %(message)",
+        "%(asctime) %(levelname) %(name) %(message)",
+    ):
+        suffix = "asctime" if "asctime" in fmt else "default"
+        for fast in (False, True):
+            name = "{}_{}".format("fast" if fast else "regular", suffix)
+            results[name] = bench_format(
+                StackdriverJsonFormatter(fmt, fast=fast), records
+            )
+    settings = {"records": args.records}
+    finish("formatter", results, settings, args)
+
+
+if __name__ == "__main__":
+    main()
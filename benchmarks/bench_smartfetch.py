@@ -0,0 +1,197 @@
+"""
+Throughput, latency and memory benchmarks for SmartFetch against a local Eve stub.
+
+    python -m benchmarks.bench_smartfetch --requests 500 --concurrency 1,4,16
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import finish, parse_args, summarize, timed, traced_memory
+from benchmarks.stub_server import StubConfig, StubServer
+from cidc_utils.requests import AsyncSmartFetch, ResponseCache, SmartFetch
+
+
+def _item_ids(count: int) -> list:
+    return ["{:024x}".format(index) for index in range(count)]
+
+
+def bench_unpooled(url: str, count: int) -> dict:
+    """Module-level requests.get, a new connection per call, as a baseline."""
+    latencies = []
+    started = time.perf_counter()
+    for item_id in _item_ids(count):
+        _, elapsed = timed(requests.get, "{}/trials/{}".format(url, item_id))
+        latencies.append(elapsed)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_get(url: str, count: int, concurrency: int) -> dict:
+    """SmartFetch.get from `concurrency` threads sharing one client."""
+    with SmartFetch(url, pool_maxsize=concurrency) as fetch:
+
+        def one(item_id):
+            return timed(fetch.get, endpoint="trials", item_id=item_id)[1]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(one, _item_ids(count)))
+        return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_async_get(url: str, count: int, concurrency: int) -> dict:
+    """AsyncSmartFetch.get with `concurrency` requests in flight."""
+
+    async def run():
+        async with AsyncSmartFetch(url, max_concurrency=concurrency) as fetch:
+
+            async def one(item_id):
+                started = time.perf_counter()
+                await fetch.get(endpoint="trials", item_id=item_id)
+                return time.perf_counter() - started
+
+            return await asyncio.gather(*[one(item_id) for item_id in _item_ids(count)])
+
+    latencies, elapsed = timed(asyncio.run, run())
+    return summarize(list(latencies), elapsed)
+
+
+def bench_get_many(url: str, count: int, concurrency: int) -> dict:
+    """SmartFetch.get_many over `count` ids."""
+    with SmartFetch(url, pool_maxsize=concurrency) as fetch:
+        results, elapsed = timed(
+            fetch.get_many, _item_ids(count), endpoint="trials", max_workers=concurrency
+        )
+    summary = summarize([], elapsed, operations=len(results))
+    summary["failures"] = sum(not result.ok for result in results)
+    return summary
+
+
+def bench_conditional_get(url: str, count: int) -> dict:
+    """Repeated GETs of a small working set through the ETag cache."""
+    cache = ResponseCache()
+    item_ids = _item_ids(20)
+    with SmartFetch(url, response_cache=cache) as fetch:
+        latencies = []
+        started = time.perf_counter()
+        for index in range(count):
+            _, elapsed = timed(
+                fetch.get, endpoint="trials", item_id=item_ids[index % len(item_ids)]
+            )
+            latencies.append(elapsed)
+        summary = summarize(latencies, time.perf_counter() - started)
+    summary.update(cache.stats())
+    return summary
+
+
+def bench_iter_items(url: str, page_size: int) -> dict:
+    """Streams a whole collection with background page prefetch."""
+    with SmartFetch(url) as fetch:
+        summary = {}
+        with traced_memory(summary):
+            started = time.perf_counter()
+            count = 0
+            for _ in fetch.iter_items(
+                endpoint="samples", params={"max_results": page_size}
+            ):
+                count += 1
+            elapsed = time.perf_counter() - started
+    summary.update(summarize([], elapsed, operations=count))
+    return summary
+
+
+def bench_download(url: str) -> dict:
+    """Streams the large blob into a discarding sink."""
+
+    class NullSink(io.RawIOBase):
+        def write(self, chunk):
+            return len(chunk)
+
+    with SmartFetch(url) as fetch:
+        summary = {}
+        with traced_memory(summary):
+            written, elapsed = timed(fetch.download, NullSink(), endpoint="blob")
+    summary.update(summarize([elapsed], elapsed, operations=1))
+    summary["mb_per_s"] = round(written / (1024 * 1024) / elapsed, 1)
+    return summary
+
+
+def bench_post_bulk(url: str, count: int, concurrency: int) -> dict:
+    """Inserts `count` documents through post_bulk."""
+    documents = (
+        {"trial": "trial-1", "sample_id": "sample-{}".format(index), "processed": False}
+        for index in range(count)
+    )
+    with SmartFetch(url, pool_maxsize=concurrency) as fetch:
+        results, elapsed = timed(
+            fetch.post_bulk,
+            documents,
+            endpoint="data",
+            max_documents=250,
+            max_workers=concurrency,
+        )
+    summary = summarize([], elapsed, operations=len(results))
+    summary["failures"] = sum(not result.ok for result in results)
+    return summary
+
+
+def add_options(parser):
+    parser.add_argument("--requests", type=int, default=500, help="Requests per run.")
+    parser.add_argument(
+        "--concurrency", default="1,4,16", help="Comma-separated concurrency levels."
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Injected server latency in ms."
+    )
+    parser.add_argument(
+        "--collection-size", type=int, default=5000, help="Documents per collection."
+    )
+    parser.add_argument("--page-size", type=int, default=100, help="Page size.")
+    parser.add_argument(
+        "--blob-mb", type=int, default=64, help="Size of the streamed download."
+    )
+    parser.add_argument(
+        "--bulk-documents", type=int, default=10000, help="Documents for post_bulk."
+    )
+
+
+def main():
+    args = parse_args(__doc__.strip().splitlines()[0], add_options)
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    config = StubConfig(
+        latency=args.latency / 1000,
+        collection_size=args.collection_size,
+        page_size=args.page_size,
+        blob_bytes=args.blob_mb * 1024 * 1024,
+    )
+    results = {}
+    with StubServer(config) as server:
+        url = server.url
+        results["get_unpooled_c1"] = bench_unpooled(url, args.requests)
+        for level in levels:
+            results["get_c{}".format(level)] = bench_get(url, args.requests, level)
+            results["async_get_c{}".format(level)] = bench_async_get(
+                url, args.requests, level
+            )
+            results["get_many_c{}".format(level)] = bench_get_many(
+                url, args.requests, level
+            )
+        results["conditional_get_c1"] = bench_conditional_get(url, args.requests)
+        results["iter_items"] = bench_iter_items(url, args.page_size)
+        results["download"] = bench_download(url)
+        results["post_bulk_c{}".format(max(levels))] = bench_post_bulk(
+            url, args.bulk_documents, max(levels)
+        )
+    settings = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("output", "compare", "no_save")
+    }
+    finish("smartfetch", results, settings, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Shared helpers for timing benchmarks and storing their results.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """
+    Arguments:
+        sorted_values {list} -- Ascending samples.
+        q {float} -- Quantile between 0 and 1.
+
+    Returns:
+        float -- Nearest-rank percentile, 0.0 for no samples.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: list, elapsed: float, operations: int = None) -> dict:
+    """
+    Arguments:
+        latencies {list} -- Per-operation latencies in seconds.
+        elapsed {float} -- Wall-clock seconds for the whole run.
+
+    Keyword Arguments:
+        operations {int} -- Operation count, if different from len(latencies).
+
+    Returns:
+        dict -- Throughput, and latency percentiles in milliseconds when sampled.
+    """
+    latencies = sorted(latencies)
+    operations = len(latencies) if operations is None else operations
+    summary = {
+        "operations": operations,
+        "elapsed_s": round(elapsed, 4),
+        "ops_per_s": round(operations / elapsed, 1) if elapsed else 0.0,
+    }
+    if latencies:
+        summary["p50_ms"] = round(percentile(latencies, 0.50) * 1000, 3)
+        summary["p95_ms"] = round(percentile(latencies, 0.95) * 1000, 3)
+        summary["p99_ms"] = round(percentile(latencies, 0.99) * 1000, 3)
+    summary["max_rss_mb"] = round(max_rss_mb(), 1)
+    return summary
+
+
+def max_rss_mb() -> float:
+    """
+    Returns:
+        float -- Peak resident set size of this process so far, in MiB.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+@contextmanager
+def traced_memory(result: dict):
+    """
+    Records the peak Python allocation inside the block as result["peak_alloc_mb"].
+
+    Arguments:
+        result {dict} -- Dict to store the measurement in.
+    """
+    tracemalloc.start()
+    try:
+        yield result
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_alloc_mb"] = round(peak / (1024 * 1024), 2)
+
+
+def timed(func, *args, **kwargs):
+    """
+    Returns:
+        tuple -- (result of func, seconds it took).
+    """
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def parse_args(description: str, extra=None) -> argparse.Namespace:
+    """
+    Builds the command line shared by every benchmark script.
+
+    Arguments:
+        description {str} -- Help text.
+
+    Keyword Arguments:
+        extra {Callable} -- Adds script-specific options to the parser.
+
+    Returns:
+        argparse.Namespace -- Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--output", default=RESULTS_DIR, help="Directory to store the JSON results in."
+    )
+    parser.add_argument(
+        "--compare", default=None, help="Previous results file to compare against."
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="Print results without storing them."
+    )
+    if extra:
+        extra(parser)
+    return parser.parse_args()
+
+
+def save_results(suite: str, results: dict, settings: dict, directory: str) -> str:
+    """
+    Stores a run as JSON so later runs can be compared against it.
+
+    Arguments:
+        suite {str} -- Benchmark suite name.
+        results {dict} -- Scenario name to measurements.
+        settings {dict} -- Parameters the run used.
+        directory {str} -- Output directory.
+
+    Returns:
+        str -- Path of the written file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, "{}-{}.json".format(suite, stamp))
+    with open(path, "w") as handle:
+        json.dump(
+            {
+                "suite": suite,
+                "timestamp": stamp,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "settings": settings,
+                "results": results,
+            },
+            handle,
+            indent=2,
+            sort_keys=True,
+        )
+    return path
+
+
+def print_results(results: dict, previous: dict = None):
+    """
+    Prints every scenario, with the relative change against a previous run.
+
+    Arguments:
+        results {dict} -- Scenario name to measurements.
+
+    Keyword Arguments:
+        previous {dict} -- Results of an earlier run. (default: {None})
+    """
+    for scenario, measurements in results.items():
+        print(scenario)
+        before = (previous or {}).get(scenario, {})
+        for key, value in measurements.items():
+            line = "    {:<16} {}".format(key, value)
+            old = before.get(key)
+            numeric = isinstance(value, (int, float)) and isinstance(old, (int, float))
+            if numeric and old:
+                line += "  ({:+.1f}%)".format((value - old) / old * 100)
+            print(line)
+
+
+def finish(suite: str, results: dict, settings: dict, args: argparse.Namespace):
+    """
+    Prints, compares and stores the results of a run.
+
+    Arguments:
+        suite {str} -- Benchmark suite name.
+        results {dict} -- Scenario name to measurements.
+        settings {dict} -- Parameters the run used.
+        args {argparse.Namespace} -- Parsed command line.
+    """
+    previous = None
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = json.load(handle)["results"]
+    print_results(results, previous)
+    if not args.no_save:
+        print("Saved", save_results(suite, results, settings, args.output))
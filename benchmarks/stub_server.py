@@ -0,0 +1,210 @@
+"""
+In-process HTTP stub imitating the Eve API, for offline benchmarks.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubConfig:
+    """
+    Behaviour of the stub server. Attributes may be changed while it is running.
+
+    Arguments:
+        latency {float} -- Seconds to sleep before answering each request.
+        status_overrides {dict} -- Maps a path prefix to a forced status code.
+        collection_size {int} -- Number of documents in every collection.
+        page_size {int} -- Default `max_results` per page.
+        document_bytes {int} -- Approximate size of each generated document.
+        blob_bytes {int} -- Size of the body served under /blob.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        status_overrides: dict = None,
+        collection_size: int = 1000,
+        page_size: int = 25,
+        document_bytes: int = 256,
+        blob_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.latency = latency
+        self.status_overrides = status_overrides or {}
+        self.collection_size = collection_size
+        self.page_size = page_size
+        self.document_bytes = document_bytes
+        self.blob_bytes = blob_bytes
+
+
+class _EveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Without this, small header and body writes stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def _send(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, payload, headers: dict = None):
+        headers = dict(headers or {})
+        headers["Content-Type"] = "application/json"
+        self._send(status, json.dumps(payload).encode(), headers)
+
+    def _prologue(self):
+        """Applies latency and forced statuses. Returns True if already answered."""
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        path = urlsplit(self.path).path
+        for prefix, status in self.config.status_overrides.items():
+            if path.startswith(prefix):
+                self._send_json(status, {"_status": "ERR"})
+                return True
+        return False
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _document(self, collection: str, index: int) -> dict:
+        filler = "x" * max(self.config.document_bytes - 120, 0)
+        return {
+            "_id": "{:024x}".format(index),
+            "_etag": hashlib.md5(
+                "{}:{}".format(collection, index).encode()
+            ).hexdigest(),
+            "trial": "trial-{}".format(index % 10),
+            "sample_id": "sample-{}".format(index),
+            "filler": filler,
+        }
+
+    def do_GET(self):
+        if self._prologue():
+            return
+        parts = urlsplit(self.path)
+        segments = [segment for segment in parts.path.split("/") if segment]
+        query = parse_qs(parts.query)
+
+        if segments and segments[0] == "blob":
+            self._send_blob()
+            return
+        if len(segments) == 2:
+            try:
+                index = int(segments[1], 16)
+            except ValueError:
+                index = 0
+            document = self._document(segments[0], index)
+            etag = '"{}"'.format(document["_etag"])
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+                return
+            self._send_json(200, document, {"ETag": etag})
+            return
+
+        collection = segments[0] if segments else ""
+        page = int(query.get("page", ["1"])[0])
+        max_results = int(query.get("max_results", [self.config.page_size])[0])
+        start = (page - 1) * max_results
+        end = min(start + max_results, self.config.collection_size)
+        body = {
+            "_items": [self._document(collection, i) for i in range(start, end)],
+            "_meta": {
+                "page": page,
+                "max_results": max_results,
+                "total": self.config.collection_size,
+            },
+            "_links": {},
+        }
+        if end < self.config.collection_size:
+            body["_links"]["next"] = {
+                "href": "{}?max_results={}&page={}".format(
+                    collection, max_results, page + 1
+                )
+            }
+        self._send_json(200, body)
+
+    def _send_blob(self):
+        total = self.config.blob_bytes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(total))
+        self.end_headers()
+        chunk = b"\0" * 65536
+        remaining = total
+        while remaining > 0:
+            self.wfile.write(chunk[: min(remaining, len(chunk))])
+            remaining -= len(chunk)
+
+    def do_POST(self):
+        if self._prologue():
+            return
+        body = self._read_body()
+        if urlsplit(self.path).path.startswith("/blob"):
+            self._send_json(201, {"_status": "OK", "received": len(body)})
+            return
+        override = self.headers.get("X-HTTP-Method-Override")
+        if override in ("PATCH", "PUT"):
+            self._send_json(200, {"_status": "OK"})
+            return
+        payload = json.loads(body or b"{}")
+        documents = payload if isinstance(payload, list) else [payload]
+        items = [
+            {"_status": "OK", "_id": "{:024x}".format(i), "_etag": "e"}
+            for i in range(len(documents))
+        ]
+        if len(items) == 1:
+            self._send_json(201, items[0])
+        else:
+            self._send_json(201, {"_status": "OK", "_items": items})
+
+    def do_DELETE(self):
+        if self._prologue():
+            return
+        self._send(204)
+
+
+class StubServer:
+    """
+    Runs the Eve stub on a background thread on a free localhost port.
+    Use as a context manager.
+    """
+
+    def __init__(self, config: StubConfig = None):
+        self.config = config or StubConfig()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _EveHandler)
+        self._server.daemon_threads = True
+        self._server.config = self.config
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}".format(self._server.server_port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
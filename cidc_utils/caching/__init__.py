@@ -3,4 +3,11 @@
 Caching module
 """
 
-from cidc_utils.caching.credential_cache import CredentialCache
+from cidc_utils.caching.concurrent_cache import ConcurrentCredentialCache
+from cidc_utils.caching.credential_cache import (
+    CachedToken,
+    CredentialCache,
+    decode_claims,
+)
+from cidc_utils.caching.token_provider import TokenProvider
+from cidc_utils.caching.shared_cache import SharedCredentialCache
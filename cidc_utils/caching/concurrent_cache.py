@@ -0,0 +1,175 @@
+"""
+Thread-safe credential cache with striped locks and lock-free reads.
+"""
+import threading
+import time
+from typing import Optional
+
+from cidc_utils.caching.credential_cache import DEFAULT_IDENTITY, CachedToken
+
+
+class ConcurrentCredentialCache:
+    """
+    CredentialCache interface for multi-threaded servers.
+
+    Identities are spread over `stripes` dicts, each with its own lock, so
+    writers for different identities rarely contend. Lookups take no lock at all:
+    a slot is an immutable (entry, deadline) tuple swapped in with a single dict
+    assignment, so a reader sees either the old or the new slot, never a mix.
+    Removing an expired slot takes the stripe lock and only removes that same
+    slot, so a token cached concurrently is never lost.
+
+    Expiry matches CredentialCache: an entry's own `exp`, or `ttl` seconds for
+    tokens without one. Each stripe keeps at most maxsize / stripes identities,
+    dropping the one added first.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, stripes: int = 16):
+        """
+        Keyword Arguments:
+            maxsize {int} -- Entries kept. (default: {1024})
+            ttl {float} -- Lifetime of tokens without an exp claim.
+                (default: {3600.0})
+            stripes {int} -- Number of independently locked partitions.
+                (default: {16})
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = time.monotonic
+        self._stripe_size = max(1, -(-maxsize // stripes))
+        self._maps = [{} for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, identity: str) -> int:
+        return hash(identity) % len(self._maps)
+
+    def _live(self, slot: tuple) -> bool:
+        entry, deadline = slot
+        if deadline is not None and self.timer() > deadline:
+            return False
+        return not entry.expired()
+
+    def cache_key(self, key, identity: str = DEFAULT_IDENTITY) -> CachedToken:
+        """
+        Adds an access key to the cache
+
+        Arguments:
+            key {str} -- Google access token.
+
+        Keyword Arguments:
+            identity {str} -- User or subject the token belongs to.
+                (default: {"access_token"})
+
+        Returns:
+            CachedToken -- The stored entry.
+        """
+        # Decoded outside the lock; only the swap is serialized.
+        entry = CachedToken.from_token(key)
+        deadline = self.timer() + self.ttl if entry.expires_at is None else None
+        index = self._stripe(identity)
+        stripe = self._maps[index]
+        with self._locks[index]:
+            # A plain assignment, so concurrent readers never see the key missing.
+            stripe[identity] = (entry, deadline)
+            while len(stripe) > self._stripe_size:
+                del stripe[next(iter(stripe))]
+        return entry
+
+    def get(self, identity: str, default=None) -> Optional[CachedToken]:
+        """
+        Arguments:
+            identity {str} -- User or subject.
+
+        Returns:
+            Optional[CachedToken] -- The stored entry, even past its exp, unless
+            its ttl ran out.
+        """
+        slot = self._maps[self._stripe(identity)].get(identity)
+        if slot is None or (slot[1] is not None and self.timer() > slot[1]):
+            return default
+        return slot[0]
+
+    def pop(self, identity: str, default=None) -> Optional[CachedToken]:
+        """
+        Removes an entry.
+
+        Arguments:
+            identity {str} -- User or subject.
+
+        Returns:
+            Optional[CachedToken] -- The removed entry.
+        """
+        index = self._stripe(identity)
+        with self._locks[index]:
+            slot = self._maps[index].pop(identity, None)
+        return default if slot is None else slot[0]
+
+    def get_entry(self, identity: str = DEFAULT_IDENTITY) -> Optional[CachedToken]:
+        """
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[CachedToken] -- The live entry, or None if absent or expired.
+        """
+        index = self._stripe(identity)
+        slot = self._maps[index].get(identity)
+        if slot is None:
+            return None
+        if self._live(slot):
+            return slot[0] if slot[0].token else None
+        with self._locks[index]:
+            # Only drop the slot we saw expire, not one stored since.
+            if self._maps[index].get(identity) is slot:
+                del self._maps[index][identity]
+        return None
+
+    def get_key(self, identity: str = DEFAULT_IDENTITY) -> Optional[str]:
+        """
+        Retreive key from cache.
+
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[str] -- The token, or None if absent or expired.
+        """
+        entry = self.get_entry(identity)
+        return entry.token if entry else None
+
+    def get_claims(self, identity: str = DEFAULT_IDENTITY) -> Optional[dict]:
+        """
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[dict] -- Decoded claims of the live token, if it is a JWT.
+        """
+        entry = self.get_entry(identity)
+        return entry.claims if entry else None
+
+    def purge_expired(self) -> int:
+        """
+        Drops every expired entry, one stripe at a time.
+
+        Returns:
+            int -- Number of entries dropped.
+        """
+        dropped = 0
+        for stripe, lock in zip(self._maps, self._locks):
+            with lock:
+                expired = [
+                    identity
+                    for identity, slot in stripe.items()
+                    if not self._live(slot)
+                ]
+                for identity in expired:
+                    del stripe[identity]
+            dropped += len(expired)
+        return dropped
+
+    def __len__(self):
+        return sum(len(stripe) for stripe in self._maps)
+
+    def __contains__(self, identity):
+        return self.get(identity) is not None
@@ -1,50 +1,218 @@
 """
 Defines caching before for user preferences
 """
-
 import jwt
 import time
-from cachetools import TTLCache
-from typing import Optional
+from cachetools import LRUCache
+from typing import NamedTuple, Optional
+
+DEFAULT_IDENTITY = "access_token"
+
+# Claims are only read here, never trusted: the API validates the token itself.
+_UNVERIFIED = {
+    "verify_signature": False,
+    "verify_exp": False,
+    "verify_nbf": False,
+    "verify_iat": False,
+    "verify_aud": False,
+}
+
+
+class CachedToken(NamedTuple):
+    """
+    A token with its claims decoded once, when it was cached. `expires_at` is the
+    `exp` claim, or None for tokens that aren't JWTs or carry no `exp`.
+    """
+
+    token: str
+    claims: Optional[dict] = None
+    expires_at: Optional[float] = None
+
+    @classmethod
+    def from_token(cls, token: str) -> "CachedToken":
+        """
+        Arguments:
+            token {str} -- Encoded token.
+
+        Returns:
+            CachedToken -- The token with its claims decoded, unverified.
+        """
+        claims = decode_claims(token) if token else None
+        expires_at = None
+        if claims and isinstance(claims.get("exp"), (int, float)):
+            expires_at = float(claims["exp"])
+        return cls(token, claims, expires_at)
+
+    def expired(self, now: float = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return (time.time() if now is None else now) > self.expires_at
 
 
-class CredentialCache(TTLCache):
+def decode_claims(token: str) -> Optional[dict]:
     """
-    Subclass of TTLCache that temporarily stores and retreives user login credentials
+    Reads the claims of a JWT without verifying it.
 
     Arguments:
-        TTLCache {TTLCache} -- A TTLCache object
+        token {str} -- Encoded token.
+
+    Returns:
+        Optional[dict] -- Claims, or None if the token isn't a JWT.
+    """
+    try:
+        return jwt.decode(token, options=_UNVERIFIED)
+    except jwt.exceptions.InvalidTokenError:
+        return None
+
+
+class CredentialCache(LRUCache):
+    """
+    Subclass of LRUCache that temporarily stores and retreives user login credentials
+
+    Each identity (a user, subject or service account) has its own entry holding
+    the token, its decoded claims and its expiry, so lookups never decode again.
+    An entry expires at its own `exp`; the cache-wide ttl only bounds tokens
+    without one. When the cache is full, expired entries go first, then the
+    least recently used.
+
+    Like LRUCache, this class is not thread-safe; multi-threaded servers should
+    use ConcurrentCredentialCache.
+
+    Arguments:
+        LRUCache {LRUCache} -- A LRUCache object
 
     Returns:
         CredentialCache -- [description]
     """
 
-    def cache_key(self, key):
+    def __init__(self, maxsize, ttl, timer=time.monotonic, getsizeof=None):
+        """
+        Arguments:
+            maxsize {int} -- Entries kept.
+            ttl {float} -- Lifetime of tokens without an exp claim.
+
+        Keyword Arguments:
+            timer {Callable} -- Clock used for expiry. (default: {time.monotonic})
+            getsizeof {Callable} -- Size of an entry. (default: {None})
+        """
+        LRUCache.__init__(self, maxsize, getsizeof)
+        self.ttl = ttl
+        self.timer = timer
+        # Expiry per identity, on the timer's clock.
+        self._deadlines = {}
+
+    def _deadline(self, entry, now: float) -> float:
+        """
+        The entry's exp converted to the cache timer, or now + ttl.
+        """
+        expires_at = getattr(entry, "expires_at", None)
+        if expires_at is None:
+            return now + self.ttl
+        return now + (expires_at - time.time())
+
+    def __setitem__(self, identity, entry):
+        now = self.timer()
+        deadline = self._deadline(entry, now)
+        if deadline <= now:
+            # Already expired: never stored, and replaces any older entry.
+            self.pop(identity, None)
+            return
+        if identity not in self and len(self) >= self.maxsize:
+            self.purge_expired()
+        LRUCache.__setitem__(self, identity, entry)
+        self._deadlines[identity] = deadline
+
+    def __delitem__(self, identity):
+        LRUCache.__delitem__(self, identity)
+        self._deadlines.pop(identity, None)
+
+    def get(self, identity, default=None):
+        """
+        Arguments:
+            identity {str} -- User or subject.
+
+        Returns:
+            Optional[CachedToken] -- The entry, or default if absent or expired.
+        """
+        deadline = self._deadlines.get(identity)
+        if deadline is None:
+            return default
+        if deadline <= self.timer():
+            self.pop(identity, None)
+            return default
+        return self[identity]
+
+    def cache_key(self, key, identity: str = DEFAULT_IDENTITY) -> CachedToken:
         """
         Adds an access key to the cache
 
         Arguments:
             key {str} -- Google access token.
+
+        Keyword Arguments:
+            identity {str} -- User or subject the token belongs to.
+                (default: {"access_token"})
+
+        Returns:
+            CachedToken -- The stored entry.
         """
-        self["access_token"] = key
+        entry = CachedToken.from_token(key)
+        self[identity] = entry
+        return entry
 
-    def get_key(self) -> Optional[str]:
+    def get_entry(self, identity: str = DEFAULT_IDENTITY) -> Optional[CachedToken]:
+        """
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[CachedToken] -- The live entry, or None if absent or expired.
+        """
+        entry = self.get(identity)
+        if entry is None or not entry.token:
+            return None
+        if entry.expired():
+            self.pop(identity, None)
+            return None
+        return entry
+
+    def get_key(self, identity: str = DEFAULT_IDENTITY) -> Optional[str]:
         """
         Retreive key from cache.
+
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[str] -- The token, or None if absent or expired.
+        """
+        entry = self.get_entry(identity)
+        return entry.token if entry else None
+
+    def get_claims(self, identity: str = DEFAULT_IDENTITY) -> Optional[dict]:
+        """
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[dict] -- Decoded claims of the live token, if it is a JWT.
+        """
+        entry = self.get_entry(identity)
+        return entry.claims if entry else None
+
+    def purge_expired(self) -> int:
+        """
+        Drops every entry past its own expiry.
+
+        Returns:
+            int -- Number of entries dropped.
         """
-        if "access_token" in self and self["access_token"]:
-            try:
-                decode = jwt.decode(self["access_token"], verify=False)
-                exp = decode["exp"]
-                if time.time() > exp:
-                    print(
-                        "Your token has expired! Please log in to the web portal and get a new token."
-                    )
-                    self["access_token"] = None
-                return self["access_token"]
-            except jwt.exceptions.DecodeError:
-                print("This token is not a valid JWT!")
-                if self["access_token"]:
-                    return self["access_token"]
-                else:
-                    return None
+        now = self.timer()
+        expired = [
+            identity
+            for identity, deadline in self._deadlines.items()
+            if deadline <= now
+        ]
+        for identity in expired:
+            self.pop(identity, None)
+        return len(expired)
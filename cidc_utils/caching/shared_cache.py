@@ -0,0 +1,214 @@
+"""
+Credential cache shared by every worker process on a host, backed by SQLite.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from cidc_utils.caching.credential_cache import DEFAULT_IDENTITY, CachedToken
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    identity TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    claims TEXT,
+    expires_at REAL,
+    stored_at REAL NOT NULL
+)
+"""
+
+
+class SharedCredentialCache:
+    """
+    CredentialCache interface over a SQLite file, so gunicorn or celery workers
+    on one host decode and fetch each token once between them.
+
+    The database runs in WAL mode: readers never block each other and writers
+    are serialized by SQLite's file lock. Expiry matches CredentialCache: an
+    entry stops being returned at its own `exp`, and tokens without one live
+    for `ttl` seconds. Only the `maxsize` most recently stored entries are kept.
+    """
+
+    def __init__(self, path: str, maxsize: int = 1024, ttl: float = 3600.0):
+        """
+        Arguments:
+            path {str} -- Database file; created if missing.
+
+        Keyword Arguments:
+            maxsize {int} -- Entries kept. (default: {1024})
+            ttl {float} -- Lifetime of tokens without an exp claim.
+                (default: {3600.0})
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        One connection per thread; sqlite3 connections are not shareable.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def cache_key(self, key, identity: str = DEFAULT_IDENTITY) -> CachedToken:
+        """
+        Adds an access key to the cache
+
+        Arguments:
+            key {str} -- Google access token.
+
+        Keyword Arguments:
+            identity {str} -- User or subject the token belongs to.
+                (default: {"access_token"})
+
+        Returns:
+            CachedToken -- The stored entry.
+        """
+        entry = CachedToken.from_token(key)
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO credentials VALUES (?, ?, ?, ?, ?)",
+                (
+                    identity,
+                    key or "",
+                    json.dumps(entry.claims) if entry.claims is not None else None,
+                    entry.expires_at,
+                    now,
+                ),
+            )
+            connection.execute(
+                "DELETE FROM credentials WHERE identity NOT IN "
+                "(SELECT identity FROM credentials ORDER BY stored_at DESC LIMIT ?)",
+                (self.maxsize,),
+            )
+        return entry
+
+    def get(self, identity: str, default=None) -> Optional[CachedToken]:
+        """
+        Arguments:
+            identity {str} -- User or subject.
+
+        Returns:
+            Optional[CachedToken] -- The stored entry, even past its exp, unless
+            its ttl ran out.
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT token, claims, expires_at, stored_at FROM credentials "
+                "WHERE identity = ?",
+                (identity,),
+            )
+            .fetchone()
+        )
+        if row is None or (row[2] is None and time.time() - row[3] > self.ttl):
+            return default
+        claims = json.loads(row[1]) if row[1] is not None else None
+        return CachedToken(row[0], claims, row[2])
+
+    def pop(self, identity: str, default=None) -> Optional[CachedToken]:
+        """
+        Removes an entry.
+
+        Arguments:
+            identity {str} -- User or subject.
+
+        Returns:
+            Optional[CachedToken] -- The removed entry.
+        """
+        entry = self.get(identity, default)
+        self._connection().execute(
+            "DELETE FROM credentials WHERE identity = ?", (identity,)
+        )
+        return entry
+
+    def get_entry(self, identity: str = DEFAULT_IDENTITY) -> Optional[CachedToken]:
+        """
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[CachedToken] -- The live entry, or None if absent or expired.
+        """
+        entry = self.get(identity)
+        if entry is None or not entry.token:
+            return None
+        if entry.expired():
+            self._connection().execute(
+                "DELETE FROM credentials WHERE identity = ? AND token = ?",
+                (identity, entry.token),
+            )
+            return None
+        return entry
+
+    def get_key(self, identity: str = DEFAULT_IDENTITY) -> Optional[str]:
+        """
+        Retreive key from cache.
+
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[str] -- The token, or None if absent or expired.
+        """
+        entry = self.get_entry(identity)
+        return entry.token if entry else None
+
+    def get_claims(self, identity: str = DEFAULT_IDENTITY) -> Optional[dict]:
+        """
+        Keyword Arguments:
+            identity {str} -- User or subject. (default: {"access_token"})
+
+        Returns:
+            Optional[dict] -- Decoded claims of the live token, if it is a JWT.
+        """
+        entry = self.get_entry(identity)
+        return entry.claims if entry else None
+
+    def purge_expired(self) -> int:
+        """
+        Drops every entry past its exp or ttl.
+
+        Returns:
+            int -- Number of entries dropped.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "DELETE FROM credentials WHERE expires_at < ? "
+            "OR (expires_at IS NULL AND stored_at < ?)",
+            (now, now - self.ttl),
+        )
+        return cursor.rowcount
+
+    def __len__(self):
+        return (
+            self._connection().execute("SELECT COUNT(*) FROM credentials").fetchone()[0]
+        )
+
+    def __contains__(self, identity):
+        return self.get(identity) is not None
+
+    def close(self):
+        """
+        Closes this thread's connection.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
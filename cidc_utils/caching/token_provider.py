@@ -0,0 +1,170 @@
+"""
+Access tokens refreshed ahead of expiry, for clients such as SmartFetch.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from cidc_utils.caching.concurrent_cache import ConcurrentCredentialCache
+from cidc_utils.caching.credential_cache import DEFAULT_IDENTITY, CredentialCache
+from cidc_utils.requests.coalescing import SingleFlight
+
+
+class TokenProvider:
+    """
+    Hands out a valid token for one identity, refreshing it with a user-supplied
+    callable.
+
+    Tokens live in a CredentialCache. A background thread refreshes the token
+    `refresh_margin` seconds before its `exp`, so callers normally never wait.
+    If a caller finds no live token, it refreshes inline, and concurrent callers
+    share that single refresh. `invalidate` drops a token the server rejected, so
+    the next `get_token` fetches a new one.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[], str],
+        cache: CredentialCache = None,
+        identity: str = DEFAULT_IDENTITY,
+        refresh_margin: float = 60.0,
+        retry_delay: float = 5.0,
+        background: bool = True,
+    ):
+        """
+        Arguments:
+            refresh {Callable[[], str]} -- Fetches a new access token.
+
+        Keyword Arguments:
+            cache {CredentialCache} -- Where tokens are kept; a private thread-safe
+                ConcurrentCredentialCache if None. (default: {None})
+            identity {str} -- Cache entry used by this provider.
+                (default: {"access_token"})
+            refresh_margin {float} -- Seconds before exp to refresh. (default: {60.0})
+            retry_delay {float} -- Wait after a failed background refresh.
+                (default: {5.0})
+            background {bool} -- Refresh ahead of expiry from a daemon thread.
+                (default: {True})
+        """
+        self.refresh = refresh
+        self.cache = cache if cache is not None else ConcurrentCredentialCache(16)
+        self.identity = identity
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._background = background
+        self._thread = None
+
+    def get_token(self) -> str:
+        """
+        Returns:
+            str -- A live token, refreshed inline only if there is none.
+        """
+        entry = self.cache.get_entry(self.identity)
+        if entry is None:
+            token = self.refresh_now()
+        else:
+            token = entry.token
+            if self._due(entry.expires_at):
+                if self._background:
+                    self._wake.set()
+                else:
+                    try:
+                        token = self.refresh_now()
+                    except Exception:  # pylint: disable=broad-except
+                        # Still valid until exp; the next call tries again.
+                        pass
+        self._ensure_thread()
+        return token
+
+    def refresh_now(self) -> str:
+        """
+        Fetches a new token, sharing the call with any refresh already running.
+
+        Returns:
+            str -- The new token.
+        """
+        return self._flight.do(self.identity, self._refresh)
+
+    def invalidate(self, token: str) -> None:
+        """
+        Drops `token` if it is still the cached one, e.g. after a 401. A newer
+        token cached in the meantime is kept.
+
+        Arguments:
+            token {str} -- The rejected token.
+        """
+        with self._lock:
+            entry = self.cache.get(self.identity)
+            if entry is not None and entry.token == token:
+                self.cache.pop(self.identity, None)
+
+    def close(self):
+        """
+        Stops the background refresh thread.
+        """
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(1)
+
+    def _refresh(self) -> str:
+        try:
+            token = self.refresh()
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+            raise
+        with self._lock:
+            self.cache.cache_key(token, identity=self.identity)
+            self.refreshes += 1
+        self._wake.set()
+        return token
+
+    def _due(self, expires_at: Optional[float]) -> bool:
+        return (
+            expires_at is not None and time.time() >= expires_at - self.refresh_margin
+        )
+
+    def _ensure_thread(self):
+        if not self._background or self._thread is not None or self._closed:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="TokenProvider-refresh", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        """
+        Sleeps until the token is due, then refreshes it.
+        """
+        while not self._closed:
+            entry = self.cache.get_entry(self.identity)
+            if entry is None or entry.expires_at is None:
+                # Nothing to refresh ahead of; wait until a token is cached.
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            wait = entry.expires_at - self.refresh_margin - time.time()
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            try:
+                self.refresh_now()
+                entry = self.cache.get_entry(self.identity)
+                if entry is None or not self._due(entry.expires_at):
+                    continue
+            except Exception:  # pylint: disable=broad-except
+                pass
+            # Failed, or the new token is already due: the current token is still
+            # usable until exp, so try again shortly rather than spin.
+            self._wake.wait(self.retry_delay)
+            self._wake.clear()
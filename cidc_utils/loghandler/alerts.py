@@ -0,0 +1,231 @@
+"""
+Background dispatch of e-mail alerts with de-duplication, digests and rate limits.
+"""
+import atexit
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, List
+
+_STOP = object()
+
+
+class AlertDispatcher:
+    """
+    Sends alerts from a background thread so logging never waits on the network.
+
+    `submit` only puts the alert on a bounded queue. The worker collects alerts for
+    `digest_interval` seconds and then sends one e-mail per recipient list: the
+    alert itself if there was only one, otherwise a digest. An alert identical to
+    one seen within `dedup_window` is only counted, and each recipient gets at
+    most `max_emails_per_recipient` e-mails per `rate_period`.
+    """
+
+    def __init__(
+        self,
+        sender: Callable[[str, str, List[str]], bool],
+        subject: str = "STACKDRIVER_NOTIFICATION",
+        digest_interval: float = 10.0,
+        dedup_window: float = 300.0,
+        max_emails_per_recipient: int = 20,
+        rate_period: float = 3600.0,
+        queue_size: int = 1000,
+        max_digest_alerts: int = 100,
+    ):
+        """
+        Arguments:
+            sender {Callable} -- Called as sender(subject, text, recipients); returns
+                True if the e-mail was accepted.
+
+        Keyword Arguments:
+            subject {str} -- Subject of alert e-mails. (default: {"STACKDRIVER_NOTIFICATION"})
+            digest_interval {float} -- Seconds alerts are collected before sending.
+                (default: {10.0})
+            dedup_window {float} -- Seconds an identical alert is suppressed for.
+                (default: {300.0})
+            max_emails_per_recipient {int} -- E-mails per recipient per rate_period.
+                (default: {20})
+            rate_period {float} -- Rate limit window in seconds. (default: {3600.0})
+            queue_size {int} -- Alerts waiting for the worker before new ones are
+                dropped. (default: {1000})
+            max_digest_alerts {int} -- Distinct alerts listed in one digest.
+                (default: {100})
+        """
+        self.sender = sender
+        self.subject = subject
+        self.digest_interval = digest_interval
+        self.dedup_window = dedup_window
+        self.max_emails_per_recipient = max_emails_per_recipient
+        self.rate_period = rate_period
+        self.max_digest_alerts = max_digest_alerts
+        self.clock = time.monotonic
+        self.counters = {
+            "submitted": 0,
+            "dropped": 0,
+            "suppressed_duplicates": 0,
+            "rate_limited": 0,
+            "sent_emails": 0,
+            "sent_alerts": 0,
+            "digests": 0,
+            "send_errors": 0,
+        }
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = OrderedDict()
+        self._seen = {}
+        self._sent_at = {}
+        self._flush_at = None
+        self._worker = threading.Thread(
+            target=self._run, name="AlertDispatcher", daemon=True
+        )
+        self._worker.start()
+        atexit.register(self.close)
+
+    def submit(self, message: str, recipients: List[str]):
+        """
+        Queues an alert without blocking; it is dropped if the queue is full.
+
+        Arguments:
+            message {str} -- Alert text.
+            recipients {List[str]} -- E-mail addresses to alert.
+        """
+        with self._lock:
+            self.counters["submitted"] += 1
+        try:
+            self._queue.put_nowait((str(message), tuple(recipients)))
+        except queue.Full:
+            with self._lock:
+                self.counters["dropped"] += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Sends everything queued so far without waiting for the digest interval.
+
+        Keyword Arguments:
+            timeout {float} -- Maximum seconds to wait. (default: {5.0})
+
+        Returns:
+            bool -- True if the worker finished in time.
+        """
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(deadline - time.monotonic(), 0))
+
+    def close(self, timeout: float = 5.0):
+        """
+        Sends pending alerts and stops the worker.
+
+        Keyword Arguments:
+            timeout {float} -- Maximum seconds to wait. (default: {5.0})
+        """
+        atexit.unregister(self.close)
+        if self._worker.is_alive():
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._worker.join(max(deadline - time.monotonic(), 0))
+
+    def _run(self):
+        """
+        Worker loop.
+        """
+        while True:
+            timeout = None
+            if self._flush_at is not None:
+                timeout = max(self._flush_at - self.clock(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._send_pending()
+                return
+            if isinstance(item, threading.Event):
+                self._send_pending()
+                item.set()
+                continue
+            if item is not None:
+                self._add(*item)
+            if self._flush_at is not None and self.clock() >= self._flush_at:
+                self._send_pending()
+
+    def _add(self, message: str, recipients: tuple):
+        now = self.clock()
+        alerts = self._pending.get(recipients)
+        key = (recipients, message)
+        if self._seen.get(key, 0) > now:
+            with self._lock:
+                self.counters["suppressed_duplicates"] += 1
+            if alerts is not None and message in alerts:
+                alerts[message] += 1
+            return
+        self._seen[key] = now + self.dedup_window
+        self._pending.setdefault(recipients, OrderedDict())[message] = 1
+        if self._flush_at is None:
+            self._flush_at = now + self.digest_interval
+
+    def _send_pending(self):
+        now = self.clock()
+        for recipients, alerts in self._pending.items():
+            allowed = [address for address in recipients if self._allow(address, now)]
+            with self._lock:
+                self.counters["rate_limited"] += len(recipients) - len(allowed)
+            if not allowed:
+                continue
+            subject, text = self._compose(alerts)
+            try:
+                sent = self.sender(subject, text, allowed)
+            except Exception:  # pylint: disable=broad-except
+                sent = False
+            with self._lock:
+                if sent:
+                    self.counters["sent_emails"] += 1
+                    self.counters["sent_alerts"] += len(alerts)
+                    self.counters["digests"] += len(alerts) > 1
+                else:
+                    self.counters["send_errors"] += 1
+        self._pending.clear()
+        self._flush_at = None
+        self._seen = {key: until for key, until in self._seen.items() if until > now}
+
+    def _allow(self, recipient: str, now: float) -> bool:
+        """
+        Sliding-window rate limit; records the send when it is allowed.
+        """
+        sent_at = self._sent_at.setdefault(recipient, deque())
+        while sent_at and sent_at[0] <= now - self.rate_period:
+            sent_at.popleft()
+        if len(sent_at) >= self.max_emails_per_recipient:
+            return False
+        sent_at.append(now)
+        return True
+
+    def _compose(self, alerts: OrderedDict) -> tuple:
+        """
+        Returns:
+            tuple -- (subject, text) for a single alert or a digest.
+        """
+        if len(alerts) == 1:
+            message, count = next(iter(alerts.items()))
+            if count == 1:
+                return self.subject, message
+        total = sum(alerts.values())
+        lines = [
+            "{} alerts ({} distinct) in the last {:.0f}s:".format(
+                total, len(alerts), self.digest_interval
+            ),
+            "",
+        ]
+        for index, (message, count) in enumerate(alerts.items()):
+            if index == self.max_digest_alerts:
+                lines.append("... and {} more".format(len(alerts) - index))
+                break
+            lines.append("[x{}] {}".format(count, message))
+        return "{} digest ({} alerts)".format(self.subject, total), "\n".join(lines)
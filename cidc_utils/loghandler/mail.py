@@ -0,0 +1,231 @@
+"""
+Pooled SendGrid client with bulk sending over batched personalizations.
+"""
+import threading
+from typing import List, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SENDGRID_HOST = "https://api.sendgrid.com"
+# SendGrid caps a single v3 mail/send request at 1000 recipients and 1000
+# personalizations.
+MAX_RECIPIENTS_PER_REQUEST = 1000
+MAX_PERSONALIZATIONS = 1000
+
+
+class MailMessage(NamedTuple):
+    """
+    One plain-text e-mail for `SendGridMailer.send_bulk`.
+    """
+
+    subject: str
+    text: str
+    to_emails: List[str]
+
+
+class MailResult(NamedTuple):
+    """
+    Outcome of one message in a bulk send. `status_code` is that of the last
+    request carrying the message.
+    """
+
+    index: int
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SendGridMailer:
+    """
+    Sends mail through the SendGrid v3 API over one pooled keep-alive session.
+
+    Payloads are built as plain v3 JSON rather than with the sendgrid helper
+    classes, whose interface differs between sendgrid releases. `host` may point
+    at a local stand-in; combined with `sandbox_mode` nothing is delivered.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        host: str = SENDGRID_HOST,
+        timeout: float = 10.0,
+        pool_maxsize: int = 4,
+    ):
+        """
+        Arguments:
+            api_key {str} -- SendGrid API key.
+
+        Keyword Arguments:
+            host {str} -- API base URL. (default: {SENDGRID_HOST})
+            timeout {float} -- Seconds to wait for each request. (default: {10.0})
+            pool_maxsize {int} -- Connections kept alive. (default: {4})
+        """
+        self.url = host.rstrip("/") + "/v3/mail/send"
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": "Bearer {}".format(api_key),
+                "Content-Type": "application/json",
+            }
+        )
+
+    def close(self):
+        """
+        Closes the pooled connections.
+        """
+        self.session.close()
+
+    def send(
+        self,
+        subject: str,
+        message_text: str,
+        to_emails: List[str],
+        send_from_email: str,
+        sandbox_mode: bool = False,
+    ) -> bool:
+        """
+        Sends one e-mail to every address in to_emails.
+
+        Arguments:
+            subject {str} -- Subject line of email.
+            message_text {str} -- Text of email.
+            to_emails {List[str]} -- Destination emails.
+            send_from_email {str} -- Sender address.
+
+        Keyword Arguments:
+            sandbox_mode {bool} -- Only validate, don't deliver. (default: {False})
+
+        Returns:
+            bool -- True if SendGrid accepted (or, in sandbox mode, validated) it.
+        """
+        message = MailMessage(subject, message_text, list(to_emails))
+        return self.send_bulk([message], send_from_email, sandbox_mode)[0].ok
+
+    def send_bulk(
+        self,
+        messages: List[MailMessage],
+        send_from_email: str,
+        sandbox_mode: bool = False,
+        max_recipients: int = MAX_RECIPIENTS_PER_REQUEST,
+    ) -> List[MailResult]:
+        """
+        Sends many messages in as few requests as SendGrid's limits allow.
+
+        Messages with the same text share a request, each as its own
+        personalization with its own subject and recipients, so recipients of one
+        message never see those of another. A message with more recipients than
+        fit in one request is split across several.
+
+        Arguments:
+            messages {List[MailMessage]} -- Messages to send.
+            send_from_email {str} -- Sender address.
+
+        Keyword Arguments:
+            sandbox_mode {bool} -- Only validate, don't deliver. (default: {False})
+            max_recipients {int} -- Recipients per request.
+                (default: {MAX_RECIPIENTS_PER_REQUEST})
+
+        Returns:
+            List[MailResult] -- One result per message, in input order.
+        """
+        results = [MailResult(index) for index in range(len(messages))]
+        by_text = {}
+        for index, message in enumerate(messages):
+            if not message.to_emails:
+                results[index] = MailResult(index, error="No recipients")
+                continue
+            by_text.setdefault(message.text, []).append(index)
+
+        for text, indices in by_text.items():
+            for personalizations, covered in self._pack(
+                messages, indices, max_recipients
+            ):
+                payload = {
+                    "personalizations": personalizations,
+                    "from": {"email": send_from_email},
+                    "subject": personalizations[0]["subject"],
+                    "content": [{"type": "text/plain", "value": text}],
+                    "mail_settings": {"sandbox_mode": {"enable": sandbox_mode}},
+                }
+                status_code, error = self._post(payload, sandbox_mode)
+                for index in covered:
+                    previous = results[index].error
+                    results[index] = MailResult(index, status_code, previous or error)
+        return results
+
+    @staticmethod
+    def _pack(messages: List[MailMessage], indices: List[int], max_recipients: int):
+        """
+        Yields (personalizations, message indices) for each request.
+        """
+        personalizations, covered, recipients = [], set(), 0
+        for index in indices:
+            message = messages[index]
+            addresses = list(message.to_emails)
+            while addresses:
+                full = recipients == max_recipients
+                if full or len(personalizations) == MAX_PERSONALIZATIONS:
+                    yield personalizations, covered
+                    personalizations, covered, recipients = [], set(), 0
+                # Fill the request up; the rest of the message goes in the next one.
+                chunk = addresses[: max_recipients - recipients]
+                addresses = addresses[len(chunk) :]
+                personalizations.append(
+                    {
+                        "to": [{"email": address} for address in chunk],
+                        "subject": message.subject,
+                    }
+                )
+                covered.add(index)
+                recipients += len(chunk)
+        if personalizations:
+            yield personalizations, covered
+
+    def _post(self, payload: dict, sandbox_mode: bool) -> tuple:
+        """
+        Returns:
+            tuple -- (status code or None, error message or None).
+        """
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as error:
+            return None, str(error)
+        # Sandbox mode answers 200 (OK) for valid input; a real send answers 202.
+        expected = 200 if sandbox_mode else 202
+        if response.status_code != expected:
+            return response.status_code, "{}: {}".format(
+                response.status_code, response.text[:500]
+            )
+        return response.status_code, None
+
+
+_MAILERS = {}
+_MAILERS_LOCK = threading.Lock()
+
+
+def get_mailer(api_key: str, host: str = SENDGRID_HOST) -> SendGridMailer:
+    """
+    Returns the mailer shared by every caller using the same API key and host.
+
+    Arguments:
+        api_key {str} -- SendGrid API key.
+
+    Keyword Arguments:
+        host {str} -- API base URL. (default: {SENDGRID_HOST})
+
+    Returns:
+        SendGridMailer -- Shared mailer.
+    """
+    key = (api_key, host)
+    with _MAILERS_LOCK:
+        if key not in _MAILERS:
+            _MAILERS[key] = SendGridMailer(api_key, host=host)
+        return _MAILERS[key]
@@ -5,19 +5,169 @@ A custom class to send logs to rabbitMQ
 __author__ = "Lloyd McCarthy"
 __license__ = "MIT"
 
+import json
 import logging
+import threading
+import time
+from collections import deque
+
 import kombu
 
+from cidc_utils.loghandler.serialization import EnvelopeSerializer, structured_record
+from cidc_utils.loghandler.spool import DiskSpool
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
 
 class RabbitMQHandler(logging.Handler):
     """
     Handler that sends message to RabbitMQ using kombu.
+
+    By default every record is published synchronously from the logging thread.
+    With `asynchronous=True`, `emit` only appends to a bounded in-memory buffer and
+    a background thread publishes it in batches, connecting lazily and
+    reconnecting after broker errors. `overflow` decides what happens when the
+    buffer is full: block the caller, drop the oldest record, or drop the new one.
+
+    Giving the asynchronous handler a `spool_dir` makes it spill records it
+    cannot publish to a size-capped on-disk spool instead of memory. Spooled
+    records are replayed in order, a batch at a time between batches of new
+    records, once the broker is reachable again. If the spool itself fails (disk
+    full, permissions), records fall back to the in-memory buffer.
+
+    With `structured=True` the handler ships the whole record, with the fields
+    StackdriverJsonFormatter produces, instead of only `record.msg`. Records are
+    packed into envelopes, one per batch in asynchronous mode, encoded as JSON or
+    BSON and optionally compressed.
     """
-    def __init__(self, uri=None, queue='logstash'):
+
+    def __init__(
+        self,
+        uri=None,
+        queue="logstash",
+        asynchronous=False,
+        buffer_size=10000,
+        batch_size=100,
+        flush_interval=1.0,
+        overflow=OVERFLOW_BLOCK,
+        connect_timeout=1,
+        reconnect_delay=1.0,
+        max_reconnect_delay=30.0,
+        close_timeout=5.0,
+        spool_dir=None,
+        spool_max_bytes=256 * 1024 * 1024,
+        spool_segment_bytes=16 * 1024 * 1024,
+        structured=False,
+        encoding="json",
+        compression=None,
+    ):
+        """
+        Keyword Arguments:
+            uri {str} -- Broker URI. (default: {None})
+            queue {str} -- Queue name. (default: {"logstash"})
+            asynchronous {bool} -- Publish from a background thread. (default: {False})
+            buffer_size {int} -- Records held before the overflow policy applies.
+                (default: {10000})
+            batch_size {int} -- Records published per batch. (default: {100})
+            flush_interval {float} -- Seconds to wait for a batch to fill up.
+                (default: {1.0})
+            overflow {str} -- "block", "drop_oldest" or "drop_newest". (default: {"block"})
+            connect_timeout {float} -- Broker connect timeout in seconds. (default: {1})
+            reconnect_delay {float} -- First wait after a broker error; doubles up to
+                max_reconnect_delay. (default: {1.0})
+            close_timeout {float} -- Seconds `close` waits for the buffer to drain.
+                (default: {5.0})
+            spool_dir {str} -- Directory for the on-disk spool; asynchronous mode
+                only. (default: {None})
+            spool_max_bytes {int} -- Cap on the spool size. (default: {256MiB})
+            spool_segment_bytes {int} -- Size of each spool segment file.
+                (default: {16MiB})
+            structured {bool} -- Ship structured records in envelopes.
+                (default: {False})
+            encoding {str} -- Envelope encoding, "json" or "bson". (default: {"json"})
+            compression {str} -- kombu compression for envelopes, such as "zlib".
+                (default: {None})
+        """
         logging.Handler.__init__(self)
-        connection = kombu.Connection(uri, connect_timeout=1)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of {}".format(OVERFLOW_POLICIES))
+        if spool_dir and not asynchronous:
+            raise ValueError("spool_dir requires asynchronous=True")
+        if (compression or encoding != "json") and not structured:
+            raise ValueError("encoding and compression require structured=True")
+        self.serializer = None
+        if structured:
+            self.serializer = EnvelopeSerializer(encoding, compression)
+        self.uri = uri
+        self.queue_name = queue
+        self.connect_timeout = connect_timeout
+        self.asynchronous = asynchronous
+        self.queue = None
+        self.connection = None
+
+        if not asynchronous:
+            self._connect()
+            return
+
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.close_timeout = close_timeout
+        self.spool = None
+        if spool_dir:
+            self.spool = DiskSpool(
+                spool_dir, max_bytes=spool_max_bytes, segment_bytes=spool_segment_bytes
+            )
+        self.counters = {
+            "emitted": 0,
+            "published": 0,
+            "dropped_oldest": 0,
+            "dropped_newest": 0,
+            "publish_errors": 0,
+            "reconnects": 0,
+            "spooled": 0,
+            "replayed": 0,
+            "spool_errors": 0,
+        }
+        self._buffer = deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._closing = False
+        self._stopped = False
+        # Set by close when the publisher outlives close_timeout.
+        self._release_on_exit = False
+        self._publisher = threading.Thread(
+            target=self._run, name="RabbitMQHandler-publisher", daemon=True
+        )
+        self._publisher.start()
+
+    def _connect(self):
+        """
+        Opens the broker connection and queue.
+        """
+        connection = kombu.Connection(self.uri, connect_timeout=self.connect_timeout)
         connection.connect()
-        self.queue = connection.SimpleQueue(queue)
+        self.connection = connection
+        self.queue = connection.SimpleQueue(self.queue_name)
+
+    def _disconnect(self):
+        """
+        Drops the current connection, ignoring errors from a broken one.
+        """
+        for resource in (self.queue, self.connection):
+            try:
+                if resource is not None:
+                    resource.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+        self.queue = None
+        self.connection = None
 
     def emit(self, record):
         """
@@ -25,13 +175,291 @@ class RabbitMQHandler(logging.Handler):
         Arguments:
             record {[type]} -- [description]
         """
-        self.queue.put(record.msg)
+        message = record.msg
+        if self.serializer is not None:
+            message = structured_record(record)
+        if not self.asynchronous:
+            self._publish([message])
+            return
+
+        with self._condition:
+            if self._closing:
+                return
+            self.counters["emitted"] += 1
+            if len(self._buffer) >= self.buffer_size:
+                if self.overflow == OVERFLOW_DROP_NEWEST:
+                    self.counters["dropped_newest"] += 1
+                    return
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    self._buffer.popleft()
+                    self.counters["dropped_oldest"] += 1
+                else:
+                    while len(self._buffer) >= self.buffer_size and not (
+                        self._closing or self._stopped
+                    ):
+                        self._condition.wait()
+                    if self._stopped and len(self._buffer) >= self.buffer_size:
+                        # Nothing will drain the buffer; don't block the caller.
+                        self.counters["dropped_newest"] += 1
+                        return
+            self._buffer.append(message)
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+
+    def _take_batch(self, wait=True) -> list:
+        """
+        Waits for a full batch, the flush interval, or shutdown, then takes a batch.
+
+        Keyword Arguments:
+            wait {bool} -- Wait for the batch to fill up. (default: {True})
+
+        Returns:
+            list -- Messages to publish, possibly empty.
+        """
+        with self._condition:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._buffer) < self.batch_size and not self._closing and wait:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+            self._in_flight = len(batch)
+            self._condition.notify_all()
+            return batch
+
+    def _publish(self, batch: list):
+        """
+        Publishes a batch, connecting first if needed. Structured records go out
+        as a single envelope.
+
+        Arguments:
+            batch {list} -- Messages to publish, in order.
+        """
+        if self.queue is None:
+            self._connect()
+        if self.serializer is not None:
+            if batch:
+                self.queue.put(
+                    self.serializer.encode(batch),
+                    **self.serializer.publish_options(len(batch))
+                )
+            return
+        for message in batch:
+            self.queue.put(message)
+
+    def _requeue(self, batch: list):
+        """
+        Puts an unpublished batch back at the front of the buffer, keeping order.
+        Whatever no longer fits is counted as dropped.
+
+        Arguments:
+            batch {list} -- Messages that failed to publish.
+        """
+        with self._condition:
+            room = max(self.buffer_size - len(self._buffer), 0)
+            kept = batch[:room]
+            self.counters["dropped_oldest"] += len(batch) - len(kept)
+            self._buffer.extendleft(reversed(kept))
+
+    def _spill(self, batch: list) -> bool:
+        """
+        Writes messages that can't be published right now to the spool. If the
+        spool fails, they go back to the buffer, or are dropped when closing.
+
+        Arguments:
+            batch {list} -- Messages, in order.
+
+        Returns:
+            bool -- True if the messages were spooled.
+        """
+        try:
+            if batch:
+                self.spool.append([encode_spooled(message) for message in batch])
+        except (OSError, ValueError):
+            with self._condition:
+                self.counters["spool_errors"] += 1
+                self._in_flight = 0
+                closing = self._closing
+                if closing:
+                    self.counters["dropped_oldest"] += len(batch)
+                self._condition.notify_all()
+            if not closing:
+                self._requeue(batch)
+            return False
+        with self._condition:
+            self.counters["spooled"] += len(batch)
+            self._in_flight = 0
+            self._condition.notify_all()
+        return True
+
+    def _wait_until(self, deadline: float):
+        """
+        Sleeps until deadline, waking early when the handler closes.
+        """
+        with self._condition:
+            remaining = deadline - time.monotonic()
+            if remaining > 0 and not self._closing:
+                self._condition.wait(remaining)
+
+    def _run(self):
+        """
+        Background publisher thread. However it exits, blocked emitters are
+        released, and the broker and spool too if close stopped waiting for it.
+        """
+        try:
+            self._publish_loop()
+        finally:
+            with self._condition:
+                self._stopped = True
+                release = self._release_on_exit
+                self._condition.notify_all()
+            if release:
+                self._release()
+
+    def _publish_loop(self):
+        """
+        Publishes buffered and spooled records until the handler closes.
+        """
+        delay = self.reconnect_delay
+        retry_at = 0.0
+        while True:
+            broker_up = time.monotonic() >= retry_at
+            with self._condition:
+                closing = self._closing
+            replay = broker_up and not closing and self.spool is not None
+            replay = replay and len(self.spool) > 0
+            batch = self._take_batch(wait=not replay)
+            if not batch and not replay:
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+                    if self._closing and not self._buffer:
+                        return
+                continue
+            if batch and not broker_up:
+                # The broker is known to be down; don't wait on it, spill to disk.
+                if not self._spill(batch):
+                    self._wait_until(retry_at)
+                continue
+
+            try:
+                if batch:
+                    self._publish(batch)
+                    with self._condition:
+                        self.counters["published"] += len(batch)
+                        self._in_flight = 0
+                        self._condition.notify_all()
+                    batch = []
+                if replay:
+                    records, position = self.spool.read(self.batch_size)
+                    self._publish([decode_spooled(record) for record in records])
+                    self.spool.commit(position)
+                    with self._condition:
+                        self.counters["replayed"] += len(records)
+            except Exception:  # pylint: disable=broad-except
+                self._disconnect()
+                with self._condition:
+                    self.counters["publish_errors"] += 1
+                    self.counters["reconnects"] += 1
+                    self._in_flight = 0
+                    closing = self._closing
+                if self.spool is not None:
+                    retry_at = time.monotonic() + delay
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    if not self._spill(batch):
+                        self._wait_until(retry_at)
+                    continue
+                if closing:
+                    # Give up on the broker at shutdown rather than hang.
+                    with self._condition:
+                        self.counters["dropped_oldest"] += len(batch) + len(
+                            self._buffer
+                        )
+                        self._buffer.clear()
+                        self._condition.notify_all()
+                    return
+                self._requeue(batch)
+                self._wait_until(time.monotonic() + delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            delay = self.reconnect_delay
+
+    def flush(self, timeout=None):
+        """
+        Waits until every buffered record has been published or spooled.
+
+        Keyword Arguments:
+            timeout {float} -- Maximum seconds to wait. (default: {close_timeout})
+
+        Returns:
+            bool -- True if the buffer drained in time.
+        """
+        if not self.asynchronous:
+            return True
+        if timeout is None:
+            timeout = self.close_timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+            while (self._buffer or self._in_flight) and self._publisher.is_alive():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return not self._buffer
 
     def close(self):
         """
-        Closes the queue.
+        Closes the queue. If the publisher is still running after close_timeout,
+        it closes the queue, connection and spool itself when it exits.
+        """
+        if self.asynchronous:
+            with self._condition:
+                self._closing = True
+                self._condition.notify_all()
+            self._publisher.join(self.close_timeout)
+            with self._condition:
+                self._release_on_exit = not self._stopped
+            if self._release_on_exit:
+                logging.Handler.close(self)
+                return None
+        self._release()
+        logging.Handler.close(self)
+
+    def _release(self):
+        """
+        Closes the queue, connection and spool.
         """
         try:
             self.queue.close()
         except AttributeError:
-            return None
\ No newline at end of file
+            return None
+        finally:
+            if self.connection is not None:
+                self.connection.release()
+            if self.asynchronous and self.spool is not None:
+                self.spool.close()
+
+
+def encode_spooled(message) -> bytes:
+    """
+    Arguments:
+        message {object} -- Log message as it would be put on the queue.
+
+    Returns:
+        bytes -- Spool record.
+    """
+    return json.dumps(message, default=str).encode("utf-8")
+
+
+def decode_spooled(record: bytes):
+    """
+    Arguments:
+        record {bytes} -- Spool record.
+
+    Returns:
+        object -- The log message.
+    """
+    return json.loads(record.decode("utf-8"))
@@ -0,0 +1,196 @@
+"""
+Log filter that bounds volume per category and level during incident storms.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict
+
+SUMMARY_CATEGORY = "LOG_SAMPLING"
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits and samples records per (category, level).
+
+    The first `keep_first` occurrences of each distinct message in a summary
+    window always pass, so every distinct problem stays visible. Beyond that a
+    record is kept with probability `sample_rate` and only if the token bucket of
+    its (category, level) has a token left: `rate` per second, up to `burst`.
+    Every `summary_interval` seconds a WARNING record in category LOG_SAMPLING
+    reports how many records were suppressed per key.
+
+    `overrides` maps "CATEGORY" or "CATEGORY:LEVEL" to any of rate, burst,
+    sample_rate and keep_first, e.g. {"EMAIL": {"rate": 1}}.
+    """
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        burst: int = 100,
+        sample_rate: float = 1.0,
+        keep_first: int = 10,
+        summary_interval: float = 60.0,
+        overrides: Dict[str, dict] = None,
+        max_tracked_messages: int = 10000,
+    ):
+        """
+        Keyword Arguments:
+            rate {float} -- Records per second per key after the burst. (default: {20.0})
+            burst {int} -- Bucket size. (default: {100})
+            sample_rate {float} -- Fraction of records over keep_first considered.
+                (default: {1.0})
+            keep_first {int} -- Occurrences of each message always kept per window.
+                (default: {10})
+            summary_interval {float} -- Seconds between summary records.
+                (default: {60.0})
+            overrides {Dict[str, dict]} -- Settings per category or category:level.
+                (default: {None})
+            max_tracked_messages {int} -- Distinct messages counted per window;
+                messages past this get no free pass. (default: {10000})
+        """
+        logging.Filter.__init__(self)
+        self.defaults = {
+            "rate": rate,
+            "burst": burst,
+            "sample_rate": sample_rate,
+            "keep_first": keep_first,
+        }
+        self.overrides = overrides or {}
+        self.summary_interval = summary_interval
+        self.max_tracked_messages = max_tracked_messages
+        self.clock = time.monotonic
+        self.random = random.random
+        self.handler = None
+        self._lock = threading.Lock()
+        self._settings = {}
+        self._buckets = {}
+        self._occurrences = {}
+        self._suppressed = {}
+        self._window_started = None
+
+    def attach(self, handler: logging.Handler) -> logging.Handler:
+        """
+        Adds the filter to a handler and sends summaries through it.
+
+        Arguments:
+            handler {logging.Handler} -- Handler to filter.
+
+        Returns:
+            logging.Handler -- The same handler.
+        """
+        handler.addFilter(self)
+        self.handler = handler
+        return handler
+
+    def filter(self, record) -> bool:
+        if getattr(record, "_sampling_summary", False):
+            return True
+        category = _category(record)
+        key = "{}:{}".format(category, record.levelname)
+        now = self.clock()
+        with self._lock:
+            if self._window_started is None:
+                self._window_started = now
+            summary = None
+            if now - self._window_started >= self.summary_interval:
+                summary = self._take_summary(now)
+            keep = self._decide(key, category, record, now)
+            if not keep:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+        if summary:
+            self._emit_summary(summary)
+        return keep
+
+    def flush_summary(self):
+        """
+        Emits a summary of suppressed records now, if there were any.
+        """
+        with self._lock:
+            summary = self._take_summary(self.clock())
+        if summary:
+            self._emit_summary(summary)
+
+    def _decide(self, key: str, category: str, record, now: float) -> bool:
+        settings = self._settings.get(key)
+        if settings is None:
+            settings = dict(self.defaults)
+            settings.update(self.overrides.get(category, {}))
+            settings.update(self.overrides.get(key, {}))
+            self._settings[key] = settings
+
+        message = _message_key(record)
+        seen = self._occurrences.get((key, message))
+        if seen is None and len(self._occurrences) < self.max_tracked_messages:
+            seen = 0
+        if seen is not None:
+            self._occurrences[(key, message)] = seen + 1
+            if seen < settings["keep_first"]:
+                return True
+
+        if settings["sample_rate"] < 1.0 and self.random() >= settings["sample_rate"]:
+            return False
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(settings["burst"], now)
+        bucket.tokens = min(
+            settings["burst"], bucket.tokens + (now - bucket.updated) * settings["rate"]
+        )
+        bucket.updated = now
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def _take_summary(self, now: float) -> dict:
+        suppressed = self._suppressed
+        self._suppressed = {}
+        self._occurrences = {}
+        self._window_started = now
+        return suppressed
+
+    def _emit_summary(self, suppressed: dict):
+        record = logging.LogRecord(
+            __name__,
+            logging.WARNING,
+            __file__,
+            0,
+            {
+                "message": "Suppressed {} log records".format(sum(suppressed.values())),
+                "category": SUMMARY_CATEGORY,
+                "suppressed": suppressed,
+            },
+            None,
+            None,
+        )
+        record._sampling_summary = True
+        if self.handler is not None:
+            self.handler.handle(record)
+        else:
+            logging.getLogger(__name__).handle(record)
+
+
+def _category(record) -> str:
+    # Same rule as StackdriverJsonFormatter: only a logged dict carries a category.
+    if isinstance(record.msg, dict):
+        return str(record.msg.get("category", "INFO"))
+    return "INFO"
+
+
+def _message_key(record) -> str:
+    """
+    The unformatted message, so "%s failed" with different arguments counts as
+    one distinct message.
+    """
+    if isinstance(record.msg, dict):
+        return str(record.msg.get("message"))
+    return str(record.msg)
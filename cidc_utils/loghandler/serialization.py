@@ -0,0 +1,142 @@
+"""
+Structured log records and the multi-record envelopes they are shipped in.
+"""
+import json
+
+import bson
+from kombu import compression as kombu_compression
+
+from cidc_utils.loghandler.stack_driver_handler import StackdriverJsonFormatter
+
+ENVELOPE_VERSION = 1
+
+_FORMATTER = StackdriverJsonFormatter()
+
+
+def _json_dumps(envelope: dict) -> bytes:
+    return json.dumps(envelope, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _json_loads(body: bytes) -> dict:
+    return json.loads(body.decode("utf-8"))
+
+
+def _bson_dumps(envelope: dict) -> bytes:
+    try:
+        return bson.dumps(envelope)
+    except ValueError:
+        # Values BSON has no type for are sent as strings, as with JSON.
+        return bson.dumps(json.loads(_json_dumps(envelope)))
+
+
+# Encoding name to (dumps, loads, content type, content encoding).
+ENCODINGS = {
+    "json": (_json_dumps, _json_loads, "application/json", "utf-8"),
+    "bson": (_bson_dumps, bson.loads, "application/bson", "binary"),
+}
+
+
+def structured_record(record, formatter: StackdriverJsonFormatter = None) -> dict:
+    """
+    Turns a log record into the fields StackdriverJsonFormatter would produce,
+    plus the logger name and creation time.
+
+    Arguments:
+        record {logging.LogRecord} -- Record to convert.
+
+    Keyword Arguments:
+        formatter {StackdriverJsonFormatter} -- Formatter whose fields to use. The
+            default one has no e-mail alerts configured. (default: {None})
+
+    Returns:
+        dict -- message, severity, category and any other fields of the record.
+    """
+    formatter = formatter or _FORMATTER
+    message_dict = {}
+    if isinstance(record.msg, dict):
+        message_dict = dict(record.msg)
+        record.message = ""
+    else:
+        record.message = record.getMessage()
+    if record.exc_info and not message_dict.get("exc_info"):
+        message_dict["exc_info"] = formatter.formatException(record.exc_info)
+
+    log_record = {}
+    formatter.add_fields(log_record, record, message_dict)
+    log_record = formatter.process_log_record(log_record)
+    log_record["logger"] = record.name
+    log_record["timestamp"] = record.created
+    return log_record
+
+
+class EnvelopeSerializer:
+    """
+    Packs structured records into one compact, optionally compressed message.
+
+    The envelope is {"version": 1, "count": n, "records": [...]}. Compression uses
+    kombu's registry and its "compression" header, so kombu consumers decompress
+    transparently; other consumers read the header to pick the codec.
+    """
+
+    def __init__(self, encoding: str = "json", compression: str = None):
+        """
+        Keyword Arguments:
+            encoding {str} -- "json" or "bson". (default: {"json"})
+            compression {str} -- Any kombu compression name, such as "zlib" or
+                "bzip2". (default: {None})
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError("encoding must be one of {}".format(tuple(ENCODINGS)))
+        if compression:
+            try:
+                kombu_compression.get_encoder(compression)
+            except KeyError:
+                raise ValueError("Unknown compression: {}".format(compression))
+        self.encoding = encoding
+        self.compression = compression
+        self._dumps, self._loads, self.content_type, self.content_encoding = ENCODINGS[
+            encoding
+        ]
+
+    def encode(self, records: list) -> bytes:
+        """
+        Arguments:
+            records {list} -- Structured records, in order.
+
+        Returns:
+            bytes -- Uncompressed envelope; compression is applied on publish.
+        """
+        return self._dumps(
+            {"version": ENVELOPE_VERSION, "count": len(records), "records": records}
+        )
+
+    def publish_options(self, count: int) -> dict:
+        """
+        Arguments:
+            count {int} -- Records in the envelope.
+
+        Returns:
+            dict -- Keyword arguments for kombu's `put`/`publish`.
+        """
+        return {
+            "content_type": self.content_type,
+            "content_encoding": self.content_encoding,
+            "compression": self.compression,
+            "headers": {"x-record-count": count},
+        }
+
+    def decode(self, body: bytes, compression_type: str = None) -> list:
+        """
+        Arguments:
+            body {bytes} -- Message body as received.
+
+        Keyword Arguments:
+            compression_type {str} -- Value of the "compression" header.
+                (default: {None})
+
+        Returns:
+            list -- The records in the envelope.
+        """
+        if compression_type:
+            body = kombu_compression.decompress(body, compression_type)
+        return self._loads(body)["records"]
@@ -0,0 +1,230 @@
+"""
+Segmented on-disk spool that holds log messages while the broker is unreachable.
+"""
+import os
+import re
+import struct
+import threading
+
+_HEADER = struct.Struct(">I")
+_SEGMENT_PATTERN = re.compile(r"^spool-(\d{8})\.log$")
+_CURSOR_FILE = "cursor"
+
+
+class DiskSpool:
+    """
+    Append-only, size-capped FIFO of byte records split across segment files.
+
+    Records are written as a 4-byte length followed by the payload. A cursor file
+    remembers how far replay has got, so pending records survive a restart.
+    Segments are deleted once fully replayed. When the cap is exceeded the oldest
+    segment is dropped, and its unreplayed records are counted in `dropped`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        segment_bytes: int = 16 * 1024 * 1024,
+        fsync: bool = False,
+    ):
+        """
+        Arguments:
+            directory {str} -- Directory holding the segment files.
+
+        Keyword Arguments:
+            max_bytes {int} -- Cap on the total size of all segments. (default: {256MiB})
+            segment_bytes {int} -- Size at which a new segment is started.
+                (default: {16MiB})
+            fsync {bool} -- fsync after every append for crash durability.
+                (default: {False})
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self.fsync = fsync
+        self.dropped = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments = {}
+        for name in os.listdir(directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                segment = int(match.group(1))
+                self._segments[segment] = self._count(segment)
+        self._read_segment, self._read_offset = self._load_cursor()
+        for segment in [s for s in self._segments if s < self._read_segment]:
+            self._delete(segment)
+        if self._read_segment in self._segments:
+            self._segments[self._read_segment] -= self._count(
+                self._read_segment, stop=self._read_offset
+            )
+        self._write_segment = max(self._segments, default=self._read_segment)
+        self._writer = None
+
+    def __len__(self):
+        with self._lock:
+            return sum(self._segments.values())
+
+    @property
+    def size(self) -> int:
+        """
+        Total bytes of segment files on disk.
+        """
+        with self._lock:
+            return sum(self._segment_size(segment) for segment in self._segments)
+
+    def append(self, records: list):
+        """
+        Appends records, dropping the oldest segments if the cap is exceeded.
+
+        Arguments:
+            records {list} -- Byte payloads, in order.
+        """
+        with self._lock:
+            for record in records:
+                writer = self._current_writer(len(record))
+                writer.write(_HEADER.pack(len(record)))
+                writer.write(record)
+                self._segments[self._write_segment] += 1
+            if self._writer is not None:
+                self._writer.flush()
+                if self.fsync:
+                    os.fsync(self._writer.fileno())
+            self._enforce_cap()
+
+    def read(self, limit: int) -> tuple:
+        """
+        Reads up to `limit` of the oldest pending records without consuming them.
+
+        Arguments:
+            limit {int} -- Maximum records to return.
+
+        Returns:
+            tuple -- (records, position); pass position to `commit` once the
+            records have been handled.
+        """
+        with self._lock:
+            records = []
+            segment, offset = self._read_segment, self._read_offset
+            while len(records) < limit and segment <= self._write_segment:
+                if segment not in self._segments:
+                    segment, offset = segment + 1, 0
+                    continue
+                if self._writer is not None and segment == self._write_segment:
+                    self._writer.flush()
+                with open(self._path(segment), "rb") as handle:
+                    handle.seek(offset)
+                    while len(records) < limit:
+                        header = handle.read(_HEADER.size)
+                        if len(header) < _HEADER.size:
+                            break
+                        (length,) = _HEADER.unpack(header)
+                        payload = handle.read(length)
+                        if len(payload) < length:
+                            break
+                        records.append(payload)
+                        offset = handle.tell()
+                if len(records) < limit and segment < self._write_segment:
+                    segment, offset = segment + 1, 0
+                else:
+                    break
+            return records, (segment, offset, len(records))
+
+    def commit(self, position: tuple):
+        """
+        Marks records returned by `read` as consumed and deletes finished segments.
+
+        Arguments:
+            position {tuple} -- Position returned by `read`.
+        """
+        segment, offset, count = position
+        with self._lock:
+            if segment < self._read_segment:
+                # The segments read from were dropped by the cap in the meantime.
+                return
+            remaining = count
+            for finished in sorted(s for s in self._segments if s < segment):
+                remaining -= self._segments[finished]
+                self._delete(finished)
+            if segment in self._segments:
+                self._segments[segment] -= max(remaining, 0)
+            self._read_segment, self._read_offset = segment, offset
+            self._save_cursor()
+
+    def close(self):
+        """
+        Closes the active segment file.
+        """
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _current_writer(self, record_length: int):
+        if self._writer is not None and (
+            self._writer.tell() + _HEADER.size + record_length > self.segment_bytes
+        ):
+            self._writer.close()
+            self._writer = None
+            self._write_segment += 1
+        if self._writer is None:
+            self._segments.setdefault(self._write_segment, 0)
+            self._writer = open(self._path(self._write_segment), "ab")
+        return self._writer
+
+    def _enforce_cap(self):
+        while len(self._segments) > 1:
+            total = sum(self._segment_size(segment) for segment in self._segments)
+            if total <= self.max_bytes:
+                return
+            oldest = min(self._segments)
+            self.dropped += self._segments[oldest]
+            self._delete(oldest)
+            if oldest >= self._read_segment:
+                self._read_segment, self._read_offset = oldest + 1, 0
+                self._save_cursor()
+
+    def _segment_size(self, segment: int) -> int:
+        try:
+            return os.path.getsize(self._path(segment))
+        except OSError:
+            return 0
+
+    def _count(self, segment: int, stop: int = None) -> int:
+        count = 0
+        with open(self._path(segment), "rb") as handle:
+            while stop is None or handle.tell() < stop:
+                header = handle.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                (length,) = _HEADER.unpack(header)
+                if len(handle.read(length)) < length:
+                    break
+                count += 1
+        return count
+
+    def _delete(self, segment: int):
+        self._segments.pop(segment, None)
+        try:
+            os.remove(self._path(segment))
+        except OSError:
+            pass
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, "spool-{:08d}.log".format(segment))
+
+    def _load_cursor(self) -> tuple:
+        try:
+            with open(os.path.join(self.directory, _CURSOR_FILE)) as handle:
+                segment, offset = handle.read().split()
+                return int(segment), int(offset)
+        except (OSError, ValueError):
+            return min(self._segments, default=0), 0
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, _CURSOR_FILE)
+        with open(path + ".tmp", "w") as handle:
+            handle.write("{} {}".format(self._read_segment, self._read_offset))
+        os.replace(path + ".tmp", path)
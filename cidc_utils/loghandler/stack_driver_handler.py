@@ -1,21 +1,27 @@
 """
 A custom class to send formatted logs to Stackdriver
 """
+import json
 import logging
 from typing import List
-import sendgrid
-from sendgrid.helpers.mail import (
-    Email,
-    To,
-    From,
-    Content,
-    Mail,
-    Personalization,
-    SandBoxMode,
-    MailSettings,
-)
+from sendgrid.helpers.mail import Email, Mail, Personalization
 from pythonjsonlogger import jsonlogger
 
+from cidc_utils.loghandler.alerts import AlertDispatcher
+from cidc_utils.loghandler.mail import get_mailer
+
+# jsonlogger options the fast path reproduces; anything else changes the output.
+_FAST_OPTIONS = frozenset(
+    (
+        "datefmt",
+        "validate",
+        "json_default",
+        "json_encoder",
+        "json_indent",
+        "json_ensure_ascii",
+    )
+)
+
 
 def add_recipients(mail_object: Mail, recipients: List[str]) -> None:
     """
@@ -40,7 +46,8 @@ def send_mail(
     sandbox_mode: bool = False,
 ) -> bool:
     """
-    Send an email via Sendgrid. Configure API_KEY via constants.
+    Send an email via Sendgrid. Configure API_KEY via constants. Calls with the same
+    API key share one pooled client.
 
     Arguments:
         subject {str} -- Subject line of email.
@@ -52,25 +59,9 @@ def send_mail(
     Returns:
         bool -- True if succesful.
     """
-    sg_client = sendgrid.SendGridAPIClient(sendgrid_api_key)
-    from_email = From(send_from_email)
-    to_email = To(to_emails)
-    content = Content("text/plain", message_text)
-    mail = Mail(from_email, to_email, subject, content)
-
-    mail_settings = MailSettings()
-    mail_settings.sandbox_mode = SandBoxMode(sandbox_mode)
-    mail.mail_settings = mail_settings
-
-    response = sg_client.send(mail)
-
-    # If this is a dry run, we get back 200 (OK) if the inputs are valid
-    validated = sandbox_mode and response.status_code == 200
-
-    # If this is a real run, we get back 202 (Accepted) if the message sent
-    sent_succesfully = not sandbox_mode and response.status_code == 202
-
-    return validated or sent_succesfully
+    return get_mailer(sendgrid_api_key).send(
+        subject, message_text, to_emails, send_from_email, sandbox_mode=sandbox_mode
+    )
 
 
 class StackdriverJsonFormatter(jsonlogger.JsonFormatter, object):
@@ -88,24 +79,84 @@ class StackdriverJsonFormatter(jsonlogger.JsonFormatter, object):
     _sendgrid_api_key = None
     _send_from_email = None
     _to_emails = None
+    _alerts = None
 
-    def __init__(self, fmt="%(levelname) %(message)", style="%", *args, **kwargs):
+    def __init__(
+        self, fmt="%(levelname) %(message)", style="%", *args, fast=False, **kwargs
+    ):
+        """
+        Keyword Arguments:
+            fmt {str} -- Fields to include. (default: {"%(levelname) %(message)"})
+            fast {bool} -- Build and encode records in a single pass instead of going
+                through the jsonlogger hooks. The output is the same JSON, encoded
+                with the formatter's own json settings. Only `datefmt`, `validate`
+                and the `json_*` options other than `json_serializer` may be
+                combined with it. (default: {False})
+
+        Raises:
+            ValueError -- If fast is combined with other jsonlogger options.
+        """
+        if fast:
+            unsupported = sorted(set(kwargs) - _FAST_OPTIONS)
+            if args or unsupported:
+                raise ValueError(
+                    "fast=True does not support jsonlogger options: {}".format(
+                        ", ".join(unsupported) or "positional arguments"
+                    )
+                )
         jsonlogger.JsonFormatter.__init__(self, fmt=fmt, *args, **kwargs)
+        self.fast = fast
+        # Resolved once here rather than for every record.
+        required = list(self._required_fields)
+        self._fast_fields = tuple(field for field in required if field != "levelname")
+        self._needs_asctime = "asctime" in required
+        self._fast_skip = frozenset(jsonlogger.RESERVED_ATTRS) | frozenset(required)
+        # The encoder jsonify_log_record would build through json.dumps.
+        self._encoder = (self.json_encoder or json.JSONEncoder)(
+            default=self.json_default,
+            indent=self.json_indent,
+            ensure_ascii=self.json_ensure_ascii,
+        )
 
     def configure_sendgrid(
-        self, api_key: str, from_email: str, to_emails: List[str]
+        self,
+        api_key: str,
+        from_email: str,
+        to_emails: List[str],
+        digest_interval: float = 10.0,
+        dedup_window: float = 300.0,
+        max_emails_per_recipient: int = 20,
     ) -> None:
         """
-        Function to configure sendgrind credentials
+        Function to configure sendgrind credentials. Alerts are sent by a background
+        AlertDispatcher, so formatting never waits on SendGrid.
 
         Arguments:
             api_key {str} -- Access key for api.
             from_email {str} -- Email of sender
             to_emails {List[str]} -- List of e-mail addresses to send the mail to.
+
+        Keyword Arguments:
+            digest_interval {float} -- Seconds alerts are collected into one e-mail.
+                (default: {10.0})
+            dedup_window {float} -- Seconds an identical alert is suppressed for.
+                (default: {300.0})
+            max_emails_per_recipient {int} -- E-mails per recipient per hour.
+                (default: {20})
         """
         self._send_from_email = from_email
         self._sendgrid_api_key = api_key
         self._to_emails = to_emails
+        if self._alerts is not None:
+            self._alerts.close()
+        self._alerts = AlertDispatcher(
+            lambda subject, text, recipients: send_mail(
+                subject, text, recipients, from_email, api_key
+            ),
+            digest_interval=digest_interval,
+            dedup_window=dedup_window,
+            max_emails_per_recipient=max_emails_per_recipient,
+        )
 
     def process_log_record(self, log_record):
         """
@@ -118,23 +169,65 @@ class StackdriverJsonFormatter(jsonlogger.JsonFormatter, object):
             [type] -- [description]
         """
         log_record["severity"] = log_record["levelname"]
+        self._alert(log_record)
+        del log_record["levelname"]
+        return super(StackdriverJsonFormatter, self).process_log_record(log_record)
 
-        # If the log is tagged as "e-mail" send it out.
+    def _alert(self, log_record):
+        """
+        If the log is tagged as "e-mail", hands it to the background dispatcher.
+        """
         if (
             "category" in log_record
             and "EMAIL" in log_record["category"]
             and (self._send_from_email and self._sendgrid_api_key and self._to_emails)
+            and self._alerts is not None
         ):
-            send_mail(
-                "STACKDRIVER_NOTIFICATION",
-                log_record["message"],
-                self._to_emails,
-                self._send_from_email,
-                self._sendgrid_api_key,
-            )
-
-        del log_record["levelname"]
-        return super(StackdriverJsonFormatter, self).process_log_record(log_record)
+            self._alerts.submit(log_record["message"], self._to_emails)
+
+    def format(self, record):
+        if not self.fast:
+            return super(StackdriverJsonFormatter, self).format(record)
+
+        msg = record.msg
+        if isinstance(msg, dict):
+            message_dict = msg
+            record.message = ""
+        else:
+            message_dict = None
+            record.message = record.getMessage()
+        if self._needs_asctime:
+            record.asctime = self.formatTime(record, self.datefmt)
+
+        record_dict = record.__dict__
+        log_record = {field: record_dict.get(field) for field in self._fast_fields}
+        if message_dict:
+            log_record.update(message_dict)
+        if record.exc_info or record.exc_text or record.stack_info:
+            self._add_traces(log_record, record)
+        # Most records carry no extras; the set difference finds that in C.
+        extras = record_dict.keys() - self._fast_skip
+        if extras:
+            for key, value in record_dict.items():
+                if key in extras and not key.startswith("_"):
+                    log_record[key] = value
+        log_record["category"] = (message_dict or {}).get("category", "INFO")
+        log_record["severity"] = record.levelname
+        self._alert(log_record)
+        return self._encoder.encode(log_record)
+
+    def _add_traces(self, log_record, record):
+        """
+        Adds exc_info and stack_info the way jsonlogger does, unless the logged
+        dict already provides them.
+        """
+        if not log_record.get("exc_info"):
+            if record.exc_info:
+                log_record["exc_info"] = self.formatException(record.exc_info)
+            elif record.exc_text:
+                log_record["exc_info"] = record.exc_text
+        if record.stack_info and not log_record.get("stack_info"):
+            log_record["stack_info"] = self.formatStack(record.stack_info)
 
     def add_fields(self, log_record, record, message_dict):
         super(StackdriverJsonFormatter, self).add_fields(
@@ -145,7 +238,7 @@ class StackdriverJsonFormatter(jsonlogger.JsonFormatter, object):
         log_record["category"] = message_dict["category"]
 
 
-def add_to_logger(logger_instance):
+def add_to_logger(logger_instance, fast: bool = False, log_filter=None):
     """
     Function that will attach all functionality to the local logging instance. The logger instance
     is global. It is not necessary to use the returned object.
@@ -153,14 +246,21 @@ def add_to_logger(logger_instance):
     Arguments:
         logger_instance {[type]} -- the result of "import logging"
 
+    Keyword Arguments:
+        fast {bool} -- Use the formatter's single-pass mode. (default: {False})
+        log_filter {SamplingFilter} -- Filter bounding the volume written to the
+            stream, e.g. SamplingFilter(). (default: {None})
+
     Returns:
         {[type]} -- configured logger instance.
     """
     logger = logger_instance.getLogger()
     logger.setLevel("INFO")
     loghandler = logger_instance.StreamHandler()
-    formatter = StackdriverJsonFormatter()
+    formatter = StackdriverJsonFormatter(fast=fast)
     loghandler.setFormatter(formatter)
+    if log_filter is not None:
+        log_filter.attach(loghandler)
     logger.addHandler(loghandler)
     return logger
 
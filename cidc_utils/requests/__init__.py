@@ -1,2 +1,12 @@
 #!/usr/bin/env python3
-from cidc_utils.requests.smartfetch import SmartFetch
+from cidc_utils.requests.smartfetch import BatchResult, BulkResult, SmartFetch
+from cidc_utils.requests.async_smartfetch import AsyncSmartFetch
+from cidc_utils.requests.coalescing import SingleFlight
+from cidc_utils.requests.instrumentation import RequestMetrics
+from cidc_utils.requests.response_cache import ResponseCache
+from cidc_utils.requests.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    get_circuit_breaker,
+)
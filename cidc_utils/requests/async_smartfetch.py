@@ -0,0 +1,162 @@
+"""
+Asyncio counterpart to SmartFetch.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from cidc_utils.requests.smartfetch import SmartFetch
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+
+class AsyncSmartFetch:
+    """
+    Same surface as SmartFetch, but every verb is a coroutine. Requests share one
+    pooled session and run on a pool of `max_concurrency` worker threads, so an
+    event loop can keep that many requests in flight without blocking; further
+    requests wait for a free thread. Error handling is identical to SmartFetch:
+    an unexpected status code raises a RuntimeError.
+
+    This is not native async I/O: the blocking SmartFetch call runs in a thread,
+    so every in-flight request holds a pool thread until its response arrives.
+    """
+
+    def __init__(
+        self,
+        base_url="",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        **fetch_kwargs
+    ):
+        """
+        Arguments:
+            base_url {str} -- Root URL prepended to every endpoint.
+
+        Keyword Arguments:
+            max_concurrency {int} -- Worker threads, and so the maximum number of
+                requests in flight at once. Also sizes the per-host connection
+                pool. (default: {10})
+            fetch_kwargs {dict} -- Extra pool/timeout options forwarded to SmartFetch.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        fetch_kwargs.setdefault("pool_maxsize", max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.fetch = SmartFetch(base_url, **fetch_kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    @property
+    def base_url(self):
+        return self.fetch.base_url
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Waits for the worker pool to drain and closes every pooled connection.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self._executor.shutdown, wait=True))
+        self.fetch.close()
+
+    async def _run(self, method, **kwargs):
+        """
+        Runs a blocking SmartFetch method on the worker pool.
+
+        Arguments:
+            method {object} -- Bound SmartFetch method.
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(method, **kwargs))
+
+    async def post(
+        self, endpoint: str = None, code: int = 201, token: str = None, **kwargs
+    ):
+        """Coroutine emulating the requests.post method with custom error handling.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {201})
+            token {str} -- JWT access token. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        return await self._run(
+            self.fetch.post, endpoint=endpoint, code=code, token=token, **kwargs
+        )
+
+    async def get(
+        self, endpoint: str = None, code: int = 200, token: str = None, **kwargs
+    ):
+        """Coroutine emulating the requests.get method with custom error handling.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        return await self._run(
+            self.fetch.get, endpoint=endpoint, code=code, token=token, **kwargs
+        )
+
+    async def patch(
+        self, endpoint: str = None, code: int = 200, token: str = None, **kwargs
+    ):
+        """Coroutine emulating the requests.patch method with custom error handling.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        return await self._run(
+            self.fetch.patch, endpoint=endpoint, code=code, token=token, **kwargs
+        )
+
+    async def put(
+        self, endpoint: str = None, code: int = 201, token: str = None, **kwargs
+    ):
+        """Coroutine emulating the requests.put method with custom error handling.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {201})
+            token {str} -- JWT access token. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        return await self._run(
+            self.fetch.put, endpoint=endpoint, code=code, token=token, **kwargs
+        )
+
+    async def delete(
+        self, endpoint: str = None, code: int = 200, token: str = None, **kwargs
+    ):
+        """Coroutine emulating the requests.delete method with custom error handling.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        return await self._run(
+            self.fetch.delete, endpoint=endpoint, code=code, token=token, **kwargs
+        )
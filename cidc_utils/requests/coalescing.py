@@ -0,0 +1,77 @@
+"""
+Single-flight coalescing of concurrent identical requests.
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Threads asking for a key that is
+    already in flight wait for that call and receive its result, or its exception.
+    Nothing is remembered once the call finishes, so results never outlive the
+    request that produced them.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict -- Calls actually executed and calls that piggybacked on them.
+        """
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
+
+    def do(self, key, func):
+        """
+        Runs `func`, unless a call for `key` is already running.
+
+        Arguments:
+            key {Hashable} -- Identifies identical calls.
+            func {Callable} -- Zero-argument function doing the work.
+
+        Returns:
+            object -- Result of the call that ran for `key`.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
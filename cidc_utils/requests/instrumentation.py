@@ -0,0 +1,346 @@
+"""
+Request counters, latency histograms and hooks for SmartFetch.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, List
+
+import requests
+
+# Log-spaced latency buckets from 1ms to ~2min, fine enough for percentile estimates.
+DEFAULT_BUCKETS = tuple(round(0.001 * 1.5 ** i, 6) for i in range(30))
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram. Not thread-safe on its own; RequestMetrics
+    serializes access.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """
+        Arguments:
+            seconds {float} -- Observed latency.
+        """
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by interpolating linearly within its bucket.
+
+        Arguments:
+            q {float} -- Quantile between 0 and 1.
+
+        Returns:
+            float -- Estimated latency in seconds, 0.0 if nothing was observed.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                fraction = (rank - seen) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class _EndpointStats:
+    def __init__(self, buckets):
+        self.statuses = defaultdict(int)
+        self.latency = LatencyHistogram(buckets)
+        self.errors = 0
+        self.retries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class RequestMetrics:
+    """
+    Collects per endpoint/verb/status counters, latency histograms, byte counts,
+    retries and errors for every request a SmartFetch sends.
+
+    Hooks registered with `add_before_request` are called before every attempt
+    with (verb, url, kwargs) and may modify kwargs. Hooks registered with
+    `add_after_response` are called after every attempt with
+    (verb, url, response, error, elapsed); one of response and error is None.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled: bool = True):
+        """
+        Keyword Arguments:
+            buckets {tuple} -- Upper bounds of the latency buckets in seconds.
+            enabled {bool} -- Record anything at all. (default: {True})
+        """
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self.before_request_hooks: List[Callable] = []
+        self.after_response_hooks: List[Callable] = []
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add_before_request(self, hook: Callable):
+        """
+        Arguments:
+            hook {Callable} -- Called as hook(verb, url, kwargs) before each attempt.
+        """
+        self.before_request_hooks.append(hook)
+
+    def add_after_response(self, hook: Callable):
+        """
+        Arguments:
+            hook {Callable} -- Called as hook(verb, url, response, error, elapsed)
+                after each attempt.
+        """
+        self.after_response_hooks.append(hook)
+
+    def instrument(self, verb: str, url: str, send: Callable) -> Callable:
+        """
+        Wraps a single-attempt send function so hooks run and attempts are tracked.
+
+        Arguments:
+            verb {str} -- HTTP verb label.
+            url {str} -- Request URL.
+            send {Callable} -- Function sending one attempt with **kwargs.
+
+        Returns:
+            Callable -- Wrapped function; its `attempts` list holds each response.
+        """
+
+        def instrumented(**kwargs):
+            for hook in self.before_request_hooks:
+                hook(verb, url, kwargs)
+            started = time.perf_counter()
+            try:
+                response = send(**kwargs)
+            except Exception as error:
+                instrumented.attempts.append(None)
+                for hook in self.after_response_hooks:
+                    hook(verb, url, None, error, time.perf_counter() - started)
+                raise
+            instrumented.attempts.append(response)
+            for hook in self.after_response_hooks:
+                hook(verb, url, response, None, time.perf_counter() - started)
+            return response
+
+        instrumented.attempts = []
+        return instrumented
+
+    def record(
+        self,
+        endpoint: str,
+        verb: str,
+        status,
+        elapsed: float,
+        retries: int = 0,
+        error: bool = False,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ):
+        """
+        Records one logical request, including all of its retries.
+
+        Arguments:
+            endpoint {str} -- Endpoint label, without item id or query string.
+            verb {str} -- HTTP verb label.
+            status {int|str} -- Final status code, or "none" if no response came back.
+            elapsed {float} -- Seconds from the first attempt to the final outcome.
+
+        Keyword Arguments:
+            retries {int} -- Attempts beyond the first. (default: {0})
+            error {bool} -- Whether the request raised. (default: {False})
+            bytes_in {int} -- Response body bytes. (default: {0})
+            bytes_out {int} -- Request body bytes. (default: {0})
+        """
+        key = (endpoint, verb)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats(self.buckets)
+            stats.statuses[status] += 1
+            stats.latency.observe(elapsed)
+            stats.retries += retries
+            stats.errors += int(error)
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+
+    def record_attempts(
+        self, endpoint: str, verb: str, attempts: list, elapsed: float, error: bool
+    ):
+        """
+        Records a request from the attempts collected by an `instrument` wrapper.
+
+        Arguments:
+            endpoint {str} -- Endpoint label.
+            verb {str} -- HTTP verb label.
+            attempts {list} -- Response of each attempt, None where it raised.
+            elapsed {float} -- Seconds from the first attempt to the final outcome.
+            error {bool} -- Whether the request raised.
+        """
+        last = attempts[-1] if attempts else None
+        bytes_in, bytes_out = response_sizes(last)
+        self.record(
+            endpoint,
+            verb,
+            last.status_code if last is not None else "none",
+            elapsed,
+            retries=max(len(attempts) - 1, 0),
+            error=error,
+            bytes_in=bytes_in,
+            bytes_out=bytes_out,
+        )
+
+    def reset(self):
+        """
+        Drops everything recorded so far.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self) -> List[dict]:
+        """
+        Returns:
+            List[dict] -- One dict per endpoint and verb with counters, status
+            counts and latency percentiles in seconds.
+        """
+        with self._lock:
+            return [
+                {
+                    "endpoint": endpoint,
+                    "verb": verb,
+                    "count": stats.latency.count,
+                    "statuses": dict(stats.statuses),
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "bytes_in": stats.bytes_in,
+                    "bytes_out": stats.bytes_out,
+                    "latency": {
+                        "mean": stats.latency.sum / stats.latency.count,
+                        "max": stats.latency.max,
+                        "p50": stats.latency.quantile(0.5),
+                        "p95": stats.latency.quantile(0.95),
+                        "p99": stats.latency.quantile(0.99),
+                    },
+                }
+                for (endpoint, verb), stats in sorted(self._stats.items())
+            ]
+
+    def to_prometheus(self, prefix: str = "smartfetch") -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Keyword Arguments:
+            prefix {str} -- Metric name prefix. (default: {"smartfetch"})
+
+        Returns:
+            str -- Exposition text.
+        """
+        lines = []
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines.append("# TYPE {}_requests_total counter".format(prefix))
+            for (endpoint, verb), stats in items:
+                for status, count in sorted(stats.statuses.items(), key=str):
+                    lines.append(
+                        '{}_requests_total{{{},status="{}"}} {}'.format(
+                            prefix, _labels(endpoint, verb), status, count
+                        )
+                    )
+            for name, attr in (
+                ("errors_total", "errors"),
+                ("retries_total", "retries"),
+                ("received_bytes_total", "bytes_in"),
+                ("sent_bytes_total", "bytes_out"),
+            ):
+                lines.append("# TYPE {}_{} counter".format(prefix, name))
+                for (endpoint, verb), stats in items:
+                    lines.append(
+                        "{}_{}{{{}}} {}".format(
+                            prefix, name, _labels(endpoint, verb), getattr(stats, attr)
+                        )
+                    )
+            lines.append("# TYPE {}_request_duration_seconds histogram".format(prefix))
+            for (endpoint, verb), stats in items:
+                labels = _labels(endpoint, verb)
+                histogram = stats.latency
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        '{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                            prefix, labels, bound, cumulative
+                        )
+                    )
+                lines.append(
+                    '{}_request_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(
+                        prefix, labels, histogram.count
+                    )
+                )
+                lines.append(
+                    "{}_request_duration_seconds_sum{{{}}} {}".format(
+                        prefix, labels, histogram.sum
+                    )
+                )
+                lines.append(
+                    "{}_request_duration_seconds_count{{{}}} {}".format(
+                        prefix, labels, histogram.count
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(endpoint: str, verb: str) -> str:
+    endpoint = (endpoint or "").replace("\\", "\\\\").replace('"', '\\"')
+    return 'endpoint="{}",verb="{}"'.format(endpoint, verb)
+
+
+def body_size(body) -> int:
+    """
+    Arguments:
+        body {object} -- A prepared request or response body.
+
+    Returns:
+        int -- Size in bytes when it is known without reading a stream, else 0.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode())
+    return 0
+
+
+def response_sizes(response) -> tuple:
+    """
+    Arguments:
+        response {requests.Response} -- Final response of a request.
+
+    Returns:
+        tuple -- (bytes received, bytes sent), without consuming streamed bodies.
+    """
+    if not isinstance(response, requests.Response):
+        return 0, 0
+    if response._content_consumed and isinstance(response._content, bytes):
+        received = len(response._content)
+    else:
+        received = int(response.headers.get("Content-Length") or 0)
+    sent = 0
+    if response.request is not None:
+        sent = body_size(response.request.body) or int(
+            response.request.headers.get("Content-Length") or 0
+        )
+    return received, sent
@@ -0,0 +1,219 @@
+"""
+ETag-validated response cache for SmartFetch GETs.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheEntry(NamedTuple):
+    """
+    A cached response body along with what is needed to rebuild the response.
+    """
+
+    url: str
+    etag: str
+    status_code: int
+    headers: dict
+    body: bytes
+    encoding: Optional[str]
+
+    def to_response(self, not_modified: requests.Response) -> requests.Response:
+        """
+        Rebuilds a full response from the cached body.
+
+        Arguments:
+            not_modified {requests.Response} -- The 304 returned by the server.
+
+        Returns:
+            requests.Response -- Response carrying the cached status and body.
+        """
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = self.encoding
+        response.url = not_modified.url or self.url
+        response.request = not_modified.request
+        return response
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of GET responses keyed by URL, query parameters and the
+    caller's auth identity. Entries are only ever served after the server confirms
+    them with a 304 to an If-None-Match request, so cached data is never stale.
+    Eviction is bounded both by entry count and by total body size.
+    """
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        """
+        Keyword Arguments:
+            max_entries {int} -- Maximum number of cached responses. (default: {1024})
+            max_bytes {int} -- Maximum total size of cached bodies. (default: {64MiB})
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """
+        Total bytes of cached bodies.
+        """
+        return self._size
+
+    @staticmethod
+    def make_key(url: str, params=None, auth: str = None) -> tuple:
+        """
+        Builds a cache key. The auth value is hashed so raw tokens aren't kept around.
+
+        Arguments:
+            url {str} -- Full request URL.
+
+        Keyword Arguments:
+            params {dict} -- Query parameters. (default: {None})
+            auth {str} -- Token or Authorization header identifying the caller.
+
+        Returns:
+            tuple -- Hashable key.
+        """
+        if isinstance(params, dict):
+            params = tuple(sorted((str(k), str(v)) for k, v in params.items()))
+        elif params is not None:
+            params = str(params)
+        identity = hashlib.sha256(auth.encode()).hexdigest() if auth else None
+        return (url, params, identity)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict -- Snapshot of the cache counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
+
+    def lookup(self, key: tuple) -> Optional[CacheEntry]:
+        """
+        Fetches an entry for revalidation, marking it as recently used.
+
+        Arguments:
+            key {tuple} -- Key from `make_key`.
+
+        Returns:
+            Optional[CacheEntry] -- The entry, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            return entry
+
+    def record_hit(self):
+        """
+        Counts a 304 that was answered from the cache.
+        """
+        with self._lock:
+            self.hits += 1
+
+    def store(self, key: tuple, response: requests.Response) -> bool:
+        """
+        Caches a successful response if it carries an ETag and fits in the cache.
+
+        Arguments:
+            key {tuple} -- Key from `make_key`.
+            response {requests.Response} -- Response to cache.
+
+        Returns:
+            bool -- True if the response was cached.
+        """
+        etag = response.headers.get("ETag")
+        if not etag:
+            return False
+        body = response.content or b""
+        if len(body) > self.max_bytes:
+            return False
+        entry = CacheEntry(
+            url=key[0],
+            etag=etag,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            body=body,
+            encoding=response.encoding,
+        )
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, url: str) -> int:
+        """
+        Drops entries for a URL, the documents beneath it and the collections above it.
+
+        Arguments:
+            url {str} -- URL that was written to.
+
+        Returns:
+            int -- Number of entries dropped.
+        """
+        path = url.split("?", 1)[0].rstrip("/")
+        with self._lock:
+            stale = [key for key in self._entries if _related(key[0], path)]
+            for key in stale:
+                self._discard(key)
+        return len(stale)
+
+    def clear(self):
+        """
+        Empties the cache. Counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+
+def _related(cached_url: str, path: str) -> bool:
+    cached_path = cached_url.split("?", 1)[0].rstrip("/")
+    return (
+        cached_path == path
+        or cached_path.startswith(path + "/")
+        or path.startswith(cached_path + "/")
+    )
@@ -0,0 +1,271 @@
+"""
+Retry policy and circuit breaker used by graceful_handling.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+import requests
+
+DEFAULT_RETRY_STATUSES = (429, 502, 503, 504)
+# Statuses that promise the request was not processed, so even a POST can be resent.
+NOT_PROCESSED_STATUSES = (429, 503)
+DEFAULT_RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of sending a request while the circuit breaker is open.
+    """
+
+
+class RetryPolicy:
+    """
+    Describes when and how long to wait before resending a failed request.
+
+    Waits use exponential backoff with full jitter. A `Retry-After` header on the
+    response takes precedence over the computed backoff. Non-idempotent requests
+    (POST, PATCH) are only resent when the failure proves the server never acted
+    on them, unless `retry_non_idempotent` is set.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+        retry_exceptions: Tuple[Type[Exception], ...] = DEFAULT_RETRY_EXCEPTIONS,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 120.0,
+        retry_non_idempotent: bool = False,
+    ):
+        """
+        Keyword Arguments:
+            max_retries {int} -- Resends allowed after the first attempt. (default: {3})
+            backoff_factor {float} -- Base delay in seconds, doubled every attempt.
+                (default: {0.5})
+            max_backoff {float} -- Upper bound on a computed delay. (default: {30.0})
+            retry_statuses {Iterable[int]} -- Statuses worth retrying.
+                (default: {(429, 502, 503, 504)})
+            retry_exceptions {tuple} -- Exceptions worth retrying.
+                (default: {(ConnectionError, Timeout)})
+            respect_retry_after {bool} -- Wait as long as `Retry-After` asks.
+                (default: {True})
+            max_retry_after {float} -- Give up instead of waiting longer than this.
+                (default: {120.0})
+            retry_non_idempotent {bool} -- Resend POST/PATCH on any retryable failure.
+                (default: {False})
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.retry_non_idempotent = retry_non_idempotent
+        self.sleep = time.sleep
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Arguments:
+            attempt {int} -- Zero-based number of the attempt that just failed.
+
+        Returns:
+            float -- Seconds to wait, drawn uniformly from [0, capped exponential].
+        """
+        ceiling = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def status_delay(
+        self, response: requests.Response, attempt: int, idempotent: bool = True
+    ) -> Optional[float]:
+        """
+        Decides whether a response with an unexpected status should be retried.
+
+        Arguments:
+            response {requests.Response} -- The failed response.
+            attempt {int} -- Zero-based number of the attempt that just failed.
+
+        Keyword Arguments:
+            idempotent {bool} -- Whether the request is safe to repeat. (default: {True})
+
+        Returns:
+            Optional[float] -- Seconds to wait before retrying, or None to give up.
+        """
+        status = response.status_code
+        if attempt >= self.max_retries or status not in self.retry_statuses:
+            return None
+        if not idempotent and not self.retry_non_idempotent:
+            if status not in NOT_PROCESSED_STATUSES:
+                return None
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff(attempt)
+
+    def exception_delay(
+        self, error: Exception, attempt: int, idempotent: bool = True
+    ) -> Optional[float]:
+        """
+        Decides whether a request that raised should be retried.
+
+        Arguments:
+            error {Exception} -- The raised exception.
+            attempt {int} -- Zero-based number of the attempt that just failed.
+
+        Keyword Arguments:
+            idempotent {bool} -- Whether the request is safe to repeat. (default: {True})
+
+        Returns:
+            Optional[float] -- Seconds to wait before retrying, or None to give up.
+        """
+        if attempt >= self.max_retries or not isinstance(error, self.retry_exceptions):
+            return None
+        # Only a failed connect guarantees a POST never reached the server.
+        if not (
+            idempotent
+            or self.retry_non_idempotent
+            or isinstance(error, requests.ConnectTimeout)
+        ):
+            return None
+        return self.backoff(attempt)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        if not self.respect_retry_after:
+            return None
+        value = response.headers.get("Retry-After") if response.headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a backend is down.
+
+    After `failure_threshold` consecutive failures the breaker opens and every
+    request raises CircuitOpenError without touching the network. Once
+    `reset_timeout` seconds pass it lets a single trial request through; success
+    closes the breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Keyword Arguments:
+            failure_threshold {int} -- Consecutive failures that open the breaker.
+                (default: {5})
+            reset_timeout {float} -- Seconds to stay open before a trial request.
+                (default: {30.0})
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = time.monotonic
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._cooled_down():
+                return self.HALF_OPEN
+            return self._state
+
+    def before_request(self):
+        """
+        Call before sending a request.
+
+        Raises:
+            CircuitOpenError -- The breaker is open, or a trial request is in flight.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and self._cooled_down():
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise CircuitOpenError(
+                "Circuit open: backend is failing, not sending request"
+            )
+
+    def record_success(self):
+        """
+        Records a request that reached a healthy backend.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """
+        Records a connection error or server-side failure.
+        """
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+    def _cooled_down(self) -> bool:
+        return self.clock() - self._opened_at >= self.reset_timeout
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(base_url: str, **kwargs) -> CircuitBreaker:
+    """
+    Returns the breaker shared by every client talking to the same host.
+
+    Arguments:
+        base_url {str} -- Any URL on the backend.
+
+    Keyword Arguments:
+        kwargs {dict} -- CircuitBreaker settings, used only when it is first created.
+
+    Returns:
+        CircuitBreaker -- Shared breaker for the scheme and host of base_url.
+    """
+    parts = urlsplit(base_url)
+    key = (parts.scheme, parts.netloc) if parts.netloc else base_url
+    with _BREAKERS_LOCK:
+        if key not in _BREAKERS:
+            _BREAKERS[key] = CircuitBreaker(**kwargs)
+        return _BREAKERS[key]
+
+
+def is_server_failure(status_code: int) -> bool:
+    """
+    Arguments:
+        status_code {int} -- HTTP status code.
+
+    Returns:
+        bool -- True if the status means the backend itself is struggling.
+    """
+    return status_code == 429 or status_code >= 500
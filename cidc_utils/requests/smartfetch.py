@@ -1,14 +1,101 @@
 """
 Class that makes interacting with APIs a little bit easier.
 """
+import json
+import mmap
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import wraps
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional
 from bson import ObjectId
 
 import requests
+from requests.adapters import HTTPAdapter
 from simplejson.errors import JSONDecodeError
 
+from cidc_utils.requests.coalescing import SingleFlight
+from cidc_utils.requests.instrumentation import RequestMetrics
+from cidc_utils.requests.response_cache import ResponseCache
+from cidc_utils.requests.retry import (
+    CircuitBreaker,
+    RetryPolicy,
+    get_circuit_breaker,
+    is_server_failure,
+)
 
-def graceful_handling(code: int, token: str = None, _etag: str = None):
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_CHUNK_SIZE = 64 * 1024
+ERROR_BODY_LIMIT = 2048
+DEFAULT_BULK_DOCUMENTS = 500
+DEFAULT_BULK_BYTES = 4 * 1024 * 1024
+
+
+def read_error_prefix(
+    response: requests.Response, limit: int = ERROR_BODY_LIMIT
+) -> str:
+    """
+    Reads at most `limit` bytes of a streamed response body for error reporting,
+    then closes the response so the rest is never downloaded.
+
+    Arguments:
+        response {requests.Response} -- Streamed response.
+
+    Keyword Arguments:
+        limit {int} -- Maximum bytes to read. (default: {2048})
+
+    Returns:
+        str -- Decoded body prefix.
+    """
+    prefix = b""
+    try:
+        for chunk in response.iter_content(chunk_size=limit):
+            prefix = chunk[:limit]
+            break
+    except requests.RequestException:
+        pass
+    finally:
+        response.close()
+    return prefix.decode(response.encoding or "utf-8", errors="replace")
+
+
+def _rewind_point(body) -> tuple:
+    """
+    Says whether a request body can be sent again, and from where.
+
+    Arguments:
+        body {object} -- The `data` of a request.
+
+    Returns:
+        tuple -- (resendable, position): position is the offset to seek back to,
+            or None when the body needs no rewinding. Non-seekable file objects,
+            generators and other iterators can't be resent.
+    """
+    if body is None or isinstance(
+        body, (bytes, bytearray, memoryview, str, dict, list, tuple)
+    ):
+        return True, None
+    seekable = getattr(body, "seekable", None)
+    try:
+        if seekable is not None:
+            return (True, body.tell()) if seekable() else (False, None)
+        if hasattr(body, "seek") and hasattr(body, "tell"):
+            # e.g. mmap, which has no seekable() before Python 3.13.
+            return True, body.tell()
+    except (OSError, ValueError):
+        pass
+    return False, None
+
+
+def graceful_handling(
+    code: int,
+    token: str = None,
+    _etag: str = None,
+    retry_policy: RetryPolicy = None,
+    circuit_breaker: CircuitBreaker = None,
+    idempotent: bool = True,
+):
     """
     A wrapper around the requests library that removes the need to write
     error handling behavior for every request.
@@ -17,6 +104,9 @@ def graceful_handling(code: int, token: str = None, _etag: str = None):
         code {int} -- HTTP request code indicating a succesful request.
         token {str} -- JWT access token.
         _etag {str} -- Etag to indicate document has not changed.
+        retry_policy {RetryPolicy} -- When to resend failed requests. No retries if None.
+        circuit_breaker {CircuitBreaker} -- Breaker guarding the backend, if any.
+        idempotent {bool} -- Whether the request is safe to send twice.
 
     Raises:
         RuntimeError -- Raises a runtime error to indicate a vital request failed.
@@ -64,12 +154,54 @@ def graceful_handling(code: int, token: str = None, _etag: str = None):
                     kwargs["headers"].update({"If-Match": _etag})
                 else:
                     kwargs.update({"headers": {"If-Match": _etag}})
-            response = func(*args, **kwargs)
-            if not response.status_code == code:
+
+            # File-like upload bodies are rewound before each resend; bodies that
+            # can't be rewound are never resent.
+            body = kwargs.get("data")
+            resendable, body_start = _rewind_point(body)
+
+            attempt = 0
+            while True:
+                if attempt and body_start is not None:
+                    body.seek(body_start)
+                if circuit_breaker:
+                    circuit_breaker.before_request()
                 try:
-                    print(response.json())
-                except JSONDecodeError:
-                    pass
+                    response = func(*args, **kwargs)
+                except Exception as error:  # pylint: disable=broad-except
+                    if circuit_breaker:
+                        circuit_breaker.record_failure()
+                    delay = None
+                    if retry_policy and resendable:
+                        delay = retry_policy.exception_delay(error, attempt, idempotent)
+                    if delay is None:
+                        raise
+                    retry_policy.sleep(delay)
+                    attempt += 1
+                    continue
+
+                if circuit_breaker:
+                    if is_server_failure(response.status_code):
+                        circuit_breaker.record_failure()
+                    else:
+                        circuit_breaker.record_success()
+                if response.status_code == code or not retry_policy or not resendable:
+                    break
+                delay = retry_policy.status_delay(response, attempt, idempotent)
+                if delay is None:
+                    break
+                response.close()
+                retry_policy.sleep(delay)
+                attempt += 1
+
+            if not response.status_code == code:
+                if kwargs.get("stream"):
+                    print(read_error_prefix(response))
+                else:
+                    try:
+                        print(response.json())
+                    except JSONDecodeError:
+                        pass
                 error_report = ''
                 if response.status_code:
                     error_report += str(response.status_code) + ": "
@@ -83,15 +215,174 @@ def graceful_handling(code: int, token: str = None, _etag: str = None):
     return param_wrap
 
 
+def _copy_chunks(response: requests.Response, write, chunk_size: int) -> int:
+    total = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            write(chunk)
+            total += len(chunk)
+    return total
+
+
+class BatchResult(NamedTuple):
+    """
+    Outcome of a single item in a batch request. Exactly one of `response` and
+    `error` is set.
+    """
+
+    item_id: Any
+    response: Optional[requests.Response] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkResult(NamedTuple):
+    """
+    Outcome of one document in a bulk insert. `item` is Eve's per-document status
+    (`_id`, `_etag`, `_status`, ...) when the server returned one.
+    """
+
+    index: int
+    item: Optional[dict] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def chunk_documents(
+    documents: Iterable,
+    max_documents: int = DEFAULT_BULK_DOCUMENTS,
+    max_bytes: int = DEFAULT_BULK_BYTES,
+    serializer=json.dumps,
+) -> Iterator[tuple]:
+    """
+    Lazily splits documents into JSON array payloads bounded by count and size.
+    Every document is serialized exactly once. A document larger than `max_bytes`
+    is sent on its own.
+
+    Arguments:
+        documents {Iterable} -- Documents to insert.
+
+    Keyword Arguments:
+        max_documents {int} -- Maximum documents per chunk. (default: {500})
+        max_bytes {int} -- Maximum payload size per chunk. (default: {4MiB})
+        serializer {Callable} -- Turns one document into a JSON string.
+
+    Yields:
+        tuple -- (index of the first document, document count, payload bytes).
+    """
+    parts = []
+    size = 2
+    start = 0
+    index = 0
+    for index, document in enumerate(documents):
+        encoded = serializer(document).encode("utf-8")
+        if parts and (
+            len(parts) >= max_documents or size + len(encoded) + 1 > max_bytes
+        ):
+            yield start, len(parts), b"[" + b",".join(parts) + b"]"
+            parts = []
+            size = 2
+            start = index
+        parts.append(encoded)
+        size += len(encoded) + 1
+    if parts:
+        yield start, len(parts), b"[" + b",".join(parts) + b"]"
+
+
 class SmartFetch:
     """
     Essentially a wrapper around requests. Adds some handy error catching.
     Allows you to specify a base URL, and automatically adds bearer tokens
     if provided.
+
+    Every verb goes through a single pooled `requests.Session`, so repeated calls
+    against the same host reuse open TCP/TLS connections instead of paying a new
+    handshake each time. Use as a context manager, or call `close`, to release
+    the pool.
     """
 
-    def __init__(self, base_url=""):
+    def __init__(
+        self,
+        base_url="",
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout=None,
+        response_cache: ResponseCache = None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker=None,
+        metrics: RequestMetrics = None,
+        coalesce=False,
+        token_provider=None,
+    ):
+        """
+        Arguments:
+            base_url {str} -- Root URL prepended to every endpoint.
+
+        Keyword Arguments:
+            pool_connections {int} -- Number of per-host pools to cache. (default: {10})
+            pool_maxsize {int} -- Maximum connections kept open per host. (default: {10})
+            pool_block {bool} -- Block when the per-host pool is exhausted instead of
+                opening a throwaway connection. (default: {False})
+            keep_alive {bool} -- Keep connections open between requests. (default: {True})
+            timeout {float|tuple} -- Default (connect, read) timeout applied to requests
+                that don't pass their own. (default: {None})
+            response_cache {ResponseCache} -- Opt-in cache for conditional GETs.
+                (default: {None})
+            retry_policy {RetryPolicy} -- Retry behaviour for every verb. (default: {None})
+            circuit_breaker {CircuitBreaker|bool} -- Breaker for this backend; True uses
+                the breaker shared by all clients of the same host. (default: {None})
+            metrics {RequestMetrics} -- Collects counters, latencies and runs request
+                hooks. (default: {None})
+            coalesce {SingleFlight|bool} -- Share one in-flight request between
+                concurrent identical GETs; pass a SingleFlight to share it between
+                clients. (default: {False})
+            token_provider {TokenProvider} -- Supplies the bearer token for calls
+                that pass no token; a 401 is retried once with a fresh token.
+                (default: {None})
+        """
         self.base_url = base_url
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy
+        if circuit_breaker is True:
+            circuit_breaker = get_circuit_breaker(base_url)
+        self.circuit_breaker = circuit_breaker or None
+        self.metrics = metrics
+        if coalesce is True:
+            coalesce = SingleFlight()
+        self.single_flight = coalesce or None
+        self.token_provider = token_provider
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes every pooled connection held by the session.
+        """
+        self.session.close()
 
     def post(self, endpoint: str = None, code: int = 201, token: str = None, **kwargs):
         """Wrapper emulating the requests.post method with custom error handling.
@@ -104,8 +395,14 @@ class SmartFetch:
         Returns:
             requests.Response -- HTTP Response.
         """
-        return self.do_wrap(
-            requests.post, endpoint=endpoint, code=code, token=token, **kwargs
+        kwargs.setdefault("idempotent", False)
+        return self._write(
+            self.session.post,
+            endpoint=endpoint,
+            code=code,
+            token=token,
+            method="POST",
+            **kwargs
         )
 
     def get(self, endpoint: str = None, code: int = 200, token: str = None, **kwargs):
@@ -119,8 +416,37 @@ class SmartFetch:
         Returns:
             requests.Response -- HTTP Response.
         """
+        if self.single_flight is not None and not kwargs.get("stream"):
+            url = self._build_url(endpoint, kwargs.get("item_id"))
+            auth = self._auth_identity(token, kwargs.get("headers"))
+            key = (ResponseCache.make_key(url, kwargs.get("params"), auth), code)
+            return self.single_flight.do(
+                key,
+                lambda: self._get(endpoint=endpoint, code=code, token=token, **kwargs),
+            )
+        return self._get(endpoint=endpoint, code=code, token=token, **kwargs)
+
+    def _get(self, endpoint: str = None, code: int = 200, token: str = None, **kwargs):
+        """
+        Sends a GET, through the response cache when one is configured.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        if self.response_cache is not None and not kwargs.get("stream"):
+            return self._cached_get(endpoint=endpoint, code=code, token=token, **kwargs)
         return self.do_wrap(
-            requests.get, endpoint=endpoint, code=code, token=token, **kwargs
+            self.session.get,
+            endpoint=endpoint,
+            code=code,
+            token=token,
+            method="GET",
+            **kwargs
         )
 
     def patch(self, endpoint: str = None, code: int = 200, token: str = None, **kwargs):
@@ -138,8 +464,9 @@ class SmartFetch:
             kwargs["headers"].update({"X-HTTP-Method-Override": "PATCH"})
         else:
             kwargs.update({"headers": {"X-HTTP-Method-Override": "PATCH"}})
-        return self.do_wrap(
-            requests.post, endpoint=endpoint, code=code, token=token, **kwargs
+        kwargs.setdefault("idempotent", False)
+        return self._write(
+            self.session.post, endpoint=endpoint, code=code, token=token, **kwargs
         )
 
     def put(self, endpoint: str = None, code: int = 201, token: str = None, **kwargs):
@@ -157,8 +484,8 @@ class SmartFetch:
             kwargs["headers"].update({"X-HTTP-Method-Override": "PUT"})
         else:
             kwargs.update({"headers": {"X-HTTP-Method-Override": "PUT"}})
-        return self.do_wrap(
-            requests.post, endpoint=endpoint, code=code, token=token, **kwargs
+        return self._write(
+            self.session.post, endpoint=endpoint, code=code, token=token, **kwargs
         )
 
     def delete(
@@ -174,35 +501,474 @@ class SmartFetch:
         Returns:
             requests.Response -- HTTP Response.
         """
-        return self.do_wrap(
-            requests.delete, endpoint=endpoint, code=code, token=token, **kwargs
+        return self._write(
+            self.session.delete,
+            endpoint=endpoint,
+            code=code,
+            token=token,
+            method="DELETE",
+            **kwargs
         )
 
-    def do_wrap(
+    def download(
         self,
-        request_func,
+        destination,
         endpoint: str = None,
-        code=None,
+        code: int = 200,
         token: str = None,
-        item_id: str = None,
-        _etag: str = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **kwargs
+    ) -> int:
+        """Streams a GET response body to a file or sink in fixed-size chunks.
+
+        Arguments:
+            destination {str|PathLike|file|callable} -- File path, writable binary
+                file object, or callable receiving each chunk.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+            chunk_size {int} -- Bytes read per chunk. (default: {64KiB})
+
+        Returns:
+            int -- Number of bytes written.
+        """
+        kwargs["stream"] = True
+        response = self.get(endpoint=endpoint, code=code, token=token, **kwargs)
+        with response:
+            if isinstance(destination, (str, os.PathLike)):
+                with open(destination, "wb") as sink:
+                    return _copy_chunks(response, sink.write, chunk_size)
+            write = getattr(destination, "write", destination)
+            return _copy_chunks(response, write, chunk_size)
+
+    def upload(
+        self,
+        source,
+        endpoint: str = None,
+        code: int = 201,
+        token: str = None,
+        verb: str = "post",
+        use_mmap: bool = False,
         **kwargs
     ):
+        """Sends a file as the request body without reading it into memory.
+
+        Arguments:
+            source {str|PathLike|file} -- File path or readable binary file object.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {201})
+            token {str} -- JWT access token. (default: {None})
+            verb {str} -- One of "post", "put" or "patch". (default: {"post"})
+            use_mmap {bool} -- Memory-map a path source instead of reading it through a
+                file buffer. (default: {False})
+
+        Returns:
+            requests.Response -- HTTP Response.
         """
-        Wraps the passed request function with the decorator.
+        if verb not in ("post", "put", "patch"):
+            raise ValueError("Uploads must use post, put or patch")
+        send = getattr(self, verb)
+        if not isinstance(source, (str, os.PathLike)):
+            return send(
+                endpoint=endpoint, code=code, token=token, data=source, **kwargs
+            )
+
+        with open(source, "rb") as handle:
+            if use_mmap and os.fstat(handle.fileno()).st_size:
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return send(
+                        endpoint=endpoint, code=code, token=token, data=mapped, **kwargs
+                    )
+            return send(
+                endpoint=endpoint, code=code, token=token, data=handle, **kwargs
+            )
+
+    def get_many(
+        self,
+        item_ids: Iterable,
+        endpoint: str = None,
+        code: int = 200,
+        token: str = None,
+        max_workers: int = None,
+        **kwargs
+    ) -> List[BatchResult]:
+        """Fetches many documents by id in parallel.
 
         Arguments:
-            request_func {object} -- A requests function method.
+            item_ids {Iterable} -- Document ids, as strings or ObjectIds.
 
         Keyword Arguments:
             endpoint {str} -- API endpoint. (default: {None})
             code {int} -- Status code indicating success. (default: {200})
             token {str} -- JWT access token. (default: {None})
+            max_workers {int} -- Requests in flight at once. (default: {pool_maxsize})
+
+        Returns:
+            List[BatchResult] -- One result per id, in input order.
+        """
+        return self._map_items(
+            self.get,
+            item_ids,
+            max_workers,
+            endpoint=endpoint,
+            code=code,
+            token=token,
+            **kwargs
+        )
+
+    def delete_many(
+        self,
+        item_ids: Iterable,
+        endpoint: str = None,
+        code: int = 200,
+        token: str = None,
+        etags: dict = None,
+        max_workers: int = None,
+        **kwargs
+    ) -> List[BatchResult]:
+        """Deletes many documents by id in parallel.
+
+        Arguments:
+            item_ids {Iterable} -- Document ids, as strings or ObjectIds.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+            etags {dict} -- Maps str(item_id) to the document's _etag. (default: {None})
+            max_workers {int} -- Requests in flight at once. (default: {pool_maxsize})
+
+        Returns:
+            List[BatchResult] -- One result per id, in input order.
+        """
+        return self._map_items(
+            self.delete,
+            item_ids,
+            max_workers,
+            etags=etags,
+            endpoint=endpoint,
+            code=code,
+            token=token,
+            **kwargs
+        )
+
+    def post_bulk(
+        self,
+        documents: Iterable,
+        endpoint: str = None,
+        code: int = 201,
+        token: str = None,
+        max_documents: int = DEFAULT_BULK_DOCUMENTS,
+        max_bytes: int = DEFAULT_BULK_BYTES,
+        max_workers: int = None,
+        serializer=json.dumps,
+        **kwargs
+    ) -> List[BulkResult]:
+        """Inserts any number of documents with as few POSTs as the limits allow.
+
+        Documents are chunked lazily and at most two chunks per worker are held in
+        memory, so the input can be a generator of any length.
+
+        Arguments:
+            documents {Iterable} -- Documents to insert.
+
+        Keyword Arguments:
+            endpoint {str} -- Collection endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {201})
+            token {str} -- JWT access token. (default: {None})
+            max_documents {int} -- Maximum documents per request. (default: {500})
+            max_bytes {int} -- Maximum payload size per request. (default: {4MiB})
+            max_workers {int} -- Requests in flight at once. (default: {pool_maxsize})
+            serializer {Callable} -- Turns one document into a JSON string.
+
+        Returns:
+            List[BulkResult] -- One result per document, in input order.
+        """
+        results = []
+        workers = max_workers or self.pool_maxsize
+        chunks = chunk_documents(documents, max_documents, max_bytes, serializer)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for start, count, payload in chunks:
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results.extend(future.result())
+                pending.add(
+                    executor.submit(
+                        self._post_chunk,
+                        start,
+                        count,
+                        payload,
+                        endpoint=endpoint,
+                        code=code,
+                        token=token,
+                        **kwargs
+                    )
+                )
+            for future in pending:
+                results.extend(future.result())
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def _post_chunk(
+        self, start: int, count: int, payload: bytes, **kwargs
+    ) -> List[BulkResult]:
+        """
+        Sends one bulk chunk and maps Eve's `_items` back onto document indices.
+
+        Arguments:
+            start {int} -- Input index of the first document in the chunk.
+            count {int} -- Number of documents in the chunk.
+            payload {bytes} -- Serialized JSON array.
+
+        Returns:
+            List[BulkResult] -- One result per document in the chunk.
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.setdefault("Content-Type", "application/json")
+        responses = []
+
+        def send(url, **request_kwargs):
+            response = self.session.post(url, **request_kwargs)
+            responses.append(response)
+            return response
+
+        error = None
+        try:
+            self._write(
+                send,
+                data=payload,
+                headers=headers,
+                method="POST",
+                idempotent=False,
+                **kwargs
+            )
+        except (RuntimeError, requests.RequestException) as raised:
+            error = raised
+
+        items = []
+        if responses:
+            try:
+                body = responses[-1].json()
+                if isinstance(body, dict):
+                    items = body.get("_items", [body])
+            except ValueError:
+                items = []
+        if not isinstance(items, list) or len(items) != count:
+            items = [None] * count
+
+        results = []
+        for offset, item in enumerate(items):
+            item_error = error
+            if item_error is not None and isinstance(item, dict):
+                if item.get("_status") == "ERR":
+                    item_error = RuntimeError(
+                        "{}: {}".format(error, item.get("_issues", item))
+                    )
+            results.append(BulkResult(start + offset, item, item_error))
+        return results
+
+    def iter_items(
+        self,
+        endpoint: str = None,
+        code: int = 200,
+        token: str = None,
+        prefetch: bool = True,
+        **kwargs
+    ) -> Iterator[dict]:
+        """Lazily yields every document of an Eve collection, one at a time.
+
+        Pages are followed through `_links.next`. While the caller works through
+        one page, the next is fetched in the background, so at most two pages are
+        held in memory regardless of the collection size.
+
+        Keyword Arguments:
+            endpoint {str} -- Collection endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+            prefetch {bool} -- Fetch the next page while the current one is consumed.
+                (default: {True})
+            params {dict} -- Query parameters (`where`, `max_results`, ...) for the
+                first page; later pages take them from the next link.
+
+        Yields:
+            dict -- One document from `_items`.
+        """
+
+        def fetch_page(page_endpoint, page_kwargs):
+            page_kwargs = dict(page_kwargs)
+            if "headers" in page_kwargs:
+                page_kwargs["headers"] = dict(page_kwargs["headers"])
+            return self.get(
+                endpoint=page_endpoint, code=code, token=token, **page_kwargs
+            ).json()
+
+        next_kwargs = {key: value for key, value in kwargs.items() if key != "params"}
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        future = None
+        try:
+            page = fetch_page(endpoint, kwargs)
+            while page is not None:
+                next_endpoint = self._next_page_endpoint(page)
+                if next_endpoint is None:
+                    future = None
+                elif executor:
+                    future = executor.submit(fetch_page, next_endpoint, next_kwargs)
+
+                items = page.get("_items", [])
+                page = None
+                yield from items
+
+                if future is not None:
+                    page = future.result()
+                elif next_endpoint is not None and not executor:
+                    page = fetch_page(next_endpoint, next_kwargs)
+        finally:
+            if future is not None:
+                future.cancel()
+            if executor:
+                executor.shutdown(wait=False)
+
+    def _next_page_endpoint(self, page: dict) -> Optional[str]:
+        """
+        Extracts the next page from an Eve response as an endpoint relative to base_url.
+
+        Arguments:
+            page {dict} -- Decoded Eve collection response.
+
+        Returns:
+            Optional[str] -- Endpoint with query string, or None on the last page.
+        """
+        href = page.get("_links", {}).get("next", {}).get("href")
+        if not href:
+            return None
+        if self.base_url and href.startswith(self.base_url):
+            href = href[len(self.base_url) :]
+        return href.lstrip("/")
+
+    def _map_items(
+        self, method, item_ids, max_workers: int = None, etags: dict = None, **kwargs
+    ) -> List[BatchResult]:
+        """
+        Runs `method` once per item id on a worker pool, capturing failures per item.
+
+        Arguments:
+            method {object} -- Bound SmartFetch verb.
+            item_ids {Iterable} -- Document ids.
+
+        Returns:
+            List[BatchResult] -- One result per id, in input order.
+        """
+        item_ids = list(item_ids)
+        if not item_ids:
+            return []
+
+        def call(item_id):
+            call_kwargs = dict(kwargs)
+            # Each request gets its own headers since the verbs update them in place.
+            if "headers" in kwargs:
+                call_kwargs["headers"] = dict(kwargs["headers"])
+            if etags and str(item_id) in etags:
+                call_kwargs["_etag"] = etags[str(item_id)]
+            try:
+                response = method(item_id=item_id, **call_kwargs)
+                return BatchResult(item_id, response=response)
+            except (RuntimeError, requests.RequestException) as error:
+                return BatchResult(item_id, error=error)
+
+        workers = min(max_workers or self.pool_maxsize, len(item_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, item_ids))
+
+    def _cached_get(self, endpoint: str = None, item_id: str = None, **kwargs):
+        """
+        GET that revalidates a cached copy with If-None-Match and serves it on a 304.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
             item_id {str} -- Id of a specific document. (default: {None})
 
         Returns:
             requests.Response -- HTTP Response.
         """
+        cache = self.response_cache
+        url = self._build_url(endpoint, item_id)
+        auth = self._auth_identity(kwargs.get("token"), kwargs.get("headers"))
+        key = cache.make_key(url, kwargs.get("params"), auth)
+        entry = cache.lookup(key)
+        if entry is not None:
+            kwargs["headers"] = dict(kwargs.get("headers") or {})
+            kwargs["headers"]["If-None-Match"] = entry.etag
+
+        not_modified = []
+
+        def conditional_get(request_url, **request_kwargs):
+            response = self.session.get(request_url, **request_kwargs)
+            if entry is not None and response.status_code == 304:
+                not_modified.append(response)
+                cache.record_hit()
+                return entry.to_response(response)
+            return response
+
+        response = self.do_wrap(
+            conditional_get, endpoint=endpoint, item_id=item_id, method="GET", **kwargs
+        )
+        if not not_modified:
+            cache.store(key, response)
+        return response
+
+    def _write(self, request_func, endpoint: str = None, item_id: str = None, **kwargs):
+        """
+        Sends a write and drops any cached GETs it may have made stale.
+
+        Arguments:
+            request_func {object} -- A requests function or session method.
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        try:
+            return self.do_wrap(
+                request_func, endpoint=endpoint, item_id=item_id, **kwargs
+            )
+        finally:
+            if self.response_cache is not None:
+                self.response_cache.invalidate(self._build_url(endpoint, item_id))
+
+    def _auth_identity(self, token: str = None, headers: dict = None) -> Optional[str]:
+        """
+        The credential a request will be sent with, for coalescing and cache keys.
+        Resolved before sending, so clients with different token providers sharing
+        a SingleFlight or ResponseCache never share keys.
+
+        Keyword Arguments:
+            token {str} -- JWT access token. (default: {None})
+            headers {dict} -- Request headers. (default: {None})
+
+        Returns:
+            Optional[str] -- Token or Authorization header, or None if anonymous.
+        """
+        auth = token or (headers or {}).get("Authorization")
+        if not auth and self.token_provider is not None:
+            auth = self.token_provider.get_token()
+        return auth
+
+    def _build_url(self, endpoint: str = None, item_id: str = None) -> str:
+        """
+        Joins base_url, endpoint and item id.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            item_id {str} -- Id of a specific document. (default: {None})
+
+        Returns:
+            str -- Request URL.
+        """
         url = self.base_url
 
         if endpoint:
@@ -213,8 +979,111 @@ class SmartFetch:
                 item_id = str(item_id)
             url += "/" + item_id
 
-        @graceful_handling(code, token, _etag)
-        def wrapped_request(**kwargs):
+        return url
+
+    @staticmethod
+    def _retry_unauthorized(send, provider, token: str):
+        """
+        Wraps `send` so that a 401 is retried once with a freshly fetched token.
+        """
+
+        def send_authorized(**kwargs):
+            resendable, body_start = _rewind_point(kwargs.get("data"))
+            response = send(**kwargs)
+            if response.status_code != 401 or not resendable:
+                return response
+            provider.invalidate(token)
+            fresh = provider.get_token()
+            if fresh == token:
+                return response
+            response.close()
+            if body_start is not None:
+                kwargs["data"].seek(body_start)
+            # Updated in place so retries by the retry policy use it too.
+            kwargs["headers"]["Authorization"] = "Bearer {}".format(fresh)
+            return send(**kwargs)
+
+        return send_authorized
+
+    def do_wrap(
+        self,
+        request_func,
+        endpoint: str = None,
+        code=None,
+        token: str = None,
+        item_id: str = None,
+        _etag: str = None,
+        idempotent: bool = True,
+        method: str = None,
+        **kwargs
+    ):
+        """
+        Wraps the passed request function with the decorator.
+
+        Arguments:
+            request_func {object} -- A requests function or session method.
+
+        Keyword Arguments:
+            endpoint {str} -- API endpoint. (default: {None})
+            code {int} -- Status code indicating success. (default: {200})
+            token {str} -- JWT access token. (default: {None})
+            item_id {str} -- Id of a specific document. (default: {None})
+            idempotent {bool} -- Whether the retry policy may resend the request freely.
+                (default: {True})
+            method {str} -- Verb label for metrics; inferred if omitted. (default: {None})
+
+        Returns:
+            requests.Response -- HTTP Response.
+        """
+        url = self._build_url(endpoint, item_id)
+
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+
+        def send(**kwargs):
             return request_func(url, **kwargs)
 
-        return wrapped_request(**kwargs)
+        provider = self.token_provider
+        if (
+            provider is not None
+            and not token
+            and "Authorization" not in (kwargs.get("headers") or {})
+        ):
+            token = provider.get_token()
+            send = self._retry_unauthorized(send, provider, token)
+
+        metrics = self.metrics
+        if metrics is not None and metrics.enabled:
+            if method is None:
+                override = (kwargs.get("headers") or {}).get("X-HTTP-Method-Override")
+                method = override or getattr(request_func, "__name__", "request")
+            method = method.upper()
+            send = metrics.instrument(method, url, send)
+
+        wrapped_request = graceful_handling(
+            code,
+            token,
+            _etag,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
+            idempotent=idempotent,
+        )(send)
+
+        if metrics is None or not metrics.enabled:
+            return wrapped_request(**kwargs)
+
+        started = time.perf_counter()
+        error = False
+        try:
+            return wrapped_request(**kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record_attempts(
+                (endpoint or "").split("?", 1)[0],
+                method,
+                send.attempts,
+                time.perf_counter() - started,
+                error,
+            )
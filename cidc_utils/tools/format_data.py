@@ -1,9 +1,20 @@
 """
 A set of tools for common CIDC tasks.
 """
+import io
 import json
+import re
+from typing import IO, Iterator, Union
+
 import attr
 
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = "0123456789.eE+-"
+_KEY_START = re.compile(r'[ \t\n\r]*"')
+_COLON = re.compile(r"[ \t\n\r]*:[ \t\n\r]*")
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,}])")
+
 
 @attr.s
 class TrialRecord(object):
@@ -54,27 +65,167 @@ class DataRecord(object):
     processed = attr.ib()
 
 
-def convert_input_json(path: str) -> dict:
+class _JsonStream(object):
+    """
+    Buffer over a text stream that hands out one JSON value at a time.
+    """
+
+    def __init__(self, stream: IO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        """
+        Reads at least `size` more characters, dropping what was consumed.
+        """
+        if self.eof:
+            return False
+        chunk = self.stream.read(size)
+        if isinstance(chunk, bytes):
+            raise ValueError("Open the input file in text mode.")
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it,
+        or "" at end of input.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill(self.chunk_size):
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        found = self.next_char()
+        if found != char:
+            raise ValueError("Expected %r in input JSON, found %r" % (char, found or "EOF"))
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next value, reading more input until it is complete.
+        """
+        self.next_char()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+                # Double the read for long values so they aren't re-parsed per chunk.
+                size *= 2
+                continue
+            # A number cut by the end of the buffer may continue in the next chunk.
+            truncated = isinstance(value, (int, float)) and (
+                end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS
+            )
+            if not truncated or not self._fill(size):
+                self.pos = end
+                return value
+
+    def entry(self) -> tuple:
+        """
+        Decodes the next `"key": value` pair and the "," or "}" after it.
+
+        Returns:
+            tuple -- (key, value, separator).
+        """
+        # Fast path: the whole entry is already buffered.
+        buffer = self.buffer
+        start = _KEY_START.match(buffer, self.pos)
+        if start:
+            try:
+                key, end = json.decoder.scanstring(buffer, start.end())
+                colon = _COLON.match(buffer, end)
+                if colon:
+                    value, end = _DECODER.raw_decode(buffer, colon.end())
+                    separator = _SEPARATOR.match(buffer, end)
+                    if separator:
+                        self.pos = separator.end()
+                        return key, value, separator.group(1)
+            except json.JSONDecodeError:
+                pass
+        # The entry spans a chunk boundary, or is malformed.
+        if self.next_char() != '"':
+            self.expect('"')
+        key = self.value()
+        self.expect(":")
+        value = self.value()
+        separator = self.next_char()
+        if separator != ",":
+            self.expect("}")
+        else:
+            self.pos += 1
+        return key, value, separator
+
+
+def iter_input_json(source: Union[str, IO], chunk_size: int = 65536) -> Iterator[dict]:
+    """
+    Streams the top-level keys of an input.json file as mongo records,
+    without loading the whole file.
+
+    Only one chunk and the value being decoded are held in memory, so memory
+    does not grow with the file size. Unlike json.loads, a repeated key is
+    yielded each time it appears.
+
+    Arguments:
+        source {Union[str, IO]} -- Path to input file, or a file object open in
+            text mode.
+
+    Keyword Arguments:
+        chunk_size {int} -- Characters read at a time. (default: {65536})
+
+    Raises:
+        ValueError -- If the input is not a JSON object.
+
+    Returns:
+        Iterator[dict] -- {"key_name", "key_value"} records, in file order.
+    """
+    if isinstance(source, str):
+        with io.open(source, 'r') as input_json:
+            yield from iter_input_json(input_json, chunk_size)
+        return
+    stream = _JsonStream(source, chunk_size)
+    stream.expect("{")
+    if stream.next_char() == "}":
+        stream.pos += 1
+    else:
+        separator = ","
+        while separator == ",":
+            key, value, separator = stream.entry()
+            yield {"key_name": key, "key_value": value}
+    if stream.next_char():
+        raise ValueError("Extra data after the top-level object")
+
+
+def convert_input_json(path: Union[str, IO]) -> list:
     """
     Takes an input.json file and coverts into into a dictionary
     object that can be inserted into MongoDB
 
     Arguments:
-        path {str} -- Path to input file.
+        path {Union[str, IO]} -- Path to input file, or an open file object.
 
     Returns:
-        dict -- Formatted dictionary in the form of a mongo record.
+        list -- Formatted dictionaries in the form of mongo records.
     """
-    with open(path, 'r') as input_json:
-        json_str = json.loads(input_json.read())
-        return [{"key_name": key, "key_value": value} for key, value in json_str.items()]
+    return list(iter_input_json(path))
 
 
 def create_record(input_path, wdl_location, non_static_inputs, assay_name):
     """Create sample records for mongo insert
 
     Arguments:
-        input_path {[type]} -- [description]
+        input_path {Union[str, IO]} -- Path to, or open file of, the input.json
         wdl_location {[type]} -- [description]
         non_static_inputs {[type]} -- [description]
         assay_name {[type]} -- [description]
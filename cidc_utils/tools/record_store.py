@@ -0,0 +1,326 @@
+"""
+In-memory store of data records with hash indexes on selected fields.
+"""
+from typing import Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from cidc_utils.tools.records import to_dict
+
+DEFAULT_INDEXES = ("trial", "assay", "sample_id", "gs_uri", "processed")
+DEFAULT_COMPOUND_INDEXES = (("trial", "assay", "sample_id"),)
+
+
+class RecordStore(object):
+    """
+    Mongo-style records keyed by `_id`, with hash indexes for lookups by value.
+
+    Each indexed field maps a value to the set of keys holding it, and a compound
+    index maps a tuple of values to keys, so `find` costs the size of the
+    smallest matching index bucket rather than a scan of every record. Criteria
+    on fields without an index filter those candidates. A record missing an
+    indexed field is indexed under None.
+
+    Records are stored as given; change them through `update` or `upsert`, not
+    in place, or the indexes go stale. Indexed values must be hashable.
+
+    Not thread-safe: a write updates the record table and each index in turn, so
+    a concurrent reader can see them disagree. Guard a store shared between
+    threads with a lock.
+    """
+
+    def __init__(
+        self,
+        records: Iterable = (),
+        indexes: Sequence[str] = DEFAULT_INDEXES,
+        compound_indexes: Sequence[Tuple[str, ...]] = DEFAULT_COMPOUND_INDEXES,
+        key: str = "_id",
+    ):
+        """
+        Keyword Arguments:
+            records {Iterable} -- Dicts or attr.s records to load. (default: {()})
+            indexes {Sequence[str]} -- Fields with their own index.
+                (default: {DEFAULT_INDEXES})
+            compound_indexes {Sequence[Tuple[str, ...]]} -- Field tuples indexed
+                together. (default: {DEFAULT_COMPOUND_INDEXES})
+            key {str} -- Field identifying a record. (default: {"_id"})
+        """
+        self.key = key
+        self._records = {}
+        self._indexes = {field: {} for field in indexes}
+        self._compound = {tuple(fields): {} for fields in compound_indexes}
+        self.load(records)
+
+    @classmethod
+    def from_smartfetch(
+        cls,
+        fetcher,
+        endpoint: str,
+        indexes: Sequence[str] = DEFAULT_INDEXES,
+        compound_indexes: Sequence[Tuple[str, ...]] = DEFAULT_COMPOUND_INDEXES,
+        **kwargs
+    ) -> "RecordStore":
+        """
+        Loads a whole Eve collection, page by page, without holding the pages.
+
+        Arguments:
+            fetcher {SmartFetch} -- Client for the API.
+            endpoint {str} -- Collection endpoint.
+
+        Keyword Arguments:
+            indexes {Sequence[str]} -- Fields with their own index.
+                (default: {DEFAULT_INDEXES})
+            compound_indexes {Sequence[Tuple[str, ...]]} -- Field tuples indexed
+                together. (default: {DEFAULT_COMPOUND_INDEXES})
+            kwargs -- Passed to SmartFetch.iter_items, e.g. token and params.
+
+        Returns:
+            RecordStore -- The loaded store.
+        """
+        return cls(
+            fetcher.iter_items(endpoint=endpoint, **kwargs),
+            indexes=indexes,
+            compound_indexes=compound_indexes,
+        )
+
+    def load(self, records: Iterable) -> int:
+        """
+        Upserts many records.
+
+        Arguments:
+            records {Iterable} -- Dicts or attr.s records.
+
+        Returns:
+            int -- Number of records loaded.
+        """
+        count = 0
+        for record in records:
+            self.upsert(record)
+            count += 1
+        return count
+
+    def insert(self, record) -> None:
+        """
+        Adds a new record.
+
+        Arguments:
+            record {Union[dict, object]} -- Dict or attr.s record.
+
+        Raises:
+            ValueError -- If the record has no key or the key is already stored.
+            TypeError -- If an indexed value is unhashable.
+        """
+        record = self._as_dict(record)
+        if record[self.key] in self._records:
+            raise ValueError("Record %r is already stored" % (record[self.key],))
+        self._add(record, self._index_entries(record))
+
+    def upsert(self, record) -> None:
+        """
+        Adds a record, replacing any stored under the same key.
+
+        Arguments:
+            record {Union[dict, object]} -- Dict or attr.s record.
+
+        Raises:
+            ValueError -- If the record has no key.
+            TypeError -- If an indexed value is unhashable.
+        """
+        record = self._as_dict(record)
+        entries = self._index_entries(record)
+        previous = self._records.get(record[self.key])
+        if previous is not None:
+            self._discard(previous)
+        self._add(record, entries)
+
+    def update(self, key, changes: dict) -> dict:
+        """
+        Changes some fields of a stored record and re-indexes it.
+
+        Arguments:
+            key {object} -- Key of the record.
+            changes {dict} -- New field values.
+
+        Raises:
+            KeyError -- If no record has that key.
+            ValueError -- If the changes alter the key.
+            TypeError -- If an indexed value is unhashable; nothing is changed.
+
+        Returns:
+            dict -- The updated record, a new dict.
+        """
+        previous = self._records[key]
+        if changes.get(self.key, key) != key:
+            raise ValueError("Use remove and insert to change a record's key")
+        record = dict(previous, **changes)
+        entries = self._index_entries(record)
+        self._discard(previous)
+        self._add(record, entries)
+        return record
+
+    def remove(self, key) -> dict:
+        """
+        Arguments:
+            key {object} -- Key of the record.
+
+        Raises:
+            KeyError -- If no record has that key.
+
+        Returns:
+            dict -- The removed record.
+        """
+        record = self._records[key]
+        self._discard(record)
+        return record
+
+    def get(self, key, default=None) -> Optional[dict]:
+        """
+        Arguments:
+            key {object} -- Key of the record.
+
+        Returns:
+            Optional[dict] -- The record, or default.
+        """
+        return self._records.get(key, default)
+
+    def find_keys(self, **criteria) -> Set:
+        """
+        Keys of the records whose fields equal every given value. Index buckets
+        are intersected smallest first; other fields are checked per candidate.
+
+        Keyword Arguments:
+            criteria -- field=value pairs, e.g. trial=..., processed=False.
+
+        Returns:
+            Set -- Matching keys; every key if no criteria are given.
+        """
+        if not criteria:
+            return set(self._records)
+        buckets = []
+        covered = set()
+        for fields, index in self._compound.items():
+            if covered.issuperset(fields) or not all(f in criteria for f in fields):
+                continue
+            buckets.append(index.get(tuple(criteria[f] for f in fields), _EMPTY))
+            covered.update(fields)
+        for field, value in criteria.items():
+            if field in self._indexes and field not in covered:
+                buckets.append(self._indexes[field].get(value, _EMPTY))
+                covered.add(field)
+        if buckets:
+            buckets.sort(key=len)
+            keys = set(buckets[0])
+            for bucket in buckets[1:]:
+                if not keys:
+                    break
+                keys.intersection_update(bucket)
+        else:
+            keys = set(self._records)
+        unindexed = [(f, v) for f, v in criteria.items() if f not in covered]
+        if unindexed:
+            records = self._records
+            keys = {
+                key
+                for key in keys
+                if all(records[key].get(f) == v for f, v in unindexed)
+            }
+        return keys
+
+    def find(self, **criteria) -> List[dict]:
+        """
+        Keyword Arguments:
+            criteria -- field=value pairs, e.g. trial=..., assay=..., sample_id=...
+
+        Returns:
+            List[dict] -- Matching records, in no particular order.
+        """
+        return [self._records[key] for key in self.find_keys(**criteria)]
+
+    def count(self, **criteria) -> int:
+        """
+        Keyword Arguments:
+            criteria -- field=value pairs.
+
+        Returns:
+            int -- Number of matching records.
+        """
+        if len(criteria) == 1:
+            ((field, value),) = criteria.items()
+            if field in self._indexes:
+                return len(self._indexes[field].get(value, _EMPTY))
+        return len(self.find_keys(**criteria))
+
+    def distinct(self, field: str) -> Set:
+        """
+        Arguments:
+            field {str} -- An indexed field.
+
+        Raises:
+            KeyError -- If the field has no index.
+
+        Returns:
+            Set -- Values the field takes across stored records.
+        """
+        return set(self._indexes[field])
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._records.values())
+
+    def _as_dict(self, record) -> dict:
+        if not isinstance(record, dict):
+            record = to_dict(record)
+        if self.key not in record:
+            raise ValueError("Record has no %r field" % self.key)
+        return record
+
+    def _index_entries(self, record: dict) -> list:
+        """
+        The (index, value) pairs for a record, hashed up front so a bad value
+        fails before any index is touched.
+        """
+        entries = [
+            (buckets, record.get(field)) for field, buckets in self._indexes.items()
+        ]
+        entries.extend(
+            (buckets, _values(record, fields))
+            for fields, buckets in self._compound.items()
+        )
+        for _, value in entries:
+            hash(value)
+        return entries
+
+    def _add(self, record: dict, entries: list) -> None:
+        key = record[self.key]
+        for buckets, value in entries:
+            buckets.setdefault(value, set()).add(key)
+        self._records[key] = record
+
+    def _discard(self, record: dict) -> None:
+        key = record[self.key]
+        for field, buckets in self._indexes.items():
+            _remove_from(buckets, record.get(field), key)
+        for fields, buckets in self._compound.items():
+            _remove_from(buckets, _values(record, fields), key)
+        del self._records[key]
+
+
+_EMPTY = frozenset()
+
+
+def _values(record: dict, fields: Tuple[str, ...]) -> tuple:
+    return tuple(record.get(field) for field in fields)
+
+
+def _remove_from(buckets: dict, value, key) -> None:
+    """
+    Drops key from a bucket, and the bucket once empty, so distinct stays exact.
+    """
+    bucket = buckets.get(value)
+    if bucket is not None:
+        bucket.discard(key)
+        if not bucket:
+            del buckets[value]
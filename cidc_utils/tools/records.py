@@ -0,0 +1,271 @@
+"""
+Compact record types, and a columnar batch for large sets of DataRecords.
+"""
+from array import array
+from functools import lru_cache, partial
+from typing import Iterable, Iterator, Union
+
+import attr
+
+from cidc_utils.tools.format_data import DataRecord
+
+
+@attr.s(slots=True)
+class CompactTrialRecord(object):
+    """
+    Slotted TrialRecord: same fields, no per-instance __dict__.
+    """
+
+    trial_name = attr.ib()
+    principal_investigator = attr.ib()
+    start_date = attr.ib()
+    samples = attr.ib(factory=list)
+    assays = attr.ib(factory=list)
+    collaborators = attr.ib(factory=list)
+
+
+@attr.s(slots=True)
+class CompactAssayRecord(object):
+    """
+    Slotted AssayRecord: same fields, no per-instance __dict__.
+    """
+
+    assay_name = attr.ib()
+    wdl_location = attr.ib()
+    static_inputs = attr.ib(factory=list)
+    non_static_inputs = attr.ib(factory=list)
+
+
+@attr.s(slots=True)
+class CompactDataRecord(object):
+    """
+    Slotted DataRecord: same fields, no per-instance __dict__.
+    """
+
+    _id = attr.ib()
+    assay = attr.ib()
+    trial = attr.ib()
+    file_name = attr.ib()
+    sample_id = attr.ib()
+    mapping = attr.ib()
+    gs_uri = attr.ib()
+    date_created = attr.ib()
+    processed = attr.ib()
+
+
+DATA_RECORD_FIELDS = tuple(field.name for field in attr.fields(DataRecord))
+
+# Few distinct values across many records: stored as codes into a value table.
+_CATEGORICAL = ("assay", "trial", "sample_id", "mapping")
+# processed is kept as one signed byte per record, with -1 standing for None.
+_FLAGS = {True: 1, False: 0, None: -1}
+_FLAG_VALUES = (False, True, None)
+
+
+@lru_cache(maxsize=None)
+def _init_arguments(record_class) -> tuple:
+    # attrs strips the leading underscore from __init__ arguments.
+    return tuple(
+        (field.name, field.name.lstrip("_")) for field in attr.fields(record_class)
+    )
+
+
+def from_dict(record_class, document: dict):
+    """
+    Builds a record from a Mongo-style dict, ignoring keys that aren't fields.
+
+    Arguments:
+        record_class {type} -- An attr.s record class.
+        document {dict} -- Mongo document; "_id" maps to the `_id` field.
+
+    Returns:
+        object -- The record.
+    """
+    return record_class(
+        **{
+            argument: document[name]
+            for name, argument in _init_arguments(record_class)
+            if name in document
+        }
+    )
+
+
+def to_dict(record) -> dict:
+    """
+    Arguments:
+        record {object} -- An attr.s record.
+
+    Returns:
+        dict -- Mongo-style dict of its fields, not copying nested values.
+    """
+    return attr.asdict(record, recurse=False)
+
+
+class _Categories(object):
+    """
+    Dictionary-encoded column: one 32-bit code per row into a table of values.
+    """
+
+    __slots__ = ("codes", "values", "_lookup")
+
+    def __init__(self):
+        self.codes = array("I")
+        self.values = []
+        self._lookup = {}
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def encode(self, value) -> int:
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __setitem__(self, index, value):
+        self.codes[index] = self.encode(value)
+
+    def __iter__(self):
+        return map(self.values.__getitem__, self.codes)
+
+
+class DataRecordBatch(object):
+    """
+    Many DataRecords stored column by column.
+
+    trial, assay, sample_id and mapping repeat heavily across an upload, so
+    each is dictionary-encoded into an array of codes; processed is an array
+    of bytes; the remaining, mostly unique, fields are plain lists. Values of
+    the encoded columns must be hashable, and processed must be a bool or None.
+    """
+
+    def __init__(self, records: Iterable = ()):
+        """
+        Keyword Arguments:
+            records {Iterable} -- Mongo-style dicts or DataRecord-like objects
+                to start with. (default: {()})
+        """
+        self._columns = {
+            name: _Categories() if name in _CATEGORICAL else []
+            for name in DATA_RECORD_FIELDS
+            if name != "processed"
+        }
+        self._processed = array("b")
+        self.extend(records)
+
+    @classmethod
+    def from_dicts(cls, documents: Iterable[dict]) -> "DataRecordBatch":
+        """
+        Arguments:
+            documents {Iterable[dict]} -- Mongo documents, e.g. a SmartFetch
+                `_items` list. Missing fields are stored as None.
+
+        Returns:
+            DataRecordBatch -- A batch holding them.
+        """
+        return cls(documents)
+
+    def append(self, record: Union[dict, object]) -> None:
+        """
+        Adds a record.
+
+        Arguments:
+            record {Union[dict, object]} -- Mongo-style dict or DataRecord-like object.
+        """
+        self.extend((record,))
+
+    def extend(self, records: Iterable) -> None:
+        """
+        Adds records, column by column.
+
+        Arguments:
+            records {Iterable} -- Mongo-style dicts or DataRecord-like objects.
+        """
+        appends = [(name, column.append) for name, column in self._columns.items()]
+        add_flag = self._processed.append
+        try:
+            for record in records:
+                get = (
+                    record.get if isinstance(record, dict) else partial(getattr, record)
+                )
+                flag = _FLAGS[get("processed")]
+                for name, add in appends:
+                    add(get(name))
+                add_flag(flag)
+        except Exception:
+            # Drop the half-added row so the columns stay aligned.
+            self._truncate(len(self))
+            raise
+
+    def _truncate(self, length: int) -> None:
+        for column in self._columns.values():
+            if isinstance(column, _Categories):
+                del column.codes[length:]
+            else:
+                del column[length:]
+
+    def __len__(self):
+        return len(self._processed)
+
+    def column(self, name: str) -> Iterator:
+        """
+        Arguments:
+            name {str} -- A DataRecord field.
+
+        Raises:
+            KeyError -- If name isn't a DataRecord field.
+
+        Returns:
+            Iterator -- The column's values, in row order.
+        """
+        if name == "processed":
+            return map(_FLAG_VALUES.__getitem__, self._processed)
+        return iter(self._columns[name])
+
+    def get_value(self, index: int, name: str):
+        """
+        Arguments:
+            index {int} -- Row.
+            name {str} -- A DataRecord field.
+
+        Returns:
+            object -- The value of that field in that row.
+        """
+        if name == "processed":
+            return _FLAG_VALUES[self._processed[index]]
+        return self._columns[name][index]
+
+    def set_value(self, index: int, name: str, value) -> None:
+        """
+        Updates one field of one row in place.
+
+        Arguments:
+            index {int} -- Row.
+            name {str} -- A DataRecord field.
+            value {object} -- New value.
+        """
+        if name == "processed":
+            self._processed[index] = _FLAGS[value]
+        else:
+            self._columns[name][index] = value
+
+    def __getitem__(self, index: int) -> CompactDataRecord:
+        return CompactDataRecord(
+            *(self.get_value(index, name) for name in DATA_RECORD_FIELDS)
+        )
+
+    def __iter__(self) -> Iterator[CompactDataRecord]:
+        for row in zip(*(self.column(name) for name in DATA_RECORD_FIELDS)):
+            yield CompactDataRecord(*row)
+
+    def to_dicts(self) -> Iterator[dict]:
+        """
+        Returns:
+            Iterator[dict] -- A Mongo-style dict per row, built lazily.
+        """
+        for row in zip(*(self.column(name) for name in DATA_RECORD_FIELDS)):
+            yield dict(zip(DATA_RECORD_FIELDS, row))
@@ -0,0 +1,103 @@
+"""
+Unit tests for the background alert dispatcher
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+from cidc_utils.loghandler.alerts import AlertDispatcher
+
+
+def _dispatcher(**kwargs):
+    sender = MagicMock(return_value=True)
+    dispatcher = AlertDispatcher(sender, digest_interval=60, **kwargs)
+    return dispatcher, sender
+
+
+def test_single_alert_sent_on_flush():
+    """
+    Test that a lone alert is sent as is.
+    """
+    dispatcher, sender = _dispatcher()
+    dispatcher.submit("disk full", ["a@x.org"])
+    sender.assert_not_called()
+    assert dispatcher.flush()
+    sender.assert_called_once_with("STACKDRIVER_NOTIFICATION", "disk full", ["a@x.org"])
+    assert dispatcher.counters["sent_alerts"] == 1
+    dispatcher.close()
+
+
+def test_duplicates_and_digest():
+    """
+    Test that duplicates are counted and a burst becomes one digest.
+    """
+    dispatcher, sender = _dispatcher()
+    for _ in range(50):
+        dispatcher.submit("db down", ["a@x.org"])
+    dispatcher.submit("queue stuck", ["a@x.org"])
+    assert dispatcher.flush()
+    sender.assert_called_once()
+    subject, text, recipients = sender.call_args[0]
+    assert "digest" in subject
+    assert "[x50] db down" in text
+    assert "[x1] queue stuck" in text
+    assert dispatcher.counters["suppressed_duplicates"] == 49
+    assert dispatcher.counters["digests"] == 1
+
+    # Still within the de-duplication window.
+    dispatcher.submit("db down", ["a@x.org"])
+    assert dispatcher.flush()
+    assert sender.call_count == 1
+
+    dispatcher.clock = lambda: 10**9
+    dispatcher.submit("db down", ["a@x.org"])
+    assert dispatcher.flush()
+    assert sender.call_count == 2
+    dispatcher.close()
+
+
+def test_rate_limit_per_recipient():
+    """
+    Test that recipients over their limit are skipped and counted.
+    """
+    dispatcher, sender = _dispatcher(max_emails_per_recipient=2, dedup_window=0)
+    for index in range(4):
+        dispatcher.submit("alert {}".format(index), ["a@x.org"])
+        assert dispatcher.flush()
+    assert sender.call_count == 2
+    assert dispatcher.counters["rate_limited"] == 2
+    dispatcher.close()
+
+
+def test_submit_never_waits_on_sender():
+    """
+    Test that a stalled sender doesn't block submit.
+    """
+    release = threading.Event()
+    sender = MagicMock(side_effect=lambda *args: release.wait(5))
+    dispatcher = AlertDispatcher(sender, digest_interval=0, queue_size=5)
+    for index in range(20):
+        dispatcher.submit("alert {}".format(index), ["a@x.org"])
+    assert dispatcher.counters["dropped"] > 0
+    release.set()
+    dispatcher.close()
+
+
+def test_flush_times_out_on_full_queue():
+    """
+    Test that flush and close give up after their timeout when a stalled worker
+    has left the queue full.
+    """
+    release = threading.Event()
+    sender = MagicMock(side_effect=lambda *args: release.wait(5))
+    dispatcher = AlertDispatcher(sender, digest_interval=0, queue_size=1)
+    dispatcher.submit("first", ["a@x.org"])
+    deadline = time.monotonic() + 5
+    while not sender.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    dispatcher.submit("second", ["a@x.org"])
+    started = time.monotonic()
+    assert not dispatcher.flush(timeout=0.1)
+    dispatcher.close(timeout=0.1)
+    assert time.monotonic() - started < 2
+    release.set()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the AsyncSmartFetch class
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cidc_utils.requests import AsyncSmartFetch
+
+
+def test_async_smartfetch_get():
+    """
+    Test that a coroutine request builds the same URL and headers as SmartFetch.
+    """
+
+    async def run():
+        async with AsyncSmartFetch("http://localhost") as fetch:
+            return await fetch.get(endpoint="trials", item_id="abc", token="tok")
+
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        response = asyncio.run(run())
+        assert response.status_code == 200
+        mock_get.assert_called_once_with(
+            "http://localhost/trials/abc", headers={"Authorization": "Bearer tok"}
+        )
+
+
+def test_async_smartfetch_fails():
+    """
+    Test that unexpected status codes raise a RuntimeError, like SmartFetch.
+    """
+
+    async def run():
+        async with AsyncSmartFetch("") as fetch:
+            await fetch.patch(endpoint="trials", _etag="1234")
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value.status_code = 412
+        mock_post.return_value.reason = "Precondition Failed"
+        mock_post.return_value.json.return_value = {}
+        with pytest.raises(RuntimeError, match="412"):
+            asyncio.run(run())
+        headers = mock_post.call_args[1]["headers"]
+        assert headers == {"X-HTTP-Method-Override": "PATCH", "If-Match": "1234"}
+
+
+def test_async_smartfetch_bounded_concurrency():
+    """
+    Test that no more than max_concurrency requests run at once.
+    """
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def slow_get(*args, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+        return MagicMock(status_code=200)
+
+    async def run():
+        async with AsyncSmartFetch("", max_concurrency=3) as fetch:
+            return await asyncio.gather(
+                *[fetch.get(endpoint="trials", item_id=str(i)) for i in range(12)]
+            )
+
+    with patch("requests.Session.get", side_effect=slow_get):
+        responses = asyncio.run(run())
+    assert len(responses) == 12
+    assert 1 < state["peak"] <= 3
@@ -0,0 +1,69 @@
+"""
+Unit tests for single-flight request coalescing
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cidc_utils.requests import SingleFlight, SmartFetch
+
+
+def test_single_flight_shares_result_and_error():
+    """
+    Test that concurrent callers share one execution, including its exception.
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait()
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, "key", work) for _ in range(5)]
+        while flight.stats()["shared"] < 4:
+            time.sleep(0.001)
+        release.set()
+        assert [future.result() for future in futures] == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_smartfetch_coalesces_identical_gets():
+    """
+    Test that identical concurrent GETs hit the backend once, and different
+    tokens do not share a request.
+    """
+    gate = threading.Event()
+
+    def slow_get(url, **kwargs):
+        gate.wait()
+        return MagicMock(status_code=200)
+
+    fetch = SmartFetch("http://api", coalesce=True)
+    with patch("requests.Session.get", side_effect=slow_get) as mock_get:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(
+                    fetch.get, endpoint="trials", item_id="1", token="tok%d" % (i % 2)
+                )
+                for i in range(8)
+            ]
+            while fetch.single_flight.stats()["shared"] < 6:
+                time.sleep(0.001)
+            gate.set()
+            responses = [future.result() for future in futures]
+    assert mock_get.call_count == 2
+    assert responses[0] is responses[2]
+    assert responses[0] is not responses[1]
@@ -0,0 +1,96 @@
+"""
+Unit and stress tests for the thread-safe credential cache
+"""
+import threading
+import time
+
+import jwt
+
+from cidc_utils.caching import ConcurrentCredentialCache
+
+
+def _token(sub, exp_in=3600):
+    return jwt.encode(
+        {"sub": sub, "exp": int(time.time()) + exp_in},
+        "test-secret-of-32-bytes-minimum",
+    )
+
+
+def test_same_semantics_as_credential_cache():
+    """
+    Test per-token expiry, ttl for opaque tokens and the size bound.
+    """
+    cache = ConcurrentCredentialCache(maxsize=8, ttl=60, stripes=2)
+    token = _token("a")
+    cache.cache_key(token, identity="a")
+    cache.cache_key(_token("b", exp_in=-5), identity="b")
+    cache.cache_key("opaque")
+    assert cache.get_key("a") == token
+    assert cache.get_claims("a")["sub"] == "a"
+    assert cache.get_key("b") is None
+    assert "b" not in cache
+    assert cache.get_key() == "opaque"
+    now = [time.monotonic() + 61]
+    cache.timer = lambda: now[0]
+    assert cache.get_key() is None
+    for index in range(40):
+        cache.cache_key("t{}".format(index), identity=str(index))
+    assert len(cache) <= 8
+
+
+def test_stress_many_threads():
+    """
+    Test that concurrent writers, readers and invalidations never corrupt entries.
+    """
+    cache = ConcurrentCredentialCache(maxsize=1024, stripes=8)
+    identities = ["user-{}".format(index) for index in range(16)]
+    tokens = {identity: [_token(identity) for _ in range(3)] for identity in identities}
+    errors = []
+    stop = threading.Event()
+
+    def writer(offset):
+        index = offset
+        while not stop.is_set():
+            identity = identities[index % len(identities)]
+            cache.cache_key(tokens[identity][index % 3], identity=identity)
+            if index % 7 == 0:
+                cache.pop(identity)
+            index += 1
+
+    def reader(offset):
+        index = offset
+        while not stop.is_set():
+            identity = identities[index % len(identities)]
+            entry = cache.get_entry(identity)
+            if entry is not None and (
+                entry.token not in tokens[identity] or entry.claims["sub"] != identity
+            ):
+                errors.append((identity, entry))
+            index += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+    assert not errors
+    assert len(cache) <= len(identities)
+
+
+def test_expired_removal_keeps_newer_token():
+    """
+    Test that dropping an expired slot never removes a token stored since.
+    """
+    cache = ConcurrentCredentialCache()
+    cache.cache_key(_token("a", exp_in=-5), identity="a")
+    stale_slot = cache._maps[cache._stripe("a")]["a"]
+    fresh = _token("a")
+    cache.cache_key(fresh, identity="a")
+    # A reader that saw the stale slot must not delete the fresh one.
+    index = cache._stripe("a")
+    with cache._locks[index]:
+        assert cache._maps[index].get("a") is not stale_slot
+    assert cache.get_key("a") == fresh
@@ -0,0 +1,93 @@
+"""
+Unit tests for the credential cache
+"""
+import time
+from unittest.mock import patch
+
+import jwt
+
+from cidc_utils.caching import CredentialCache
+
+
+def _token(sub="user-1", exp_in=3600):
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + exp_in}, "secret")
+
+
+def test_claims_decoded_once():
+    """
+    Test that lookups reuse the claims decoded when the token was cached.
+    """
+    cache = CredentialCache(maxsize=10, ttl=3600)
+    token = _token()
+    entry = cache.cache_key(token)
+    assert entry.claims["sub"] == "user-1"
+    with patch("jwt.decode") as mock_decode:
+        for _ in range(5):
+            assert cache.get_key() == token
+        mock_decode.assert_not_called()
+    assert cache.get_claims()["sub"] == "user-1"
+
+
+def test_many_identities_with_own_expiry(capsys):
+    """
+    Test that each identity expires at its own exp, silently.
+    """
+    cache = CredentialCache(maxsize=10, ttl=3600)
+    fresh, stale = _token("a"), _token("b", exp_in=-10)
+    cache.cache_key(fresh, identity="a")
+    cache.cache_key(stale, identity="b")
+    assert cache.get_key("a") == fresh
+    assert cache.get_key("b") is None
+    assert "b" not in cache
+    assert cache.get_key("nobody") is None
+    assert capsys.readouterr().out == ""
+
+
+def test_non_jwt_tokens_and_purge():
+    """
+    Test that opaque tokens are kept until the ttl and expired ones are purged.
+    """
+    now = [1000.0]
+    cache = CredentialCache(maxsize=10, ttl=3600, timer=lambda: now[0])
+    cache.cache_key("opaque-token")
+    assert cache.get_key() == "opaque-token"
+    assert cache.get_claims() is None
+    cache.cache_key(_token(exp_in=-1), identity="expired")
+    assert "expired" not in cache
+    cache.cache_key(_token(exp_in=10), identity="old")
+    now[0] += 11
+    assert cache.purge_expired() == 1
+    assert len(cache) == 1
+
+
+def test_exp_later_than_ttl_outlives_ttl():
+    """
+    Test that a JWT is kept until its own exp even when that is past the ttl,
+    while opaque tokens still expire at the ttl.
+    """
+    now = [1000.0]
+    cache = CredentialCache(maxsize=10, ttl=60, timer=lambda: now[0])
+    token = _token(exp_in=7200)
+    cache.cache_key(token, identity="jwt")
+    cache.cache_key("opaque-token", identity="opaque")
+    now[0] += 61
+    assert cache.get_key("jwt") == token
+    assert cache.get_key("opaque") is None
+    with patch("time.time", return_value=time.time() + 7201):
+        now[0] += 7201
+        assert cache.get_key("jwt") is None
+
+
+def test_full_cache_drops_expired_before_least_recent():
+    """
+    Test that a full cache makes room by dropping expired entries first.
+    """
+    now = [1000.0]
+    cache = CredentialCache(maxsize=2, ttl=60, timer=lambda: now[0])
+    cache.cache_key(_token(exp_in=7200), identity="old")
+    cache.cache_key("opaque", identity="short")
+    now[0] += 61
+    cache.cache_key(_token(exp_in=7200), identity="new")
+    assert "short" not in cache
+    assert cache.get_key("old") is not None
+    assert cache.get_key("new") is not None
@@ -0,0 +1,72 @@
+"""
+Tests for the format_data tools
+"""
+import io
+import json
+
+import pytest
+
+from cidc_utils.tools.format_data import convert_input_json, iter_input_json
+
+INPUTS = {
+    "run.bam": "gs://bucket/sample 1.bam",
+    "run.sizes": [1, 2.5, -3e10, 12345678901234567890],
+    "run.options": {"nested": {"flag": True, "none": None}},
+    'run.quoted\\"key': "café ሴ",
+    "run.zero": 0,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 65536])
+def test_iter_input_json_chunk_boundaries(chunk_size):
+    """
+    Test that every split of the input decodes to the same records.
+    """
+    for text in (json.dumps(INPUTS), json.dumps(INPUTS, indent=4)):
+        records = list(iter_input_json(io.StringIO(text), chunk_size=chunk_size))
+        assert records == [
+            {"key_name": key, "key_value": value} for key, value in INPUTS.items()
+        ]
+
+
+def test_convert_input_json_path(tmpdir):
+    """
+    Test that paths and file objects both work, and an empty object gives no records.
+    """
+    path = tmpdir.join("input.json")
+    path.write(json.dumps(INPUTS))
+    assert convert_input_json(str(path)) == convert_input_json(io.StringIO(path.read()))
+    assert len(convert_input_json(str(path))) == len(INPUTS)
+    assert convert_input_json(io.StringIO(" { } ")) == []
+
+
+def test_iter_input_json_is_lazy():
+    """
+    Test that records are yielded before the whole file is read.
+    """
+    stream = io.StringIO(
+        "{" + ",".join('"k%d": %d' % (i, i) for i in range(10000)) + "}"
+    )
+    records = iter_input_json(stream, chunk_size=64)
+    assert next(records) == {"key_name": "k0", "key_value": 0}
+    assert stream.tell() < 1000
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["[1, 2]", '{"a": 1,}', '{"a" 1}', '{"a": 1} extra', '{"a": 1', "{1: 2}", ""],
+)
+def test_iter_input_json_malformed(text):
+    """
+    Test that malformed input raises ValueError.
+    """
+    with pytest.raises(ValueError):
+        list(iter_input_json(io.StringIO(text), chunk_size=2))
+
+
+def test_iter_input_json_binary():
+    """
+    Test that binary file objects are rejected.
+    """
+    with pytest.raises(ValueError):
+        list(iter_input_json(io.BytesIO(b'{"a": 1}')))
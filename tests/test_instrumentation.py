@@ -0,0 +1,87 @@
+"""
+Unit tests for SmartFetch request instrumentation
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from cidc_utils.requests import RequestMetrics, RetryPolicy, SmartFetch
+from cidc_utils.requests.instrumentation import LatencyHistogram
+
+
+def _response(status_code, body=b"{}"):
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "ERR"
+    response._content = body
+    response._content_consumed = True
+    request = requests.Request("POST", "http://api/trials", data=b"12345").prepare()
+    response.request = request
+    return response
+
+
+def test_histogram_quantiles():
+    """
+    Test that quantile estimates land in the right buckets.
+    """
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        histogram.observe(0.005)
+    for _ in range(10):
+        histogram.observe(0.5)
+    assert histogram.quantile(0.5) <= 0.01
+    assert 0.1 < histogram.quantile(0.99) <= 0.5
+    assert LatencyHistogram().quantile(0.5) == 0.0
+
+
+def test_metrics_record_requests():
+    """
+    Test counters, retries, errors, bytes and hooks across verbs.
+    """
+    metrics = RequestMetrics()
+    before, after = MagicMock(), MagicMock()
+    metrics.add_before_request(before)
+    metrics.add_after_response(after)
+    policy = RetryPolicy(max_retries=2)
+    policy.sleep = MagicMock()
+    fetch = SmartFetch("http://api", metrics=metrics, retry_policy=policy)
+
+    with patch(
+        "requests.Session.get", side_effect=[_response(503), _response(200, b"abc")]
+    ):
+        fetch.get(endpoint="trials", item_id="1")
+    with patch("requests.Session.post", return_value=_response(404)):
+        with pytest.raises(RuntimeError):
+            fetch.patch(endpoint="trials?x=1", item_id="1")
+
+    snapshot = {(row["endpoint"], row["verb"]): row for row in metrics.snapshot()}
+    get_row = snapshot[("trials", "GET")]
+    assert get_row["count"] == 1
+    assert get_row["statuses"] == {200: 1}
+    assert get_row["retries"] == 1
+    assert get_row["bytes_in"] == 3
+    assert get_row["bytes_out"] == 5
+    assert get_row["latency"]["p99"] >= get_row["latency"]["p50"] >= 0
+    patch_row = snapshot[("trials", "PATCH")]
+    assert patch_row["errors"] == 1
+    assert patch_row["statuses"] == {404: 1}
+    assert before.call_count == 3
+    assert after.call_args[0][:2] == ("PATCH", "http://api/trials?x=1/1")
+
+    text = metrics.to_prometheus()
+    assert 'smartfetch_requests_total{endpoint="trials",verb="GET",status="200"} 1' in text
+    assert 'smartfetch_retries_total{endpoint="trials",verb="GET"} 1' in text
+    assert (
+        'smartfetch_request_duration_seconds_count{endpoint="trials",verb="PATCH"} 1'
+        in text
+    )
+
+
+def test_metrics_disabled():
+    """
+    Test that a disabled collector records nothing.
+    """
+    metrics = RequestMetrics(enabled=False)
+    with patch("requests.Session.get", return_value=_response(200)):
+        SmartFetch("", metrics=metrics).get(endpoint="trials")
+    assert metrics.snapshot() == []
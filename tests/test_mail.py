@@ -0,0 +1,82 @@
+"""
+Unit tests for the pooled SendGrid mailer
+"""
+from unittest.mock import MagicMock, patch
+
+from cidc_utils.loghandler.mail import MailMessage, SendGridMailer, get_mailer
+
+
+def _response(status_code):
+    response = MagicMock(status_code=status_code)
+    response.text = "error" if status_code >= 400 else ""
+    return response
+
+
+@patch("requests.Session.post")
+def test_send_sandbox(mock_post):
+    """
+    Test that a single send validates in sandbox mode.
+    """
+    mock_post.return_value = _response(200)
+    mailer = SendGridMailer("key", host="http://localhost:9")
+    assert mailer.send("s", "t", ["a@x.org"], "from@x.org", sandbox_mode=True)
+    url = mock_post.call_args[0][0]
+    payload = mock_post.call_args[1]["json"]
+    assert url == "http://localhost:9/v3/mail/send"
+    assert payload["mail_settings"]["sandbox_mode"]["enable"]
+    assert payload["personalizations"] == [
+        {"to": [{"email": "a@x.org"}], "subject": "s"}
+    ]
+    assert mailer.session.headers["Authorization"] == "Bearer key"
+    assert not mailer.send("s", "t", ["a@x.org"], "from@x.org")
+
+
+@patch("requests.Session.post")
+def test_send_bulk_packs_personalizations(mock_post):
+    """
+    Test that messages sharing a text are packed under the recipient limit.
+    """
+    mock_post.return_value = _response(202)
+    messages = [
+        MailMessage("s{}".format(i), "same", ["u{}@x.org".format(i)]) for i in range(5)
+    ]
+    messages.append(
+        MailMessage("big", "same", ["b{}@x.org".format(i) for i in range(7)])
+    )
+    messages.append(MailMessage("other", "different", ["o@x.org"]))
+    mailer = SendGridMailer("key")
+    results = mailer.send_bulk(messages, "from@x.org", max_recipients=4)
+
+    assert all(result.ok for result in results)
+    assert [result.index for result in results] == list(range(7))
+    payloads = [call[1]["json"] for call in mock_post.call_args_list]
+    for payload in payloads:
+        recipients = sum(len(p["to"]) for p in payload["personalizations"])
+        assert recipients <= 4
+    # 12 recipients of "same" need 3 requests, plus 1 for "different".
+    assert len(payloads) == 4
+    assert payloads[-1]["content"][0]["value"] == "different"
+
+
+@patch("requests.Session.post")
+def test_send_bulk_reports_failures_per_message(mock_post):
+    """
+    Test that a failed request fails exactly the messages it carried.
+    """
+    mock_post.side_effect = [_response(202), _response(400)]
+    messages = [
+        MailMessage("a", "one", ["a@x.org"]),
+        MailMessage("b", "two", ["b@x.org"]),
+    ]
+    results = SendGridMailer("key").send_bulk(messages, "from@x.org")
+    assert results[0].ok
+    assert not results[1].ok
+    assert results[1].status_code == 400
+
+
+def test_get_mailer_is_shared_per_key():
+    """
+    Test that one client is kept per API key.
+    """
+    assert get_mailer("key-1") is get_mailer("key-1")
+    assert get_mailer("key-1") is not get_mailer("key-2")
@@ -0,0 +1,318 @@
+"""
+Unit tests for the RabbitMQ log handler
+"""
+import logging
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from cidc_utils.loghandler.rabbitmq_handler import RabbitMQHandler
+
+
+def _record(message):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+@patch("kombu.Connection")
+def test_sync_handler_publishes_inline(mock_connection):
+    """
+    Test that the default handler connects eagerly and publishes in emit.
+    """
+    handler = RabbitMQHandler("amqp://broker")
+    mock_connection.return_value.connect.assert_called_once()
+    handler.emit(_record("hello"))
+    mock_connection.return_value.SimpleQueue.return_value.put.assert_called_once_with(
+        "hello"
+    )
+    handler.close()
+
+
+@patch("kombu.Connection")
+def test_async_handler_batches_and_flushes(mock_connection):
+    """
+    Test that asynchronous emit never touches the broker and close flushes.
+    """
+    handler = RabbitMQHandler(
+        "amqp://broker", asynchronous=True, batch_size=10, flush_interval=0.01
+    )
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    for index in range(25):
+        handler.emit(_record(index))
+    assert handler.flush(timeout=5)
+    assert [call[0][0] for call in queue.put.call_args_list] == list(range(25))
+    assert handler.counters["published"] == 25
+    mock_connection.assert_called_once()
+    handler.close()
+    queue.close.assert_called_once()
+
+
+@patch("kombu.Connection")
+def test_async_handler_lazy_connect_and_reconnect(mock_connection):
+    """
+    Test that a broker error triggers a reconnect without losing records.
+    """
+    mock_connection.return_value.connect.side_effect = [OSError("down"), None]
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        batch_size=5,
+        flush_interval=0.01,
+        reconnect_delay=0.01,
+    )
+    assert mock_connection.call_count == 0
+    for index in range(5):
+        handler.emit(_record(index))
+    assert handler.flush(timeout=5)
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    assert [call[0][0] for call in queue.put.call_args_list] == list(range(5))
+    assert handler.counters["reconnects"] == 1
+    handler.close()
+
+
+@pytest.mark.parametrize(
+    "overflow,expected,counter",
+    [
+        ("drop_oldest", [2, 3, 4], "dropped_oldest"),
+        ("drop_newest", [0, 1, 2], "dropped_newest"),
+    ],
+)
+@patch("kombu.Connection")
+def test_async_handler_overflow(mock_connection, overflow, expected, counter):
+    """
+    Test the drop policies while the publisher is stalled on the broker.
+    """
+    stalled, gate = threading.Event(), threading.Event()
+
+    def slow_connect():
+        stalled.set()
+        gate.wait()
+
+    mock_connection.return_value.connect.side_effect = slow_connect
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        buffer_size=3,
+        batch_size=1,
+        flush_interval=0.01,
+        overflow=overflow,
+    )
+    handler.emit(_record("first"))
+    assert stalled.wait(5)
+    for index in range(5):
+        handler.emit(_record(index))
+    gate.set()
+    assert handler.flush(timeout=5)
+    assert handler.counters[counter] == 2
+    assert [call[0][0] for call in queue.put.call_args_list] == ["first"] + expected
+    handler.close()
+
+
+@patch("kombu.Connection")
+def test_async_handler_spools_while_broker_down(mock_connection, tmp_path):
+    """
+    Test that records go to disk while the broker is down and are replayed in order.
+    """
+    broker_up = threading.Event()
+
+    def connect():
+        if not broker_up.is_set():
+            raise OSError("down")
+
+    mock_connection.return_value.connect.side_effect = connect
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        batch_size=4,
+        flush_interval=0.01,
+        reconnect_delay=0.05,
+        max_reconnect_delay=0.05,
+        spool_dir=str(tmp_path),
+    )
+    for index in range(10):
+        handler.emit(_record({"n": index}))
+    assert handler.flush(timeout=5)
+    assert handler.counters["spooled"] == 10
+    assert len(handler.spool) == 10
+
+    broker_up.set()
+    handler.emit(_record({"n": "new"}))
+    deadline = time.monotonic() + 5
+    while len(handler.spool) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert handler.flush(timeout=5)
+    published = [call[0][0] for call in queue.put.call_args_list]
+    assert [message for message in published if message["n"] != "new"] == [
+        {"n": index} for index in range(10)
+    ]
+    assert {"n": "new"} in published
+    assert handler.counters["replayed"] == handler.counters["spooled"]
+    handler.close()
+
+
+@patch("kombu.Connection")
+def test_async_handler_survives_spool_errors(mock_connection, tmp_path):
+    """
+    Test that a failing spool falls back to the buffer instead of killing the
+    publisher, and nothing is lost once the broker is back.
+    """
+    broker_up = threading.Event()
+
+    def connect():
+        if not broker_up.is_set():
+            raise OSError("down")
+
+    mock_connection.return_value.connect.side_effect = connect
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        batch_size=4,
+        flush_interval=0.01,
+        reconnect_delay=0.05,
+        max_reconnect_delay=0.05,
+        spool_dir=str(tmp_path),
+    )
+    with patch.object(handler.spool, "append", side_effect=OSError("disk full")):
+        for index in range(10):
+            handler.emit(_record({"n": index}))
+        deadline = time.monotonic() + 5
+        while handler.counters["spool_errors"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert handler.counters["spool_errors"] >= 2
+        assert handler._publisher.is_alive()
+        broker_up.set()
+        assert handler.flush(timeout=5)
+    published = [call[0][0] for call in queue.put.call_args_list]
+    assert published == [{"n": index} for index in range(10)]
+    assert handler.counters["spooled"] == 0
+    handler.close()
+
+
+@patch("kombu.Connection")
+def test_emit_does_not_block_after_publisher_dies(mock_connection):
+    """
+    Test that a full buffer with overflow="block" drops rather than hangs once
+    the publisher thread is gone.
+    """
+    with patch.object(
+        RabbitMQHandler, "_publish_loop", side_effect=RuntimeError("boom")
+    ):
+        handler = RabbitMQHandler("amqp://broker", asynchronous=True, buffer_size=2)
+        handler._publisher.join(5)
+    assert not handler._publisher.is_alive()
+    emitter = threading.Thread(
+        target=lambda: [handler.emit(_record(str(index))) for index in range(5)]
+    )
+    emitter.start()
+    emitter.join(5)
+    assert not emitter.is_alive()
+    assert handler.counters["dropped_newest"] == 3
+
+
+def test_spool_requires_async(tmp_path):
+    """
+    Test that the spool is rejected for the synchronous handler.
+    """
+    with pytest.raises(ValueError):
+        RabbitMQHandler("amqp://broker", spool_dir=str(tmp_path))
+
+
+@patch("kombu.Connection")
+def test_async_handler_structured_envelopes(mock_connection):
+    """
+    Test that structured records are shipped one envelope per batch.
+    """
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        batch_size=5,
+        flush_interval=0.01,
+        structured=True,
+        compression="zlib",
+    )
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    for index in range(10):
+        handler.emit(_record({"message": "m{}".format(index), "category": "DATA"}))
+    assert handler.flush(timeout=5)
+    assert queue.put.call_count == 2
+    records = []
+    for call in queue.put.call_args_list:
+        assert call[1]["content_type"] == "application/json"
+        assert call[1]["compression"] == "zlib"
+        assert call[1]["headers"] == {"x-record-count": 5}
+        records.extend(handler.serializer.decode(call[0][0]))
+    assert [record["message"] for record in records] == [
+        "m{}".format(index) for index in range(10)
+    ]
+    assert records[0]["severity"] == "INFO"
+    assert records[0]["category"] == "DATA"
+    assert records[0]["logger"] == "test"
+    handler.close()
+
+
+def test_encoding_requires_structured():
+    """
+    Test that envelope options are rejected for plain messages.
+    """
+    with pytest.raises(ValueError):
+        RabbitMQHandler("amqp://broker", asynchronous=True, encoding="bson")
+
+
+@patch("kombu.Connection")
+def test_close_leaves_teardown_to_a_busy_publisher(mock_connection):
+    """
+    Test that close doesn't close the queue under a publisher that outlives
+    close_timeout, and that the publisher closes it once done.
+    """
+    queue = mock_connection.return_value.SimpleQueue.return_value
+    publishing = threading.Event()
+    release = threading.Event()
+
+    def slow_put(message):
+        publishing.set()
+        release.wait(5)
+
+    queue.put.side_effect = slow_put
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        batch_size=1,
+        flush_interval=0.01,
+        close_timeout=0.05,
+    )
+    handler.emit(_record("slow"))
+    assert publishing.wait(5)
+    handler.close()
+    queue.close.assert_not_called()
+    release.set()
+    handler._publisher.join(5)
+    assert not handler._publisher.is_alive()
+    queue.close.assert_called_once()
+    mock_connection.return_value.release.assert_called_once()
+
+
+@patch("kombu.Connection")
+def test_close_interrupts_reconnect_wait(mock_connection):
+    """
+    Test that close doesn't wait out the reconnect delay without a spool.
+    """
+    mock_connection.return_value.connect.side_effect = OSError("down")
+    handler = RabbitMQHandler(
+        "amqp://broker",
+        asynchronous=True,
+        batch_size=1,
+        flush_interval=0.01,
+        reconnect_delay=30.0,
+    )
+    handler.emit(_record("lost"))
+    deadline = time.monotonic() + 5
+    while not handler.counters["reconnects"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    started = time.monotonic()
+    handler.close()
+    assert time.monotonic() - started < 2
+    assert not handler._publisher.is_alive()
+    assert handler.counters["dropped_oldest"] == 1
@@ -0,0 +1,121 @@
+"""
+Tests for the indexed RecordStore
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from cidc_utils.tools.format_data import DataRecord
+from cidc_utils.tools.record_store import RecordStore
+
+
+def _document(index, **changes):
+    document = {
+        "_id": "id{}".format(index),
+        "assay": "assay{}".format(index % 2),
+        "trial": "trial{}".format(index % 3),
+        "file_name": "f{}.bam".format(index),
+        "sample_id": "s{}".format(index % 4),
+        "mapping": "normal",
+        "gs_uri": "gs://bucket/f{}.bam".format(index),
+        "date_created": "2018-06-01",
+        "processed": index % 5 == 0,
+    }
+    document.update(changes)
+    return document
+
+
+def _scan(documents, **criteria):
+    return {
+        doc["_id"]
+        for doc in documents
+        if all(doc.get(field) == value for field, value in criteria.items())
+    }
+
+
+QUERIES = [
+    {"trial": "trial1"},
+    {"trial": "trial1", "assay": "assay0", "sample_id": "s2"},
+    {"trial": "trial2", "processed": True},
+    {"gs_uri": "gs://bucket/f7.bam"},
+    {"trial": "trial0", "mapping": "normal", "file_name": "f9.bam"},
+    {"mapping": "normal", "date_created": "2018-06-01"},
+    {"trial": "missing"},
+    {},
+]
+
+
+def test_find_matches_linear_scan():
+    """
+    Test that indexed lookups return what a scan of every record would.
+    """
+    documents = [_document(index) for index in range(60)]
+    store = RecordStore(documents)
+    assert len(store) == 60
+    for criteria in QUERIES:
+        assert store.find_keys(**criteria) == _scan(documents, **criteria)
+        assert store.count(**criteria) == len(_scan(documents, **criteria))
+    assert store.distinct("trial") == {"trial0", "trial1", "trial2"}
+    assert store.find(gs_uri="gs://bucket/f7.bam") == [documents[7]]
+
+
+def test_insert_update_remove_keep_indexes_in_sync():
+    """
+    Test that every change is reflected by later lookups.
+    """
+    documents = [_document(index) for index in range(30)]
+    store = RecordStore(documents[:20])
+    for document in documents[20:]:
+        store.insert(document)
+    with pytest.raises(ValueError):
+        store.insert(documents[0])
+
+    documents[4] = store.update("id4", {"trial": "trial9", "processed": True})
+    documents[5] = store.update("id5", {"sample_id": "s9"})
+    store.upsert(_document(6, assay="assay7"))
+    documents[6] = _document(6, assay="assay7")
+    assert store.remove("id8") == documents.pop(8)
+    for criteria in QUERIES + [{"trial": "trial9"}, {"sample_id": "s9"}]:
+        assert store.find_keys(**criteria) == _scan(documents, **criteria)
+    assert "id8" not in store
+    assert store.count(trial="trial9") == 1
+
+    with pytest.raises(ValueError):
+        store.update("id4", {"_id": "other"})
+    with pytest.raises(KeyError):
+        store.remove("id8")
+    with pytest.raises(TypeError):
+        store.update("id4", {"trial": ["unhashable"]})
+    assert store.get("id4")["trial"] == "trial9"
+    assert store.find_keys(trial="trial9") == {"id4"}
+
+
+def test_records_and_missing_fields():
+    """
+    Test attr.s records, and that a missing indexed field is indexed as None.
+    """
+    store = RecordStore([DataRecord(*_document(1).values())])
+    store.insert({"_id": "bare", "trial": "trial1"})
+    assert store.find_keys(trial="trial1") == {"id1", "bare"}
+    assert store.find_keys(assay=None) == {"bare"}
+    with pytest.raises(ValueError):
+        store.insert({"trial": "no key"})
+    store.remove("id1")
+    assert store.distinct("assay") == {None}
+
+
+def test_from_smartfetch():
+    """
+    Test loading a collection through SmartFetch.iter_items.
+    """
+    fetcher = MagicMock()
+    fetcher.iter_items.return_value = iter([_document(1), _document(2)])
+    store = RecordStore.from_smartfetch(
+        fetcher, "data", indexes=("trial",), token="abc", params={"max_results": 500}
+    )
+    fetcher.iter_items.assert_called_once_with(
+        endpoint="data", token="abc", params={"max_results": 500}
+    )
+    assert store.find_keys(trial="trial2") == {"id2"}
+    with pytest.raises(KeyError):
+        store.distinct("assay")
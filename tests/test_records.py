@@ -0,0 +1,101 @@
+"""
+Tests for the compact record types and DataRecordBatch
+"""
+import attr
+import pytest
+
+from cidc_utils.tools.format_data import AssayRecord, DataRecord, TrialRecord
+from cidc_utils.tools.records import (
+    CompactAssayRecord,
+    CompactDataRecord,
+    CompactTrialRecord,
+    DataRecordBatch,
+    from_dict,
+    to_dict,
+)
+
+
+def _document(index, processed=False):
+    return {
+        "_id": "id{}".format(index),
+        "assay": "wes",
+        "trial": "trial{}".format(index % 3),
+        "file_name": "f{}.bam".format(index),
+        "sample_id": "s{}".format(index % 5),
+        "mapping": "normal",
+        "gs_uri": "gs://bucket/f{}.bam".format(index),
+        "date_created": "2018-06-01",
+        "processed": processed,
+    }
+
+
+def test_compact_records_match_originals():
+    """
+    Test that the slotted records have the same fields and no __dict__.
+    """
+    for original, compact in (
+        (TrialRecord, CompactTrialRecord),
+        (AssayRecord, CompactAssayRecord),
+        (DataRecord, CompactDataRecord),
+    ):
+        assert [field.name for field in attr.fields(original)] == [
+            field.name for field in attr.fields(compact)
+        ]
+        assert not hasattr(compact.__new__(compact), "__dict__")
+    document = dict(_document(1), _etag="ignored")
+    record = from_dict(CompactDataRecord, document)
+    assert to_dict(record) == _document(1)
+    assert to_dict(from_dict(DataRecord, document)) == to_dict(record)
+    trial = from_dict(
+        CompactTrialRecord,
+        {"trial_name": "t", "principal_investigator": "p", "start_date": 1},
+    )
+    assert trial.samples == []
+
+
+def test_batch_round_trip():
+    """
+    Test building a batch from dicts and records, and converting it back.
+    """
+    documents = [_document(index, processed=index % 2 == 0) for index in range(10)]
+    documents[3]["processed"] = None
+    del documents[4]["mapping"]
+    batch = DataRecordBatch.from_dicts(documents)
+    batch.append(DataRecord(*_document(10).values()))
+    assert len(batch) == 11
+    expected = documents + [_document(10)]
+    expected[4] = dict(expected[4], mapping=None)
+    assert list(batch.to_dicts()) == expected
+    assert batch[3].processed is None
+    assert batch[-1] == CompactDataRecord(*_document(10).values())
+    assert [to_dict(record) for record in batch] == expected
+    assert list(batch.column("trial")) == [doc["trial"] for doc in expected]
+
+
+def test_batch_set_value_and_encoding():
+    """
+    Test in-place updates and that repeated values share one table entry.
+    """
+    batch = DataRecordBatch(_document(index) for index in range(100))
+    assert batch._columns["trial"].values == ["trial0", "trial1", "trial2"]
+    batch.set_value(5, "processed", True)
+    batch.set_value(5, "trial", "trial9")
+    assert batch.get_value(5, "processed") is True
+    assert batch[5].trial == "trial9"
+    assert batch[6].trial == "trial0"
+    with pytest.raises(KeyError):
+        batch.column("missing")
+
+
+def test_batch_rolls_back_bad_record():
+    """
+    Test that a record that fails midway leaves the columns aligned.
+    """
+    batch = DataRecordBatch([_document(0)])
+    with pytest.raises(TypeError):
+        batch.append(dict(_document(1), sample_id=["unhashable"]))
+    with pytest.raises(KeyError):
+        batch.append(dict(_document(1), processed="yes"))
+    assert len(batch) == 1
+    batch.append(_document(2))
+    assert list(batch.to_dicts()) == [_document(0), _document(2)]
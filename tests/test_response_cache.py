@@ -0,0 +1,74 @@
+"""
+Unit tests for the conditional-GET response cache
+"""
+from unittest.mock import patch
+
+import requests
+from cidc_utils.requests import ResponseCache, SmartFetch
+
+
+def _response(status_code, body=b"", etag=None, url=""):
+    """Builds a real requests.Response."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "OK"
+    response._content = body
+    response.url = url
+    if etag:
+        response.headers["ETag"] = etag
+    return response
+
+
+def test_response_cache_evicts_by_count_and_bytes():
+    """
+    Test that the least recently used entries go first once either limit is hit.
+    """
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.store(cache.make_key("a"), _response(200, b"1234", "e1"))
+    cache.store(cache.make_key("b"), _response(200, b"1234", "e2"))
+    cache.lookup(cache.make_key("a"))
+    cache.store(cache.make_key("c"), _response(200, b"12", "e3"))
+    assert cache.lookup(cache.make_key("b")) is None
+    assert len(cache) == 2
+    cache.store(cache.make_key("d"), _response(200, b"123456789", "e4"))
+    assert len(cache) == 1
+    assert cache.size == 9
+    assert not cache.store(cache.make_key("e"), _response(200, b"x" * 11, "e5"))
+    assert not cache.store(cache.make_key("f"), _response(200, b"x"))
+
+
+def test_response_cache_keys_on_identity():
+    """
+    Test that different tokens never share an entry.
+    """
+    cache = ResponseCache()
+    cache.store(cache.make_key("a", auth="tok1"), _response(200, b"1", "e1"))
+    assert cache.lookup(cache.make_key("a", auth="tok2")) is None
+    assert cache.lookup(cache.make_key("a", auth="tok1")) is not None
+
+
+def test_smartfetch_conditional_get():
+    """
+    Test revalidation with If-None-Match, 304 handling and write invalidation.
+    """
+    cache = ResponseCache()
+    fetch = SmartFetch("http://api", response_cache=cache)
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value = _response(200, b'{"a": 1}', '"v1"', "http://api/t/1")
+        assert fetch.get(endpoint="t", item_id="1", token="tok").json() == {"a": 1}
+        assert "If-None-Match" not in mock_get.call_args[1]["headers"]
+
+        mock_get.return_value = _response(304, url="http://api/t/1")
+        response = fetch.get(endpoint="t", item_id="1", token="tok")
+        assert response.status_code == 200
+        assert response.json() == {"a": 1}
+        assert mock_get.call_args[1]["headers"]["If-None-Match"] == '"v1"'
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["revalidations"] == 1
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value.status_code = 200
+        fetch.patch(endpoint="t", item_id="1", token="tok")
+    assert len(cache) == 0
@@ -0,0 +1,116 @@
+"""
+Unit tests for the retry policy and circuit breaker
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from cidc_utils.requests import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    SmartFetch,
+    get_circuit_breaker,
+)
+
+
+def _status(code, headers=None):
+    response = MagicMock()
+    response.status_code = code
+    response.reason = "ERR"
+    response.headers = headers or {}
+    response.json.return_value = {}
+    return response
+
+
+def _policy(**kwargs):
+    policy = RetryPolicy(**kwargs)
+    policy.sleep = MagicMock()
+    return policy
+
+
+def test_retry_transient_statuses():
+    """
+    Test that a GET is resent on 503 and honours Retry-After.
+    """
+    policy = _policy(max_retries=3)
+    fetch = SmartFetch("", retry_policy=policy)
+    responses = [_status(503, {"Retry-After": "2"}), _status(502), _status(200)]
+    with patch("requests.Session.get", side_effect=responses) as mock_get:
+        assert fetch.get(endpoint="trials").status_code == 200
+    assert mock_get.call_count == 3
+    assert policy.sleep.call_args_list[0][0][0] == 2.0
+    assert 0 <= policy.sleep.call_args_list[1][0][0] <= policy.backoff_factor * 2
+
+
+def test_retry_gives_up():
+    """
+    Test that retries stop after max_retries and the usual RuntimeError is raised.
+    """
+    fetch = SmartFetch("", retry_policy=_policy(max_retries=2))
+    with patch("requests.Session.get", return_value=_status(504)) as mock_get:
+        with pytest.raises(RuntimeError, match="504"):
+            fetch.get(endpoint="trials")
+    assert mock_get.call_count == 3
+
+
+def test_retry_post_safety():
+    """
+    Test that POSTs are only resent when the server cannot have processed them.
+    """
+    fetch = SmartFetch("", retry_policy=_policy())
+    with patch("requests.Session.post", return_value=_status(502)) as mock_post:
+        with pytest.raises(RuntimeError):
+            fetch.post(endpoint="trials")
+    assert mock_post.call_count == 1
+
+    with patch(
+        "requests.Session.post", side_effect=[_status(429), _status(201)]
+    ) as mock_post:
+        assert fetch.post(endpoint="trials").status_code == 201
+
+    with patch(
+        "requests.Session.post", side_effect=requests.ReadTimeout()
+    ) as mock_post:
+        with pytest.raises(requests.ReadTimeout):
+            fetch.post(endpoint="trials")
+    assert mock_post.call_count == 1
+
+    with patch(
+        "requests.Session.post", side_effect=[requests.ConnectTimeout(), _status(201)]
+    ):
+        assert fetch.post(endpoint="trials").status_code == 201
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """
+    Test that the breaker fails fast once open and closes after a good trial request.
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.clock = lambda: now[0]
+    fetch = SmartFetch("", circuit_breaker=breaker)
+    with patch("requests.Session.get", return_value=_status(503)) as mock_get:
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                fetch.get(endpoint="trials")
+        with pytest.raises(CircuitOpenError):
+            fetch.get(endpoint="trials")
+    assert mock_get.call_count == 2
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] = 11
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with patch("requests.Session.get", return_value=_status(200)):
+        fetch.get(endpoint="trials")
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_shared_circuit_breaker_per_host():
+    """
+    Test that clients of the same host share one breaker.
+    """
+    first = SmartFetch("http://api.example/v1", circuit_breaker=True)
+    second = SmartFetch("http://api.example/v2", circuit_breaker=True)
+    assert first.circuit_breaker is second.circuit_breaker
+    assert get_circuit_breaker("http://other.example") is not first.circuit_breaker
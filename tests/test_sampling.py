@@ -0,0 +1,73 @@
+"""
+Unit tests for the sampling log filter
+"""
+import json
+import logging
+from io import StringIO
+
+from cidc_utils.loghandler.sampling import SamplingFilter
+from cidc_utils.loghandler.stack_driver_handler import StackdriverJsonFormatter
+
+
+def _record(message, level=logging.ERROR, category=None):
+    msg = {"message": message, "category": category} if category else message
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+
+def _filter(**kwargs):
+    log_filter = SamplingFilter(**kwargs)
+    now = [0.0]
+    log_filter.clock = lambda: now[0]
+    return log_filter, now
+
+
+def test_keep_first_then_token_bucket():
+    """
+    Test that the first occurrences pass and the rest is rate limited.
+    """
+    log_filter, now = _filter(rate=1, burst=2, keep_first=3)
+    kept = [log_filter.filter(_record("db down")) for _ in range(10)]
+    assert kept == [True] * 5 + [False] * 5
+    now[0] = 2.0
+    assert log_filter.filter(_record("db down"))
+    assert log_filter.filter(_record("db down"))
+    assert not log_filter.filter(_record("db down"))
+    # A new distinct problem is still visible.
+    assert log_filter.filter(_record("disk full"))
+
+
+def test_overrides_and_sampling():
+    """
+    Test per-category settings and probabilistic sampling.
+    """
+    log_filter, _ = _filter(
+        keep_first=0, overrides={"NOISY": {"sample_rate": 0.5, "burst": 1000}}
+    )
+    draws = iter([0.1, 0.9] * 10)
+    log_filter.random = lambda: next(draws)
+    kept = [log_filter.filter(_record("m", category="NOISY")) for _ in range(20)]
+    assert sum(kept) == 10
+    assert all(log_filter.filter(_record("m", category="DATA")) for _ in range(20))
+
+
+def test_summary_record():
+    """
+    Test that suppressed counts are reported through the attached handler.
+    """
+    stream = StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StackdriverJsonFormatter())
+    log_filter, now = _filter(rate=0, burst=0, keep_first=1, summary_interval=60)
+    log_filter.attach(handler)
+    for _ in range(5):
+        handler.handle(_record("flood", category="DATA"))
+    now[0] = 61.0
+    handler.handle(_record("flood", category="DATA"))
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == [
+        "flood",
+        "Suppressed 4 log records",
+        "flood",
+    ]
+    assert lines[1]["category"] == "LOG_SAMPLING"
+    assert lines[1]["suppressed"] == {"DATA:ERROR": 4}
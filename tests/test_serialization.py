@@ -0,0 +1,63 @@
+"""
+Unit tests for structured log records and envelopes
+"""
+import logging
+
+import pytest
+from kombu import compression
+
+from cidc_utils.loghandler.serialization import EnvelopeSerializer, structured_record
+
+
+def _record(message, level=logging.WARNING):
+    return logging.LogRecord("cidc", level, __file__, 1, message, None, None)
+
+
+def test_structured_record_fields():
+    """
+    Test that records carry the StackdriverJsonFormatter fields.
+    """
+    record = structured_record(
+        _record({"message": "disk low", "category": "EMAIL", "host": "a"})
+    )
+    assert record["message"] == "disk low"
+    assert record["severity"] == "WARNING"
+    assert record["category"] == "EMAIL"
+    assert record["host"] == "a"
+    assert record["logger"] == "cidc"
+    assert isinstance(record["timestamp"], float)
+    assert "levelname" not in record
+
+    plain = structured_record(_record("plain %s"))
+    assert plain["message"] == "plain %s"
+    assert plain["category"] == "INFO"
+
+
+@pytest.mark.parametrize("encoding", ["json", "bson"])
+@pytest.mark.parametrize("codec", [None, "zlib"])
+def test_envelope_round_trip(encoding, codec):
+    """
+    Test that envelopes decode back to the records they were built from.
+    """
+    serializer = EnvelopeSerializer(encoding, codec)
+    records = [structured_record(_record("m{}".format(i))) for i in range(20)]
+    records[0]["extra"] = object()
+    body = serializer.encode(records)
+    compression_type = None
+    if codec:
+        body, compression_type = compression.compress(body, codec)
+    decoded = serializer.decode(body, compression_type)
+    assert [record["message"] for record in decoded] == [
+        "m{}".format(i) for i in range(20)
+    ]
+    assert isinstance(decoded[0]["extra"], str)
+
+
+def test_envelope_rejects_unknown_options():
+    """
+    Test that unknown encodings and codecs fail fast.
+    """
+    with pytest.raises(ValueError):
+        EnvelopeSerializer("xml")
+    with pytest.raises(ValueError):
+        EnvelopeSerializer("json", "snappy-ish")
@@ -0,0 +1,66 @@
+"""
+Unit tests for the SQLite-backed shared credential cache
+"""
+import multiprocessing
+import time
+
+import jwt
+
+from cidc_utils.caching import SharedCredentialCache, TokenProvider
+
+
+def _token(sub, exp_in=3600):
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + exp_in}, "secret")
+
+
+def _store(path, token):
+    SharedCredentialCache(path).cache_key(token, identity="worker")
+
+
+def test_shared_between_processes(tmp_path):
+    """
+    Test that a token cached by one process is read by another.
+    """
+    path = str(tmp_path / "credentials.db")
+    cache = SharedCredentialCache(path)
+    token = _token("user-1")
+    process = multiprocessing.get_context("spawn").Process(
+        target=_store, args=(path, token)
+    )
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+    assert cache.get_key("worker") == token
+    assert cache.get_claims("worker")["sub"] == "user-1"
+
+
+def test_expiry_and_ttl(tmp_path):
+    """
+    Test the same expiry semantics as CredentialCache.
+    """
+    cache = SharedCredentialCache(str(tmp_path / "c.db"), ttl=60)
+    cache.cache_key(_token("old", exp_in=-5), identity="old")
+    cache.cache_key("opaque")
+    assert cache.get_key("old") is None
+    assert "old" not in cache
+    assert cache.get_key() == "opaque"
+    cache.ttl = -1
+    assert cache.get_key() is None
+    assert cache.purge_expired() == 1
+
+
+def test_maxsize_and_provider(tmp_path):
+    """
+    Test eviction of the oldest entries and use behind a TokenProvider.
+    """
+    cache = SharedCredentialCache(str(tmp_path / "c.db"), maxsize=3)
+    for index in range(5):
+        cache.cache_key(_token(str(index)), identity=str(index))
+    assert len(cache) == 3
+    assert cache.get_key("0") is None
+
+    provider = TokenProvider(lambda: _token("p"), cache=cache, background=False)
+    token = provider.get_token()
+    assert cache.get_key() == token
+    provider.invalidate(token)
+    assert cache.get_key() is None
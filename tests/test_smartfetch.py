@@ -2,9 +2,12 @@
 Unit tests for the SmartFetch class/wrappers
 """
 
+import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+from bson import ObjectId
 from cidc_utils.requests import SmartFetch
+from cidc_utils.requests.smartfetch import chunk_documents
 
 
 class TestSmartFetch(unittest.TestCase):
@@ -17,7 +20,7 @@ class TestSmartFetch(unittest.TestCase):
         """
         Test that errors are properly raised on a failed request.
         """
-        with patch('requests.post') as mock_requests:
+        with patch('requests.Session.post') as mock_requests:
             mock_requests.return_value.status_code = 200
             with self.assertRaises(RuntimeError):
                 smart_fetch = SmartFetch('')
@@ -26,7 +29,7 @@ class TestSmartFetch(unittest.TestCase):
     def test_smartfetch_ok(self):
         """[summary]
         """
-        with patch('requests.post') as mock_requests:
+        with patch('requests.Session.post') as mock_requests:
             mock_requests.return_value.status_code = 200
             smart_fetch = SmartFetch('')
             smart_fetch.post(code=200)
@@ -42,9 +45,171 @@ def test_smartfetch_instatiate():
 def test_smartfetch_fails():
     """[summary]
     """
-    with patch('requests.post') as mock_requests:
+    with patch('requests.Session.post') as mock_requests:
         mock_requests.return_value.status_code = 200
         smart_fetch = SmartFetch('')
         value = smart_fetch.post(code=200)
         assert value.status_code == 200
-        
\ No newline at end of file
+        
+
+
+def test_smartfetch_pool_configuration():
+    """
+    Test that the pool settings reach the mounted adapters.
+    """
+    smart_fetch = SmartFetch("http://localhost", pool_connections=2, pool_maxsize=7)
+    adapter = smart_fetch.session.get_adapter("http://localhost")
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 7
+    assert smart_fetch.session.get_adapter("https://localhost") is adapter
+
+
+def test_smartfetch_reuses_session():
+    """
+    Test that every verb goes through the same session and gets the default timeout.
+    """
+    with patch("requests.Session.get") as mock_get, patch(
+        "requests.Session.delete"
+    ) as mock_delete:
+        mock_get.return_value.status_code = 200
+        mock_delete.return_value.status_code = 200
+        smart_fetch = SmartFetch("http://localhost", timeout=5)
+        smart_fetch.get(endpoint="trials")
+        smart_fetch.delete(endpoint="trials", item_id="abc")
+        mock_get.assert_called_once_with("http://localhost/trials", timeout=5)
+        mock_delete.assert_called_once_with("http://localhost/trials/abc", timeout=5)
+
+
+def test_smartfetch_context_manager():
+    """
+    Test that leaving the context closes the session.
+    """
+    with patch("requests.Session.close") as mock_close:
+        with SmartFetch("") as smart_fetch:
+            assert isinstance(smart_fetch, SmartFetch)
+        mock_close.assert_called_once()
+
+
+def test_smartfetch_get_many():
+    """
+    Test that get_many preserves order and reports failures per item.
+    """
+
+    def fake_get(url, **kwargs):
+        response = MagicMock()
+        response.status_code = 404 if url.endswith("/missing") else 200
+        response.reason = "NOT FOUND"
+        response.url = url
+        return response
+
+    item_ids = [ObjectId(), "missing"] + [str(i) for i in range(10)]
+    with patch("requests.Session.get", side_effect=fake_get):
+        results = SmartFetch("http://localhost").get_many(
+            item_ids, endpoint="trials", max_workers=4
+        )
+    assert [result.item_id for result in results] == item_ids
+    assert results[0].ok
+    assert results[0].response.url == "http://localhost/trials/" + str(item_ids[0])
+    assert not results[1].ok
+    assert isinstance(results[1].error, RuntimeError)
+    assert all(result.ok for result in results[2:])
+
+
+def test_smartfetch_delete_many_etags():
+    """
+    Test that delete_many sends each document's own etag.
+    """
+    with patch("requests.Session.delete") as mock_delete:
+        mock_delete.return_value.status_code = 204
+        results = SmartFetch("").delete_many(
+            ["a", "b"], endpoint="trials", code=204, etags={"a": "1", "b": "2"}
+        )
+    assert all(result.ok for result in results)
+    sent = {call[0][0]: call[1]["headers"] for call in mock_delete.call_args_list}
+    assert sent == {"/trials/a": {"If-Match": "1"}, "/trials/b": {"If-Match": "2"}}
+
+
+def _eve_page(items, next_href=None):
+    """Builds a mocked Eve collection response."""
+    response = MagicMock()
+    response.status_code = 200
+    body = {"_items": items, "_links": {}}
+    if next_href:
+        body["_links"]["next"] = {"href": next_href}
+    response.json.return_value = body
+    return response
+
+
+def test_smartfetch_iter_items():
+    """
+    Test that iter_items follows next links lazily and yields documents in order.
+    """
+    pages = {
+        "http://localhost/trials": _eve_page([{"n": 0}, {"n": 1}], "trials?page=2"),
+        "http://localhost/trials?page=2": _eve_page(
+            [{"n": 2}], "http://localhost/trials?page=3"
+        ),
+        "http://localhost/trials?page=3": _eve_page([{"n": 3}]),
+    }
+    for prefetch in (True, False):
+        with patch(
+            "requests.Session.get", side_effect=lambda url, **kwargs: pages[url]
+        ) as mock_get:
+            items = SmartFetch("http://localhost").iter_items(
+                endpoint="trials", params={"max_results": 2}, prefetch=prefetch
+            )
+            assert next(items) == {"n": 0}
+            assert [item["n"] for item in items] == [1, 2, 3]
+            assert mock_get.call_count == 3
+            assert mock_get.call_args_list[0][1] == {"params": {"max_results": 2}}
+            assert mock_get.call_args_list[1][1] == {}
+
+
+def test_chunk_documents_limits():
+    """
+    Test that chunks respect both the document and byte limits.
+    """
+    documents = [{"n": i} for i in range(10)]
+    chunks = list(chunk_documents(documents, max_documents=4))
+    assert [(start, count) for start, count, _ in chunks] == [(0, 4), (4, 4), (8, 2)]
+    assert json.loads(chunks[1][2]) == documents[4:8]
+
+    big = [{"blob": "x" * 50}, {"n": 1}, {"n": 2}, {"blob": "x" * 200}]
+    chunks = list(chunk_documents(big, max_documents=100, max_bytes=80))
+    assert [(start, count) for start, count, _ in chunks] == [(0, 2), (2, 1), (3, 1)]
+
+
+def test_smartfetch_post_bulk():
+    """
+    Test that post_bulk chunks documents and maps per-document results back.
+    """
+
+    def fake_post(url, data=None, **kwargs):
+        documents = json.loads(data)
+        response = MagicMock()
+        if any(document.get("bad") for document in documents):
+            response.status_code = 422
+            response.reason = "UNPROCESSABLE ENTITY"
+            items = [
+                {"_status": "ERR", "_issues": {"bad": "no"}}
+                if document.get("bad")
+                else {"_status": "OK"}
+                for document in documents
+            ]
+        else:
+            response.status_code = 201
+            items = [{"_status": "OK", "_id": document["n"]} for document in documents]
+        response.json.return_value = {"_items": items}
+        return response
+
+    documents = ({"n": i, "bad": i == 7} for i in range(25))
+    with patch("requests.Session.post", side_effect=fake_post) as mock_post:
+        results = SmartFetch("").post_bulk(
+            documents, endpoint="data", max_documents=5, max_workers=2
+        )
+    assert mock_post.call_count == 5
+    assert mock_post.call_args[1]["headers"]["Content-Type"] == "application/json"
+    assert [result.index for result in results] == list(range(25))
+    assert [result.ok for result in results] == [not 5 <= i < 10 for i in range(25)]
+    assert results[0].item == {"_status": "OK", "_id": 0}
+    assert "bad" in str(results[7].error)
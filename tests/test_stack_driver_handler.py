@@ -1,10 +1,15 @@
 """
 Unit tests for the stackdriver handlers
 """
+import datetime
+import enum
+import json
+import logging
 import os
+import sys
 
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from cidc_utils.loghandler import stack_driver_handler
 
 
@@ -22,3 +27,159 @@ def test_send_mail():
         api_key,
         sandbox_mode=True,
     )
+
+
+@patch("cidc_utils.loghandler.stack_driver_handler.send_mail")
+def test_email_category_is_dispatched_in_background(mock_send):
+    """
+    Test that formatting an EMAIL record doesn't send inline.
+    """
+    formatter = stack_driver_handler.StackdriverJsonFormatter()
+    formatter.configure_sendgrid("key", "from@x.org", ["to@x.org"])
+    record = logging.LogRecord(
+        "test",
+        logging.ERROR,
+        __file__,
+        1,
+        {"message": "boom", "category": "EMAIL"},
+        None,
+        None,
+    )
+    formatter.format(record)
+    assert formatter._alerts.counters["submitted"] == 1
+    assert formatter._alerts.flush()
+    mock_send.assert_called_once_with(
+        "STACKDRIVER_NOTIFICATION", "boom", ["to@x.org"], "from@x.org", "key"
+    )
+    formatter._alerts.close()
+
+
+def _format_both(record, fmt="%(levelname) %(message)", **kwargs):
+    slow = stack_driver_handler.StackdriverJsonFormatter(fmt, **kwargs)
+    fast = stack_driver_handler.StackdriverJsonFormatter(fmt, fast=True, **kwargs)
+    return slow.format(record), fast.format(record)
+
+
+@pytest.mark.parametrize(
+    "message", ["plain %s", {"message": "m", "category": "EMAIL", "n": 1}, {"n": 2}]
+)
+@pytest.mark.parametrize(
+    "fmt", ["%(levelname) %(message)", "%(asctime) %(levelname) %(name) %(message)"]
+)
+def test_fast_format_matches(message, fmt):
+    """
+    Test that the fast mode produces exactly the regular JSON.
+    """
+    record = logging.LogRecord("test", logging.ERROR, __file__, 1, message, None, None)
+    record.user = "bob"
+    record._private = 1
+    slow, fast = _format_both(record, fmt)
+    assert slow == fast
+    slow, fast = _format_both(record, fmt, datefmt="%Y")
+    assert slow == fast
+
+
+class _Color(enum.Enum):
+    RED = "red"
+
+
+class _Custom(object):
+    def __str__(self):
+        return "custom"
+
+
+class _DateEncoder(json.JSONEncoder):
+    def default(self, o):
+        return o.isoformat()
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        b"\x00\xff",
+        _Color.RED,
+        ValueError("x"),
+        datetime.datetime(2019, 1, 2, 3, 4, 5),
+        _Custom(),
+    ],
+)
+def test_fast_format_encodes_values_like_regular(value):
+    """
+    Test that both modes serialize non-JSON values the same way.
+    """
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "m", None, None)
+    record.value = value
+    slow, fast = _format_both(record)
+    assert slow == fast
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        {"json_default": str},
+        {"json_encoder": _DateEncoder},
+        {"json_indent": 2},
+        {"json_ensure_ascii": False},
+    ],
+)
+def test_fast_format_honours_json_options(option):
+    """
+    Test that fast mode encodes with the formatter's json settings.
+    """
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "é", None, None)
+    record.when = datetime.date(2019, 1, 2)
+    slow, fast = _format_both(record, **option)
+    assert slow == fast
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        {"static_fields": {"app": "cidc"}},
+        {"rename_fields": {"message": "msg"}},
+        {"timestamp": True},
+        {"prefix": "cidc: "},
+        {"reserved_attrs": ["msg"]},
+        {"json_serializer": json.dumps},
+    ],
+)
+def test_fast_format_rejects_unsupported_options(option):
+    """
+    Test that fast mode refuses jsonlogger options it would silently ignore.
+    """
+    stack_driver_handler.StackdriverJsonFormatter(**option)
+    with pytest.raises(ValueError, match=next(iter(option))):
+        stack_driver_handler.StackdriverJsonFormatter(fast=True, **option)
+
+
+def test_fast_format_exceptions_and_alerts():
+    """
+    Test tracebacks and EMAIL alerts in fast mode.
+    """
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        record = logging.LogRecord(
+            "test", logging.ERROR, __file__, 1, "boom", None, sys.exc_info()
+        )
+    slow, fast = _format_both(record)
+    assert slow == fast
+    assert "ValueError: bad" in json.loads(fast)["exc_info"]
+
+    formatter = stack_driver_handler.StackdriverJsonFormatter(fast=True)
+    formatter._send_from_email = "from@x.org"
+    formatter._sendgrid_api_key = "key"
+    formatter._to_emails = ["to@x.org"]
+    formatter._alerts = MagicMock()
+    formatter.format(
+        logging.LogRecord(
+            "test",
+            logging.ERROR,
+            __file__,
+            1,
+            {"message": "page", "category": "EMAIL"},
+            None,
+            None,
+        )
+    )
+    formatter._alerts.submit.assert_called_once_with("page", ["to@x.org"])
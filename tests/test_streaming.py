@@ -0,0 +1,111 @@
+"""
+Unit tests for SmartFetch streaming uploads and downloads
+"""
+import io
+import mmap
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from cidc_utils.requests import RetryPolicy, SmartFetch
+from cidc_utils.requests.smartfetch import read_error_prefix
+
+
+def _streamed(status_code, body):
+    """Builds a real response backed by a raw byte stream."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "ERR"
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_download_to_path_and_sink(tmp_path):
+    """
+    Test that downloads are streamed in chunks to a path or a file object.
+    """
+    body = b"x" * 100000
+    fetch = SmartFetch("")
+    with patch("requests.Session.get", return_value=_streamed(200, body)) as mock_get:
+        written = fetch.download(tmp_path / "out.bin", endpoint="files", chunk_size=4096)
+    assert written == len(body)
+    assert (tmp_path / "out.bin").read_bytes() == body
+    assert mock_get.call_args[1]["stream"] is True
+
+    sink = io.BytesIO()
+    with patch("requests.Session.get", return_value=_streamed(200, body)):
+        fetch.download(sink, endpoint="files")
+    assert sink.getvalue() == body
+
+
+def test_download_error_reads_bounded_prefix():
+    """
+    Test that a failed streamed request only reads a bounded prefix of the body.
+    """
+    response = _streamed(500, b"e" * 10000)
+    response.raw.read = MagicMock(wraps=response.raw.read)
+    assert read_error_prefix(response, limit=10) == "e" * 10
+    assert sum(call[0][0] for call in response.raw.read.call_args_list) <= 10
+
+    with patch("requests.Session.get", return_value=_streamed(500, b"e" * 10000)):
+        with pytest.raises(RuntimeError, match="500"):
+            SmartFetch("").download(io.BytesIO(), endpoint="files")
+
+
+def test_upload_streams_file(tmp_path):
+    """
+    Test that path uploads pass a file handle or mmap, never the full bytes.
+    """
+    path = tmp_path / "in.bin"
+    path.write_bytes(b"abc" * 1000)
+    sent = []
+
+    def capture(url, **kwargs):
+        sent.append(kwargs["data"])
+        assert kwargs["data"].read() == b"abc" * 1000
+        return MagicMock(status_code=201)
+
+    fetch = SmartFetch("")
+    with patch("requests.Session.post", side_effect=capture):
+        fetch.upload(path, endpoint="files")
+        fetch.upload(path, endpoint="files", use_mmap=True)
+        fetch.upload(path, endpoint="files", verb="put")
+    assert isinstance(sent[0], io.BufferedReader)
+    assert isinstance(sent[1], mmap.mmap)
+    with pytest.raises(ValueError):
+        fetch.upload(path, verb="get")
+
+
+def test_upload_non_seekable_bodies():
+    """
+    Test that pipes upload, that pipes and generators are never resent, and
+    that seekable bodies are rewound between attempts.
+    """
+    read_end, write_end = os.pipe()
+    with os.fdopen(write_end, "wb") as writer:
+        writer.write(b"piped")
+    calls = []
+
+    def respond(url, **kwargs):
+        data = kwargs["data"]
+        calls.append(data.read() if hasattr(data, "read") else b"".join(data))
+        return MagicMock(status_code=503, reason="ERR")
+
+    policy = RetryPolicy(max_retries=3, retry_non_idempotent=True)
+    policy.sleep = MagicMock()
+    fetch = SmartFetch("", retry_policy=policy)
+    with patch("requests.Session.post", side_effect=respond):
+        with os.fdopen(read_end, "rb") as pipe:
+            with pytest.raises(RuntimeError, match="503"):
+                fetch.upload(pipe, endpoint="files")
+        with pytest.raises(RuntimeError, match="503"):
+            fetch.upload((chunk for chunk in [b"a", b"b"]), endpoint="files")
+    assert calls == [b"piped", b"ab"]
+    policy.sleep.assert_not_called()
+
+    # Seekable bodies are rewound and resent whole.
+    with patch("requests.Session.post", side_effect=respond):
+        with pytest.raises(RuntimeError, match="503"):
+            fetch.upload(io.BytesIO(b"seekable"), endpoint="files")
+    assert calls[2:] == [b"seekable"] * 4
@@ -0,0 +1,38 @@
+"""
+End-to-end tests of SmartFetch against the benchmark Eve stub
+"""
+import pytest
+from benchmarks.stub_server import StubConfig, StubServer
+from cidc_utils.requests import ResponseCache, SmartFetch
+
+
+@pytest.fixture
+def stub():
+    """Runs the stub on a free local port."""
+    with StubServer(StubConfig(collection_size=55, page_size=10)) as server:
+        yield server
+
+
+def test_stub_pagination(stub):
+    """
+    Test that iter_items walks every page the stub serves.
+    """
+    with SmartFetch(stub.url) as fetch:
+        items = list(fetch.iter_items(endpoint="samples"))
+    assert len(items) == 55
+    assert items[-1]["sample_id"] == "sample-54"
+
+
+def test_stub_etags_and_errors(stub):
+    """
+    Test conditional GETs and forced error statuses over real HTTP.
+    """
+    cache = ResponseCache()
+    with SmartFetch(stub.url, response_cache=cache) as fetch:
+        first = fetch.get(endpoint="trials", item_id="a1").json()
+        assert fetch.get(endpoint="trials", item_id="a1").json() == first
+        assert cache.stats()["hits"] == 1
+
+        stub.config.status_overrides["/trials"] = 503
+        with pytest.raises(RuntimeError, match="503"):
+            fetch.get(endpoint="trials", item_id="a2")
@@ -0,0 +1,138 @@
+"""
+Unit tests for the refreshing token provider
+"""
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import jwt
+import requests
+
+from cidc_utils.caching import CredentialCache, TokenProvider
+from cidc_utils.requests import ResponseCache, SingleFlight, SmartFetch
+
+
+def _token(sub, exp_in=3600):
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + exp_in}, "secret")
+
+
+def test_concurrent_callers_share_one_refresh():
+    """
+    Test that threads finding no token wait for a single refresh.
+    """
+    gate = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        gate.wait(5)
+        return _token("a")
+
+    provider = TokenProvider(refresh, background=False)
+    tokens = []
+    threads = [
+        threading.Thread(target=lambda: tokens.append(provider.get_token()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert len(set(tokens)) == 1 and len(tokens) == 8
+
+
+def test_background_refresh_ahead_of_expiry():
+    """
+    Test that a token inside the refresh margin is replaced in the background.
+    """
+    tokens = iter([_token("old", exp_in=30), _token("new")])
+    provider = TokenProvider(lambda: next(tokens), refresh_margin=60)
+    first = provider.get_token()
+    deadline = time.monotonic() + 5
+    while provider.refreshes < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert provider.refreshes == 2
+    second = provider.get_token()
+    assert second != first
+    assert jwt.decode(second, options={"verify_signature": False})["sub"] == "new"
+    provider.close()
+
+
+def test_invalidate_keeps_newer_token():
+    """
+    Test that only the rejected token is dropped.
+    """
+    cache = CredentialCache(maxsize=4, ttl=3600)
+    provider = TokenProvider(lambda: _token("x"), cache=cache, background=False)
+    token = provider.get_token()
+    provider.invalidate("something-else")
+    assert cache.get_key() == token
+    provider.invalidate(token)
+    assert cache.get_key() is None
+
+
+def test_smartfetch_retries_401_once_with_fresh_token():
+    """
+    Test that SmartFetch uses the provider and recovers from a 401.
+    """
+    tokens = iter(["stale", "fresh"])
+    provider = TokenProvider(lambda: next(tokens), background=False)
+    seen = []
+
+    def fake_get(url, **kwargs):
+        seen.append(kwargs["headers"]["Authorization"])
+        response = MagicMock()
+        response.status_code = 401 if seen[-1] == "Bearer stale" else 200
+        return response
+
+    with patch("requests.Session.get", side_effect=fake_get):
+        fetch = SmartFetch("http://localhost", token_provider=provider)
+        assert fetch.get(endpoint="trials").status_code == 200
+        assert fetch.get(endpoint="trials").status_code == 200
+    assert seen == ["Bearer stale", "Bearer fresh", "Bearer fresh"]
+
+
+def test_shared_coalescing_and_cache_keep_providers_apart():
+    """
+    Test that clients with different providers never share coalesced or cached
+    responses through a shared SingleFlight or ResponseCache.
+    """
+    seen = []
+
+    def fake_get(url, **kwargs):
+        auth = kwargs["headers"]["Authorization"]
+        seen.append(auth)
+        response = requests.Response()
+        if "If-None-Match" in kwargs["headers"]:
+            # The server would confirm whatever copy the client claims to hold.
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.headers["ETag"] = '"v1"'
+            response._content = json.dumps({"user": auth}).encode()
+        return response
+
+    flight = SingleFlight()
+    flight_keys = []
+    do = flight.do
+    flight.do = lambda key, func: flight_keys.append(key) or do(key, func)
+    cache = ResponseCache()
+    clients = {
+        name: SmartFetch(
+            "http://localhost",
+            coalesce=flight,
+            response_cache=cache,
+            token_provider=TokenProvider(lambda name=name: name, background=False),
+        )
+        for name in ("alice", "bob")
+    }
+    with patch("requests.Session.get", side_effect=fake_get):
+        for name, fetch in clients.items():
+            assert fetch.get(endpoint="trials").json() == {"user": "Bearer " + name}
+    assert seen == ["Bearer alice", "Bearer bob"]
+    assert len(set(flight_keys)) == 2
+    assert cache.stats()["entries"] == 2